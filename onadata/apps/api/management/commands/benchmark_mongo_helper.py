@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# vim: ai ts=4 sts=4 et sw=4 fileencoding=utf-8
+'''
+Django management command timing `MongoHelper.to_safe_dict()` and
+`MongoHelper.to_readable_dict()` on generated submissions shaped like those
+of large forms: grouped questions, some names containing dots, a repeat
+group and the metadata added by `ParsedInstance.to_dict_for_mongo()`.
+
+:Example:
+    python manage.py benchmark_mongo_helper
+    python manage.py benchmark_mongo_helper --fields 1000 --records 200
+'''
+import copy
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.translation import ugettext_lazy
+
+from onadata.apps.api.mongo_helper import MongoHelper
+
+
+REPEAT_FIELDS = 20
+REPEAT_COUNT = 5
+
+
+def _generate_record(fields):
+    xpaths = []
+    record = {}
+    for i in range(fields):
+        # one question in ten has a name Mongo does not accept as a key
+        name = u'question.%d' % i if i % 10 == 0 else u'question_%d' % i
+        xpath = u'group_%d/%s' % (i % 25, name)
+        xpaths.append(xpath)
+        record[xpath] = u'answer %d' % i
+
+    repeat = u'repeat_group'
+    repeat_xpaths = [u'%s/item.%d' % (repeat, i) if i % 5 == 0
+                     else u'%s/item_%d' % (repeat, i)
+                     for i in range(REPEAT_FIELDS)]
+    xpaths.append(repeat)
+    xpaths.extend(repeat_xpaths)
+    record[repeat] = [dict((xpath, u'value') for xpath in repeat_xpaths)
+                      for _ in range(REPEAT_COUNT)]
+
+    record.update({
+        u'_id': 1,
+        u'_uuid': u'2e599f6fe0de42d3a1417fb7d821c859',
+        u'_userform_id': u'bob_large_form',
+        u'_attachments': [{u'download_url': u'/media/a.jpg',
+                           u'mimetype': u'image/jpeg',
+                           u'filename': u'bob/attachments/a.jpg',
+                           u'instance': 1, u'xform': 1, u'id': 1}],
+        u'_status': u'submitted_via_web',
+        u'_geolocation': [None, None],
+        u'_submission_time': u'2019-01-01T00:00:00',
+        u'_tags': [],
+        u'_notes': [],
+        u'_validation_status': {},
+        u'_submitted_by': u'bob',
+    })
+    return record, xpaths
+
+
+class Command(BaseCommand):
+    help = ugettext_lazy("Benchmark the translation of submission keys "
+                         "to and from Mongo.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fields',
+            type=int,
+            default=500,
+            help='Number of questions of each record.',
+        )
+        parser.add_argument(
+            '--records',
+            type=int,
+            default=500,
+            help='Number of records translated in each mode.',
+        )
+
+    def _time(self, function, records, clear_memos):
+        records = [copy.deepcopy(record) for record in records]
+        start = time.time()
+        for record in records:
+            if clear_memos:
+                MongoHelper.clear_key_memos()
+            function(record)
+        return (time.time() - start) * 1000 / len(records), records
+
+    def handle(self, *args, **options):
+        record, xpaths = _generate_record(options['fields'])
+        records = [record] * options['records']
+        safe_keys, readable_keys = MongoHelper.get_key_translations(xpaths)
+
+        modes = [
+            # every key is translated again for every record, as before the
+            # memos were added
+            ('no memo', {}, {}, True),
+            ('memo', {}, {}, False),
+            ('per form', {'safe_keys': safe_keys},
+             {'readable_keys': readable_keys}, False),
+        ]
+        for name, safe_kwargs, readable_kwargs, clear_memos in modes:
+            MongoHelper.clear_key_memos()
+            safe_ms, safe_records = self._time(
+                lambda d: MongoHelper.to_safe_dict(d, **safe_kwargs),
+                records, clear_memos)
+            readable_ms, readable_records = self._time(
+                lambda d: MongoHelper.to_readable_dict(d, **readable_kwargs),
+                safe_records, clear_memos)
+            if readable_records[0] != record:
+                self.stderr.write(u'%s: records differ after a round trip'
+                                  % name)
+            self.stdout.write(
+                u'%-8s  to_safe_dict: %.3fms  to_readable_dict: %.3fms' % (
+                    name, safe_ms, readable_ms))
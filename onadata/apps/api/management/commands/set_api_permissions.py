@@ -15,11 +15,12 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         # XForms
-        for xform in queryset_iterator(XForm.objects.all()):
+        for xform in queryset_iterator(XForm.objects.select_related('user')):
             OwnerRole.add(xform.user, xform)
 
         # UserProfile
-        for profile in queryset_iterator(UserProfile.objects.all()):
+        for profile in queryset_iterator(
+                UserProfile.objects.select_related('user', 'created_by')):
             set_api_permissions_for_user(profile.user)
             OwnerRole.add(profile.user, profile)
 
@@ -18,32 +18,41 @@ class MongoHelper(object):
         (re.compile(base64.encodestring('.').strip()), '.'),
     ]
 
+    # Maximum number of keys remembered by each of the translation memos
+    KEY_MEMO_SIZE = 10000
+    _safe_keys_memo = {}
+    _readable_keys_memo = {}
+
     @classmethod
-    def to_readable_dict(cls, d):
+    def to_readable_dict(cls, d, readable_keys=None):
         """
         Updates encoded attributes of a dict with human-readable attributes.
         For example:
         { "myLg==attribute": True } => { "my.attribute": True }
 
         :param d: dict
+        :param readable_keys: dict, translations precomputed for a form by
+            `get_key_translations()`
         :return: dict
         """
 
         for key, value in list(d.items()):
             if type(value) == list:
-                value = [cls.to_readable_dict(e)
-                         if type(e) == dict else e for e in value]
+                for e in value:
+                    if type(e) == dict:
+                        cls.to_readable_dict(e, readable_keys)
             elif type(value) == dict:
-                value = cls.to_readable_dict(value)
+                cls.to_readable_dict(value, readable_keys)
 
-            if cls._is_attribute_encoded(key):
+            readable_key = cls._get_readable_key(key, readable_keys)
+            if readable_key != key:
                 del d[key]
-                d[cls.decode(key)] = value
+                d[readable_key] = value
 
         return d
 
     @classmethod
-    def to_safe_dict(cls, d, reading=False):
+    def to_safe_dict(cls, d, reading=False, safe_keys=None):
         """
         Updates invalid attributes of a dict by encoding disallowed characters
         and, when `reading=False`, expanding dotted keys into nested dicts for
@@ -51,6 +60,8 @@ class MongoHelper(object):
 
         :param d: dict
         :param reading: boolean.
+        :param safe_keys: dict, translations precomputed for a form by
+            `get_key_translations()`
         :return: dict
 
         Example:
@@ -79,10 +90,11 @@ class MongoHelper(object):
         """
         for key, value in list(d.items()):
             if type(value) == list:
-                value = [cls.to_safe_dict(e, reading=reading)
-                         if type(e) == dict else e for e in value]
+                for e in value:
+                    if type(e) == dict:
+                        cls.to_safe_dict(e, reading, safe_keys)
             elif type(value) == dict:
-                value = cls.to_safe_dict(value, reading=reading)
+                cls.to_safe_dict(value, reading, safe_keys)
             elif key == '_id':
                 try:
                     d[key] = int(value)
@@ -90,7 +102,8 @@ class MongoHelper(object):
                     # if it is not an int don't convert it
                     pass
 
-            if cls._is_nested_reserved_attribute(key):
+            safe_key = cls._get_safe_key(key, safe_keys)
+            if safe_key is None:
                 # If we want to write into Mongo, we need to transform the dot delimited string into a dict
                 # Otherwise, for reading, Mongo query engine reads dot delimited string as a nested object.
                 # Drawback, if a user uses a reserved property with dots, it will be converted as well.
@@ -112,12 +125,92 @@ class MongoHelper(object):
                     # elements
                     d[first_part].update(cls.to_safe_dict(tree[first_part]))
 
-            elif cls.is_attribute_invalid(key):
+            elif safe_key != key:
                 del d[key]
-                d[cls.encode(key)] = value
+                d[safe_key] = value
 
         return d
 
+    @classmethod
+    def get_key_translations(cls, keys):
+        """
+        Precomputes the translations of `keys`, e.g. all the xpaths of a
+        form, for `to_safe_dict()` and `to_readable_dict()`.
+
+        :param keys: iterable of strings
+        :return: tuple of dicts, (safe_keys, readable_keys)
+        """
+        safe_keys = {}
+        readable_keys = {}
+        for key in keys:
+            safe_key = cls._translate_safe_key(key)
+            if safe_key is not None:
+                safe_keys[key] = safe_key
+                readable_keys[safe_key] = cls._translate_readable_key(
+                    safe_key)
+        return safe_keys, readable_keys
+
+    @classmethod
+    def _get_safe_key(cls, key, safe_keys=None):
+        """
+        Returns the key under which `key` is saved in Mongo, or `None` if it
+        is a nested reserved attribute.
+        """
+        if safe_keys:
+            try:
+                return safe_keys[key]
+            except KeyError:
+                pass
+        try:
+            return cls._safe_keys_memo[key]
+        except KeyError:
+            safe_key = cls._translate_safe_key(key)
+            cls._memoize(cls._safe_keys_memo, key, safe_key)
+            return safe_key
+
+    @classmethod
+    def _get_readable_key(cls, key, readable_keys=None):
+        if readable_keys:
+            try:
+                return readable_keys[key]
+            except KeyError:
+                pass
+        try:
+            return cls._readable_keys_memo[key]
+        except KeyError:
+            readable_key = cls._translate_readable_key(key)
+            cls._memoize(cls._readable_keys_memo, key, readable_key)
+            return readable_key
+
+    @classmethod
+    def _translate_safe_key(cls, key):
+        if '.' not in key and '$' not in key:
+            return key
+        if cls._is_nested_reserved_attribute(key):
+            return None
+        if cls.is_attribute_invalid(key):
+            return cls.encode(key)
+        return key
+
+    @classmethod
+    def _translate_readable_key(cls, key):
+        if cls._is_attribute_encoded(key):
+            return cls.decode(key)
+        return key
+
+    @classmethod
+    def _memoize(cls, memo, key, value):
+        # keys which are not part of a form, e.g. query operators, could grow
+        # the memo forever; starting over is cheaper than tracking usage
+        if len(memo) >= cls.KEY_MEMO_SIZE:
+            memo.clear()
+        memo[key] = value
+
+    @classmethod
+    def clear_key_memos(cls):
+        cls._safe_keys_memo.clear()
+        cls._readable_keys_memo.clear()
+
     @classmethod
     def encode(cls, key):
         """
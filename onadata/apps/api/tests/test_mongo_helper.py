@@ -0,0 +1,64 @@
+from django.test import TestCase
+
+from onadata.apps.api.mongo_helper import MongoHelper
+
+
+class TestMongoHelper(TestCase):
+
+    def setUp(self):
+        MongoHelper.clear_key_memos()
+
+    def tearDown(self):
+        MongoHelper.clear_key_memos()
+
+    def _record(self):
+        return {
+            u'_id': u'3',
+            u'my.string.with.dots': u'yes',
+            u'$starts_with_dollar': u'no',
+            u'_validation_status.uid': u'approved',
+            u'repeat': [{u'repeat/item.1': u'a'}, {u'repeat/item_2': u'b'}],
+        }
+
+    def test_to_safe_dict(self):
+        for i in range(2):
+            # the second time around, keys come from the memo
+            self.assertEqual(MongoHelper.to_safe_dict(self._record()), {
+                u'_id': 3,
+                u'myLg==stringLg==withLg==dots': u'yes',
+                u'JA==starts_with_dollar': u'no',
+                u'_validation_status': {u'uid': u'approved'},
+                u'repeat': [{u'repeat/itemLg==1': u'a'},
+                            {u'repeat/item_2': u'b'}],
+            })
+
+    def test_to_readable_dict_round_trip(self):
+        for i in range(2):
+            d = MongoHelper.to_safe_dict(self._record(), reading=True)
+            self.assertEqual(MongoHelper.to_readable_dict(d), dict(
+                self._record(), _id=3))
+
+    def test_key_translations(self):
+        safe_keys, readable_keys = MongoHelper.get_key_translations(
+            [u'my.string', u'plain', u'_validation_status.uid'])
+        self.assertEqual(safe_keys, {u'my.string': u'myLg==string',
+                                     u'plain': u'plain'})
+        self.assertEqual(readable_keys, {u'myLg==string': u'my.string',
+                                         u'plain': u'plain'})
+        d = MongoHelper.to_safe_dict({u'my.string': 1, u'other.key': 2},
+                                     safe_keys=safe_keys)
+        self.assertEqual(d, {u'myLg==string': 1, u'otherLg==key': 2})
+        self.assertEqual(
+            MongoHelper.to_readable_dict(d, readable_keys=readable_keys),
+            {u'my.string': 1, u'other.key': 2})
+
+    def test_memo_is_bounded(self):
+        size = MongoHelper.KEY_MEMO_SIZE
+        MongoHelper.KEY_MEMO_SIZE = 10
+        try:
+            for i in range(25):
+                MongoHelper.to_safe_dict({u'key.%d' % i: i})
+                self.assertLessEqual(
+                    len(MongoHelper._safe_keys_memo), 10)
+        finally:
+            MongoHelper.KEY_MEMO_SIZE = size
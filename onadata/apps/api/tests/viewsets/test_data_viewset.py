@@ -1,3 +1,4 @@
+import json
 import requests
 import unittest
 
@@ -53,6 +54,10 @@ class TestDataViewSet(TestBase):
         self.extra = {
             'HTTP_AUTHORIZATION': 'Token %s' % self.user.auth_token}
 
+    def _get_data(self, response):
+        # data lists are streamed
+        return json.loads(self._get_response_content(response))
+
     def test_data(self):
         self._make_submissions()
         view = DataViewSet.as_view({'get': 'list'})
@@ -68,12 +73,12 @@ class TestDataViewSet(TestBase):
         request = self.factory.get('/', **self.extra)
         response = view(request, pk=formid)
         self.assertEqual(response.status_code, 200)
-        self.assertIsInstance(response.data, list)
+        self.assertIsInstance(self._get_data(response), list)
         self.assertTrue(self.xform.instances.count())
 
         dataid = self.xform.instances.all().order_by('id')[0].pk
         data = _data_instance(dataid)
-        self.assertDictContainsSubset(data, sorted(response.data)[0])
+        self.assertDictContainsSubset(data, sorted(self._get_data(response))[0])
 
         view = DataViewSet.as_view({'get': 'retrieve'})
         response = view(request, pk=formid, dataid=dataid)
@@ -94,11 +99,11 @@ class TestDataViewSet(TestBase):
         response = view(request, pk=formid)
         # access to a public data
         self.assertEqual(response.status_code, 200)
-        self.assertIsInstance(response.data, list)
+        self.assertIsInstance(self._get_data(response), list)
         self.assertTrue(self.xform.instances.count())
         dataid = self.xform.instances.all().order_by('id')[0].pk
         data = _data_instance(dataid)
-        self.assertDictContainsSubset(data, sorted(response.data)[0])
+        self.assertDictContainsSubset(data, sorted(self._get_data(response))[0])
 
         data = {
             u'_xform_id_string': u'transportation_2011_07_25',
@@ -192,7 +197,7 @@ class TestDataViewSet(TestBase):
         self.assertEqual(response.data, data)
         response = view(request, pk=formid)
         self.assertEqual(response.status_code, 200)
-        self.assertIsInstance(response.data, list)
+        self.assertIsInstance(self._get_data(response), list)
         self.assertTrue(self.xform.instances.count())
         dataid = 'INVALID'
         data = _data_instance(dataid)
@@ -208,12 +213,65 @@ class TestDataViewSet(TestBase):
         dataid = self.xform.instances.all()[0].pk
         response = view(request, pk=formid)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 4)
+        self.assertEqual(len(self._get_data(response)), 4)
         query_str = '{"_id": "%s"}' % dataid
         request = self.factory.get('/?query=%s' % query_str, **self.extra)
         response = view(request, pk=formid)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(self._get_data(response)), 1)
+
+    def test_data_with_after_parameter(self):
+        self._make_submissions()
+        view = DataViewSet.as_view({'get': 'list'})
+        formid = self.xform.pk
+        dataids = list(self.xform.instances.order_by('pk').values_list(
+            'pk', flat=True))
+
+        request = self.factory.get('/?after=0&limit=3', **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [r['_id'] for r in self._get_data(response)], dataids[:3])
+        self.assertIn('after=%s' % dataids[2], response['Link'])
+
+        request = self.factory.get(
+            '/?after=%s&limit=3' % dataids[2], **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [r['_id'] for r in self._get_data(response)], dataids[3:])
+        self.assertFalse(response.has_header('Link'))
+
+        request = self.factory.get('/?after=INVALID', **self.extra)
+        response = view(request, pk=formid)
+        self.assertEqual(response.status_code, 400)
+
+    def test_data_ndjson(self):
+        self._make_submissions()
+        view = DataViewSet.as_view({'get': 'list'})
+        formid = self.xform.pk
+        request = self.factory.get('/', **self.extra)
+        response = view(request, pk=formid, format='ndjson')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = self._get_response_content(response).splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(
+            sorted(json.loads(line)['_id'] for line in lines),
+            sorted(self.xform.instances.values_list('pk', flat=True)))
+
+    def test_data_jsonp(self):
+        self._make_submissions()
+        view = DataViewSet.as_view({'get': 'list'})
+        formid = self.xform.pk
+        request = self.factory.get('/?callback=jsonpCallback', **self.extra)
+        response = view(request, pk=formid, format='jsonp')
+        self.assertEqual(response.status_code, 200)
+        content = self._get_response_content(response)
+        self.assertTrue(content.startswith('jsonpCallback('))
+        self.assertTrue(content.endswith(')'))
+        self.assertEqual(len(json.loads(content[len('jsonpCallback('):-1])),
+                         4)
 
     def test_anon_data_list(self):
         self._make_submissions()
@@ -354,11 +412,11 @@ class TestDataViewSet(TestBase):
         response = view(request, pk=formid)
 
         self.assertEqual(response.status_code, 200)
-        self.assertIsInstance(response.data, list)
+        self.assertIsInstance(self._get_data(response), list)
         self.assertTrue(self.xform.instances.count())
         dataid = self.xform.instances.all().order_by('id')[0].pk
         data = _data_instance(dataid)
-        self.assertDictContainsSubset(data, sorted(response.data)[0])
+        self.assertDictContainsSubset(data, sorted(self._get_data(response))[0])
 
         # access to a public data as other user
         self._create_user_and_login('alice', 'alice')
@@ -368,11 +426,11 @@ class TestDataViewSet(TestBase):
         response = view(request, pk=formid)
 
         self.assertEqual(response.status_code, 200)
-        self.assertIsInstance(response.data, list)
+        self.assertIsInstance(self._get_data(response), list)
         self.assertTrue(self.xform.instances.count())
         dataid = self.xform.instances.all().order_by('id')[0].pk
         data = _data_instance(dataid)
-        self.assertDictContainsSubset(data, sorted(response.data)[0])
+        self.assertDictContainsSubset(data, sorted(self._get_data(response))[0])
 
     def test_data_w_attachment(self):
         self._submit_transport_instance_w_attachment()
@@ -386,7 +444,7 @@ class TestDataViewSet(TestBase):
         self.assertEqual(response.data, data)
         response = view(request, pk=formid)
         self.assertEqual(response.status_code, 200)
-        self.assertIsInstance(response.data, list)
+        self.assertIsInstance(self._get_data(response), list)
         self.assertTrue(self.xform.instances.count())
         dataid = self.xform.instances.all().order_by('id')[0].pk
 
@@ -406,7 +464,7 @@ class TestDataViewSet(TestBase):
             u'_status': u'submitted_via_web',
             u'_id': dataid
         }
-        self.assertDictContainsSubset(data, sorted(response.data)[0])
+        self.assertDictContainsSubset(data, sorted(self._get_data(response))[0])
 
         data = {
             u'_xform_id_string': u'transportation_2011_07_25',
@@ -1,4 +1,5 @@
 # coding=utf-8
+import csv
 import json
 import os
 import re
@@ -21,6 +22,7 @@ from onadata.libs.permissions import (
     OwnerRole, ReadOnlyRole, ManagerRole, DataEntryRole, EditorRole)
 from onadata.libs.serializers.xform_serializer import XFormSerializer
 from onadata.apps.main.models import MetaData
+from onadata.apps.viewer.models.export import Export
 
 
 @urlmatch(netloc=r'(.*\.)?enketo\.formhub\.org$')
@@ -84,7 +86,7 @@ class TestXFormViewSet(TestAbstractViewSet):
         # instantiate date that is NOT naive; timezone is enabled
         current_timzone_name = timezone.get_current_timezone_name()
         current_timezone = pytz.timezone(current_timzone_name)
-        today = datetime.today()
+        today = timezone.localtime(timezone.now())
         current_date = current_timezone.localize(
             datetime(today.year,
                      today.month,
@@ -565,6 +567,38 @@ class TestXFormViewSet(TestAbstractViewSet):
         }
         self.assertEqual(data, XFormSerializer(None).data)
 
+    def test_filtered_csv_exports_are_streamed(self):
+        self._publish_xls_form_to_project()
+        self._make_submissions()
+        view = XFormViewSet.as_view({
+            'get': 'retrieve'
+        })
+        instance = self.xform.instances.all()[0]
+        data = {'query': json.dumps({'_uuid': instance.uuid})}
+        request = self.factory.get('/', data=data, **self.extra)
+
+        response = view(request, pk=self.xform.pk, format='csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(
+            StringIO(''.join(response.streaming_content))))
+        self.assertEqual(len(rows), 2)
+        self.assertIn(instance.uuid, rows[1])
+
+        response = view(request, pk=self.xform.pk, format='csvzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        zip_file = zipfile.ZipFile(
+            StringIO(''.join(response.streaming_content)))
+        self.assertIsNone(zip_file.testzip())
+        rows = list(csv.reader(StringIO(zip_file.read(
+            '%s.csv' % self.xform.data_dictionary().survey.name))))
+        self.assertEqual(len(rows), 2)
+        self.assertIn(instance.uuid, rows[1])
+
+        # filtered exports are not kept
+        self.assertFalse(Export.objects.filter(xform=self.xform).exists())
+
     def test_external_export(self):
         self._publish_xls_form_to_project()
 
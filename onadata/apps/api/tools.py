@@ -1,7 +1,6 @@
 import os
 
 from datetime import datetime
-import numpy as np
 import inspect
 import re
 import time
@@ -32,13 +31,12 @@ from onadata.apps.main.forms import QuickConverter
 from onadata.apps.main.models import UserProfile
 from onadata.apps.logger.models.xform import XForm
 from onadata.apps.viewer.models.parsed_instance import datetime_from_str
-from onadata.libs.data.query import get_field_records
+from onadata.libs.data.query import get_numeric_field_stats
 from onadata.libs.data.query import get_numeric_fields
 from onadata.libs.utils.logger_tools import publish_form
 from onadata.libs.utils.logger_tools import response_with_mimetype_and_name
 from onadata.libs.utils.user_auth import check_and_set_form_by_id
 from onadata.libs.utils.user_auth import check_and_set_form_by_id_string
-from onadata.libs.data.statistics import _chk_asarray
 from onadata.libs.permissions import get_object_users_with_permissions,\
     get_role_in_org
 from onadata.libs.permissions import OwnerRole, ReadOnlyRole
@@ -285,94 +283,59 @@ def publish_project_xform(request, project):
     return xform
 
 
-def mode(a, axis=0):
-    """
-    Adapted from
-    https://github.com/scipy/scipy/blob/master/scipy/stats/stats.py#L568
-    """
-    a, axis = _chk_asarray(a, axis)
-    scores = np.unique(np.ravel(a))       # get ALL unique values
-    testshape = list(a.shape)
-    testshape[axis] = 1
-    oldmostfreq = np.zeros(testshape)
-    oldcounts = np.zeros(testshape)
-    for score in scores:
-        template = (a == score)
-        counts = np.expand_dims(np.sum(template, axis), axis)
-        mostfrequent = np.where(counts > oldcounts, score, oldmostfreq)
-        oldcounts = np.maximum(counts, oldcounts)
-        oldmostfreq = mostfrequent
-    return mostfrequent, oldcounts
+def _get_stats(xform, field=None):
+    fields = [field] if field else get_numeric_fields(xform)
+    stats = get_numeric_field_stats(xform, fields)
+    if field and not stats[field]['count']:
+        raise ValueError(_(u"Field %s has no numeric values.") % field)
+    return [(field_name, stats[field_name]) for field_name in fields]
 
 
-def get_median_for_field(field, xform):
-    return np.median(get_field_records(field, xform))
+def _round(value):
+    return None if value is None else round(value, DECIMAL_PRECISION)
 
 
-def get_median_for_numeric_fields_in_form(xform, field=None):
-    data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        median = get_median_for_field(field_name, xform)
-        data.update({field_name: median})
-    return data
+def _range(field_stats):
+    if field_stats['count']:
+        return field_stats['max'] - field_stats['min']
 
 
-def get_mean_for_field(field, xform):
-    return np.mean(get_field_records(field, xform))
+def get_median_for_numeric_fields_in_form(xform, field=None):
+    return dict((field_name, field_stats['median'])
+                for field_name, field_stats in _get_stats(xform, field))
 
 
 def get_mean_for_numeric_fields_in_form(xform, field):
-    data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        mean = get_mean_for_field(field_name, xform)
-        data.update({field_name: round(mean, DECIMAL_PRECISION)})
-    return data
-
-
-def get_mode_for_field(field, xform):
-    a = np.array(get_field_records(field, xform))
-    m, count = mode(a)
-    return m
+    return dict((field_name, _round(field_stats['mean']))
+                for field_name, field_stats in _get_stats(xform, field))
 
 
 def get_mode_for_numeric_fields_in_form(xform, field=None):
-    data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        mode = get_mode_for_field(field_name, xform)
-        data.update({field_name: round(mode, DECIMAL_PRECISION)})
-    return data
-
-
-def get_min_max_range_for_field(field, xform):
-    a = np.array(get_field_records(field, xform))
-    _max = np.max(a)
-    _min = np.min(a)
-    _range = _max - _min
-    return _min, _max, _range
+    return dict((field_name, _round(field_stats['mode']))
+                for field_name, field_stats in _get_stats(xform, field))
 
 
 def get_min_max_range(xform, field=None):
     data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        _min, _max, _range = get_min_max_range_for_field(field_name, xform)
-        data[field_name] = {'max': _max, 'min': _min, 'range': _range}
+    for field_name, field_stats in _get_stats(xform, field):
+        data[field_name] = {
+            'max': field_stats['max'],
+            'min': field_stats['min'],
+            'range': _range(field_stats)
+        }
     return data
 
 
 def get_all_stats(xform, field=None):
     data = {}
-    for field_name in [field] if field else get_numeric_fields(xform):
-        _min, _max, _range = get_min_max_range_for_field(field_name, xform)
-        mode = get_mode_for_field(field_name, xform)
-        mean = get_mean_for_field(field_name, xform)
-        median = get_median_for_field(field_name, xform)
+    for field_name, field_stats in _get_stats(xform, field):
         data[field_name] = {
-            'mean': round(mean, DECIMAL_PRECISION),
-            'median': median,
-            'mode': round(mode, DECIMAL_PRECISION),
-            'max': _max,
-            'min': _min,
-            'range': _range
+            'mean': _round(field_stats['mean']),
+            'median': field_stats['median'],
+            'mode': _round(field_stats['mode']),
+            'max': field_stats['max'],
+            'min': field_stats['min'],
+            'range': _range(field_stats)
         }
     return data
 
@@ -1,4 +1,5 @@
 import json
+from functools import partial
 
 from django.db.models import Q
 from django.http import Http404
@@ -12,6 +13,7 @@ from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.exceptions import ParseError, PermissionDenied
 from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
 
 from onadata.apps.api.viewsets.xform_viewset import custom_response_handler
 from onadata.apps.api.tools import add_tags_to_instance, \
@@ -28,8 +30,12 @@ from onadata.libs.permissions import CAN_CHANGE_XFORM
 from onadata.libs.serializers.data_serializer import (
     DataSerializer, DataListSerializer, DataInstanceSerializer)
 from onadata.libs import filters
+from onadata.libs.utils.decorators import DecodedCursor
+from onadata.libs.utils.streaming import JSONP, STREAMING_FORMATS,\
+    stream_records
 from onadata.libs.utils.viewer_tools import (
     EnketoError,
+    add_next_cursor_link,
     get_enketo_edit_url)
 
 
@@ -239,6 +245,25 @@ API Parameters</a>.
 >            }
 >        ]
 
+## Page through submitted data of a specific form
+Use the `after` parameter, with `0` for the first page, to get the submissions
+whose `_id` is greater than `after` in `_id` order. The `Link` header of the
+response holds the url of the next page and is left out on the last page.
+Unlike `start`, `after` is as fast on the last pages as on the first ones.
+
+<pre class="prettyprint">
+<b>GET</b> /api/v1/data/<code>{pk}</code>?<code>after</code>=<code>0\
+</code>&<code>limit</code>=<code>1000</code></pre>
+
+> Example
+>
+>       curl -X GET 'https://example.com/api/v1/data/22845?after=0&limit=1000'
+
+> Response
+>
+>       Link: <https://example.com/api/v1/data/22845?after=4503&limit=1000>; \
+rel="next"
+
 ## Query submitted data of a specific form using Tags
 Provides a list of json submitted data for a specific form matching specific
 tags. Use the `tags` query parameter to filter the list of forms, `tags`
@@ -392,11 +417,13 @@ Delete a specific submission in a form
 >
 """
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [
+        renderers.NDJSONRenderer,
         renderers.XLSRenderer,
         renderers.XLSXRenderer,
         renderers.CSVRenderer,
         renderers.CSVZIPRenderer,
         renderers.SAVZIPRenderer,
+        renderers.ParquetZIPRenderer,
         renderers.RawXMLRenderer
     ]
 
@@ -621,18 +648,48 @@ Delete a specific submission in a form
         xform = self.get_object()
         query = request.GET.get("query", {})
         export_type = kwargs.get('format')
-        if export_type is None or export_type in ['json']:
+        if export_type is None or export_type in STREAMING_FORMATS:
             # perform default viewset retrieve, no data export
 
             # With DRF ListSerializer are automatically created and wraps
             # everything in a list. Since this returns a list
             # # already, we unwrap it.
             res = super(DataViewSet, self).list(request, *args, **kwargs)
-            res.data = res.data[0]
+            records = res.data[0]
+            if not isinstance(records, DecodedCursor):
+                # only the count was requested
+                res.data = records
+                return res
+
+            if request.accepted_renderer.format in STREAMING_FORMATS:
+                res = self._get_streaming_response(request, records)
+            else:
+                res.data = list(records)
+
+            if request.query_params.get('after'):
+                limit = min(int(request.query_params.get(
+                    'limit', ParsedInstance.DEFAULT_LIMIT)),
+                    ParsedInstance.DEFAULT_LIMIT)
+                add_next_cursor_link(request, res,
+                                     ParsedInstance.get_next_cursor(
+                                         records, limit))
             return res
 
         return custom_response_handler(request, xform, query, export_type)
 
+    def _get_streaming_response(self, request, records):
+        """
+        Renders the records as they are read from Mongo instead of
+        rendering a list of all of them, in the negotiated JSON format.
+        """
+        renderer = request.accepted_renderer
+        callback = None
+        if renderer.format == JSONP:
+            callback = renderer.get_callback({'request': request})
+
+        return stream_records(records, renderer.format, callback,
+                              dumps=partial(json.dumps, cls=JSONEncoder))
+
     def modify(self, request, *args, **kwargs):
 
         xform = self.get_object()
@@ -6,7 +6,8 @@ from datetime import datetime
 from django.core.exceptions import ValidationError
 from django.core.files.storage import get_storage_class
 from django.contrib.auth.models import User
-from django.http import Http404, HttpResponseBadRequest, HttpResponseRedirect
+from django.http import Http404, HttpResponseBadRequest, \
+    HttpResponseRedirect, StreamingHttpResponse
 from django.utils.translation import ugettext as _
 from django.utils import six
 from django.shortcuts import get_object_or_404
@@ -36,11 +37,14 @@ from onadata.libs.utils.viewer_tools import enketo_url, EnketoError
 from onadata.apps.viewer.models.export import Export
 from onadata.libs.exceptions import NoRecordsFoundError, J2XException
 from onadata.libs.utils.export_tools import generate_export,\
-    should_create_new_export, generate_external_export
+    should_create_new_export, generate_external_export,\
+    generate_streaming_export, get_cached_export, get_export_key,\
+    STREAMING_EXPORT_TYPES
 from onadata.libs.utils.common_tags import SUBMISSION_TIME
 from onadata.libs.utils import log
 from onadata.libs.utils.export_tools import newset_export_for
-from onadata.libs.utils.logger_tools import response_with_mimetype_and_name
+from onadata.libs.utils.logger_tools import disposition_ext_and_date,\
+    response_with_mimetype_and_name
 from onadata.libs.utils.string import str2bool
 
 from onadata.libs.utils.csv_import import submit_csv
@@ -52,6 +56,7 @@ EXPORT_EXT = {
     'csv': Export.CSV_EXPORT,
     'csvzip': Export.CSV_ZIP_EXPORT,
     'savzip': Export.SAV_ZIP_EXPORT,
+    'parquetzip': Export.PARQUET_ZIP_EXPORT,
     'uuid': Export.EXTERNAL_EXPORT,
 }
 
@@ -76,7 +81,8 @@ def _get_extension_from_export_type(export_type):
 
     if export_type == Export.XLS_EXPORT:
         extension = 'xlsx'
-    elif export_type in [Export.CSV_ZIP_EXPORT, Export.SAV_ZIP_EXPORT]:
+    elif export_type in [Export.CSV_ZIP_EXPORT, Export.SAV_ZIP_EXPORT,
+                         Export.PARQUET_ZIP_EXPORT]:
         extension = 'zip'
 
     return extension
@@ -107,7 +113,8 @@ def _set_start_end_params(request, query):
         else:
             query = json.dumps(query)
 
-        return query
+    # an empty query is no filter
+    return query or None
 
 
 def _generate_new_export(request, xform, query, export_type):
@@ -122,10 +129,18 @@ def _generate_new_export(request, xform, query, export_type):
                 request.GET.get('meta')
             )
         else:
-            export = generate_export(
-                export_type, extension, xform.user.username,
-                xform.id_string, None, query
-            )
+            export = None
+            if query is not None:
+                # filtered exports are kept for identical requests
+                export = get_cached_export(
+                    xform, export_type,
+                    get_export_key(xform, export_type, query,
+                                   extension=extension), extension)
+            if export is None:
+                export = generate_export(
+                    export_type, extension, xform.user.username,
+                    xform.id_string, None, query
+                )
         audit = {
             "xform": xform.id_string,
             "export_type": export_type
@@ -146,6 +161,25 @@ def _generate_new_export(request, xform, query, export_type):
         return export
 
 
+def _generate_streaming_export(request, xform, query, export_type):
+    query = _set_start_end_params(request, query)
+    extension = _get_extension_from_export_type(export_type)
+
+    try:
+        chunks = generate_streaming_export(
+            export_type, xform.user.username, xform.id_string, query)
+    except NoRecordsFoundError:
+        raise Http404(_("No records found to export"))
+
+    response = StreamingHttpResponse(
+        chunks,
+        content_type="application/%s" % Export.EXPORT_MIMES[extension])
+    id_string = None if request.GET.get('raw') else xform.id_string
+    response['Content-Disposition'] = disposition_ext_and_date(
+        id_string, extension)
+    return response
+
+
 def _get_user(username):
     users = User.objects.filter(username=username)
 
@@ -188,6 +222,16 @@ def should_regenerate_export(xform, export_type, request):
         'token' in request.GET
 
 
+def should_stream_export(export_type, request):
+    """
+    Filtered exports are built for a single download and never kept, so
+    those which can be are streamed straight to the response.
+    """
+    return export_type in STREAMING_EXPORT_TYPES and (
+        'start' in request.GET or 'end' in request.GET or
+        'query' in request.GET)
+
+
 def value_for_type(form, field, value):
     if form._meta.get_field(field).get_internal_type() == 'BooleanField':
         return str2bool(value)
@@ -229,6 +273,12 @@ def custom_response_handler(request, xform, query, export_type,
             (token is not None) or (meta is not None):
         export_type = Export.EXTERNAL_EXPORT
 
+    if should_stream_export(export_type, request):
+        response = _generate_streaming_export(request, xform, query,
+                                              export_type)
+        log_export(request, xform, export_type)
+        return response
+
     # check if we need to re-generate,
     # we always re-generate if a filter is specified
     if should_regenerate_export(xform, export_type, request):
@@ -597,12 +647,13 @@ https://example.com/api/v1/forms/28058/enketo
 
 ## Get form data in xls, csv format.
 
-Get form data exported as xls, csv, csv zip, sav zip format.
+Get form data exported as xls, csv, csv zip, sav zip, parquet zip format.
 
 Where:
 
 - `pk` - is the form unique identifier
-- `format` - is the data export format i.e csv, xls, csvzip, savzip
+- `format` - is the data export format i.e csv, xls, csvzip, savzip,
+  parquetzip
 
 Params for the custom xls report
 
@@ -718,6 +769,7 @@ data (instance/submission per row)
         renderers.CSVRenderer,
         renderers.CSVZIPRenderer,
         renderers.SAVZIPRenderer,
+        renderers.ParquetZIPRenderer,
         renderers.RawXMLRenderer
     ]
     queryset = XForm.objects.all()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# vim: ai ts=4 sts=4 et sw=4 fileencoding=utf-8
+'''
+Django management command comparing the `XFormInstanceParser` engines on
+submission XML files, by default the ones used by the `logger` tests.
+
+:Example:
+    python manage.py benchmark_xform_instance_parsers
+    python manage.py benchmark_xform_instance_parsers --iterations 500 \
+        --repeats kids/kids_details some/instance.xml
+'''
+import fnmatch
+import os
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.utils.translation import ugettext_lazy
+
+from onadata.apps.logger.xform_instance_parser import EngineFallback,\
+    XFORM_INSTANCE_PARSER_ENGINES
+
+
+LOGGER_DIR = os.path.join(os.path.dirname(__file__), '..', '..')
+FIXTURE_DIRS = [os.path.join(LOGGER_DIR, 'tests'),
+                os.path.join(LOGGER_DIR, 'fixtures')]
+
+
+def _find_xml_files(directories):
+    for directory in directories:
+        for root, dirs, files in os.walk(directory):
+            for filename in sorted(fnmatch.filter(files, '*.xml')):
+                yield os.path.normpath(os.path.join(root, filename))
+
+
+class Command(BaseCommand):
+    help = ugettext_lazy("Benchmark the XForm instance parser engines.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            help='XML files to parse, defaults to the logger test fixtures.',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=100,
+            help='Number of times each file is parsed by each engine.',
+        )
+        parser.add_argument(
+            '--repeats',
+            nargs='+',
+            default=[],
+            help='Abbreviated xpaths of the repeat groups of the forms.',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or list(_find_xml_files(FIXTURE_DIRS))
+        iterations = options['iterations']
+        repeats = options['repeats']
+        engines = sorted(XFORM_INSTANCE_PARSER_ENGINES.items())
+        totals = dict((name, 0.0) for name, engine in engines)
+
+        for path in paths:
+            with open(path) as xml_file:
+                xml_str = xml_file.read()
+            results = {}
+            timings = []
+            for name, engine in engines:
+                try:
+                    results[name] = engine(xml_str, repeats)[:3]
+                except EngineFallback:
+                    timings.append(u'%s: fallback' % name)
+                    continue
+                except Exception:
+                    # not a submission, e.g. a form definition gone wrong
+                    timings.append(u'%s: error' % name)
+                    continue
+                seconds = timeit.timeit(
+                    lambda: engine(xml_str, repeats), number=iterations)
+                totals[name] += seconds
+                timings.append(u'%s: %.2fms' % (
+                    name, seconds * 1000 / iterations))
+
+            outputs = [(root_name, d, sorted(attributes))
+                       for root_name, d, attributes in results.values()]
+            if any(output != outputs[0] for output in outputs):
+                timings.append(u'OUTPUTS DIFFER')
+            self.stdout.write(u'%s  %s' % (path, u'  '.join(timings)))
+
+        self.stdout.write(u'Total for %d files x %d iterations: %s' % (
+            len(paths), iterations, u'  '.join(
+                u'%s: %.3fs' % (name, seconds)
+                for name, seconds in sorted(totals.items()))))
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# vim: ai ts=4 sts=4 et sw=4 fileencoding=utf-8
+'''
+Django management command managing the partial expression indexes of
+`logger_instance` on the answers to chosen fields of chosen forms, which
+the stats, charts and submission stats queries of large forms use, and
+reporting their size and usage.
+
+Without `--xform-id`, lists the indexes with the number of times each was
+scanned since the statistics of Postgres were last reset.
+
+:Example:
+    python manage.py json_field_indexes
+    python manage.py json_field_indexes --xform-id 12 --fields age income \
+        --numeric
+    python manage.py json_field_indexes --xform-id 12 --fields age --drop
+    python manage.py json_field_indexes --drop-orphans
+'''
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import ugettext_lazy
+
+from onadata.apps.logger.models import XForm
+from onadata.apps.logger.models.json_field_index import JSONFieldIndex,\
+    drop_json_field_index, get_json_field_index_usage
+
+
+class Command(BaseCommand):
+    help = ugettext_lazy("Create, drop and report the expression indexes "
+                         "on the answers to fields of forms.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--xform-id',
+            type=int,
+            help=ugettext_lazy("Form whose fields are indexed"))
+        parser.add_argument(
+            '--fields',
+            nargs='+',
+            default=[],
+            help=ugettext_lazy("Xpaths of the fields to index"))
+        parser.add_argument(
+            '--numeric',
+            action='store_true',
+            default=False,
+            help=ugettext_lazy("Index the answers as numbers, as the stats "
+                               "read them, rather than as text"))
+        parser.add_argument(
+            '--drop',
+            action='store_true',
+            default=False,
+            help=ugettext_lazy("Drop the indexes of the fields instead"))
+        parser.add_argument(
+            '--drop-orphans',
+            action='store_true',
+            default=False,
+            help=ugettext_lazy("Drop the indexes left by deleted forms"))
+
+    def handle(self, *args, **options):
+        if options['drop_orphans']:
+            self._drop_orphans()
+        elif options['xform_id'] is not None:
+            self._update_indexes(options)
+        else:
+            self._report()
+
+    def _update_indexes(self, options):
+        try:
+            xform = XForm.objects.get(pk=options['xform_id'])
+        except XForm.DoesNotExist:
+            raise CommandError(u'No form with id %d' % options['xform_id'])
+        if not options['fields']:
+            raise CommandError(u'Expecting --fields')
+
+        kind = JSONFieldIndex.NUMERIC if options['numeric'] else\
+            JSONFieldIndex.TEXT
+        for field in options['fields']:
+            if options['drop']:
+                for index in JSONFieldIndex.objects.filter(
+                        xform=xform, field=field, kind=kind):
+                    index.drop_index()
+                    index.delete()
+                    self.stdout.write(u'Dropped %s' % index.index_name)
+            else:
+                index, created = JSONFieldIndex.objects.get_or_create(
+                    xform=xform, field=field, kind=kind)
+                index.create_index()
+                self.stdout.write(u'Created %s on %s' % (
+                    index.index_name, index))
+
+    def _drop_orphans(self):
+        names = set(index.index_name
+                    for index in JSONFieldIndex.objects.all())
+        for name in sorted(get_json_field_index_usage()):
+            if name not in names:
+                drop_json_field_index(name)
+                self.stdout.write(u'Dropped %s' % name)
+
+    def _report(self):
+        usage = get_json_field_index_usage()
+        for index in JSONFieldIndex.objects.select_related(
+                'xform').order_by('xform', 'field'):
+            stats = usage.pop(index.index_name, None)
+            if stats is None:
+                self.stdout.write(u'%s: %s of %s, missing' % (
+                    index.index_name, index.field, index.xform.id_string))
+                continue
+            self.stdout.write(
+                u'%s: %s (%s) of %s, %d kB, %d scans, %d rows read' % (
+                    index.index_name, index.field, index.kind,
+                    index.xform.id_string, stats['size'] / 1024,
+                    stats['scans'], stats['tuples_read']))
+        for name in sorted(usage):
+            self.stdout.write(u'%s: orphaned, %d kB' % (
+                name, usage[name]['size'] / 1024))
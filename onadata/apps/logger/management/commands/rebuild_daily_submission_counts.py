@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# vim: ai ts=4 sts=4 et sw=4 fileencoding=utf-8
+'''
+Django management command counting the daily submission counts of forms from
+their submissions, for the forms published before the counts existed or whose
+counts are suspected to be wrong. Once counted, the counts of a form are kept
+up to date as submissions are made and deleted.
+
+:Example:
+    python manage.py rebuild_daily_submission_counts --missing
+    python manage.py rebuild_daily_submission_counts --usernames someuser
+    python manage.py rebuild_daily_submission_counts --xform-ids 12 13
+'''
+from django.core.management.base import BaseCommand
+from django.utils.translation import ugettext_lazy
+
+from onadata.apps.logger.models import XForm
+from onadata.apps.logger.models.daily_submission_count import\
+    rebuild_daily_submission_counts
+from onadata.libs.utils.model_tools import queryset_iterator
+
+
+class Command(BaseCommand):
+    help = ugettext_lazy("Count the daily submission counts of forms from "
+                         "their submissions.")
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument(
+            '--all',
+            action='store_true',
+            help=ugettext_lazy("Rebuild the counts of every form"))
+        group.add_argument(
+            '--missing',
+            action='store_true',
+            help=ugettext_lazy("Rebuild the counts of the forms which do not "
+                               "have them"))
+        group.add_argument(
+            '--usernames',
+            nargs='+',
+            help=ugettext_lazy("Rebuild the counts of the forms of these "
+                               "users"))
+        group.add_argument(
+            '--xform-ids',
+            nargs='+',
+            type=int,
+            help=ugettext_lazy("Rebuild the counts of these forms"))
+
+    def handle(self, *args, **options):
+        xforms = XForm.objects.all()
+        if options['missing']:
+            xforms = xforms.exclude(has_daily_submission_counts=True)
+        elif options['usernames']:
+            xforms = xforms.filter(user__username__in=options['usernames'])
+        elif options['xform_ids']:
+            xforms = xforms.filter(pk__in=options['xform_ids'])
+
+        rebuilt = 0
+        for xform in queryset_iterator(xforms):
+            rebuild_daily_submission_counts(xform)
+            rebuilt += 1
+            self.stdout.write(u'Rebuilt the daily submission counts of %s '
+                              u'(%d)' % (xform.id_string, xform.pk))
+        self.stdout.write(u'Rebuilt the daily submission counts of %d forms'
+                          % rebuilt)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# vim: ai ts=4 sts=4 et sw=4 fileencoding=utf-8
+'''
+Django management command counting the field summaries of forms from their
+submissions, for the forms published before the summaries existed or whose
+summaries are suspected to be wrong. Once counted, the summaries of a form
+are kept up to date as submissions are made, edited and deleted.
+
+:Example:
+    python manage.py rebuild_field_summaries --missing
+    python manage.py rebuild_field_summaries --usernames someuser
+    python manage.py rebuild_field_summaries --xform-ids 12 13
+'''
+from django.core.management.base import BaseCommand
+from django.utils.translation import ugettext_lazy
+
+from onadata.apps.logger.models import XForm
+from onadata.apps.logger.models.field_value_count import\
+    rebuild_field_summaries
+from onadata.libs.utils.model_tools import queryset_iterator
+
+
+class Command(BaseCommand):
+    help = ugettext_lazy("Count the field summaries of forms from their "
+                         "submissions.")
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group(required=True)
+        group.add_argument(
+            '--all',
+            action='store_true',
+            help=ugettext_lazy("Rebuild the summaries of every form"))
+        group.add_argument(
+            '--missing',
+            action='store_true',
+            help=ugettext_lazy("Rebuild the summaries of the forms which do "
+                               "not have them"))
+        group.add_argument(
+            '--usernames',
+            nargs='+',
+            help=ugettext_lazy("Rebuild the summaries of the forms of these "
+                               "users"))
+        group.add_argument(
+            '--xform-ids',
+            nargs='+',
+            type=int,
+            help=ugettext_lazy("Rebuild the summaries of these forms"))
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help=ugettext_lazy("Number of summary rows written per query"))
+
+    def handle(self, *args, **options):
+        xforms = XForm.objects.all()
+        if options['missing']:
+            xforms = xforms.exclude(has_field_summaries=True)
+        elif options['usernames']:
+            xforms = xforms.filter(user__username__in=options['usernames'])
+        elif options['xform_ids']:
+            xforms = xforms.filter(pk__in=options['xform_ids'])
+
+        rebuilt = 0
+        for xform in queryset_iterator(xforms):
+            rebuild_field_summaries(xform, options['chunk_size'])
+            rebuilt += 1
+            self.stdout.write(u'Rebuilt the field summaries of %s (%d)' % (
+                xform.id_string, xform.pk))
+        self.stdout.write(u'Rebuilt the field summaries of %d forms'
+                          % rebuilt)
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import onadata.apps.logger.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0011_add-index-to-instance-uuid_and_xform_uuid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FieldValueCount',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('field', models.CharField(max_length=255)),
+                ('value', models.CharField(max_length=255, null=True)),
+                ('count', models.IntegerField(default=0)),
+                ('xform', models.ForeignKey(related_name='field_value_counts', to='logger.XForm')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='xform',
+            name='has_field_summaries',
+            field=onadata.apps.logger.fields.LazyDefaultBooleanField(default=False),
+        ),
+        migrations.AlterUniqueTogether(
+            name='fieldvaluecount',
+            unique_together=set([('xform', 'field', 'value')]),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0012_fieldvaluecount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JSONFieldIndex',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('field', models.CharField(max_length=255)),
+                ('kind', models.CharField(default='text', max_length=10, choices=[('text', 'Text'), ('numeric', 'Numeric')])),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('xform', models.ForeignKey(related_name='json_field_indexes', to='logger.XForm')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='jsonfieldindex',
+            unique_together=set([('xform', 'field', 'kind')]),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import onadata.apps.logger.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0013_jsonfieldindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySubmissionCount',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('xform', models.ForeignKey(related_name='daily_submission_counts', to='logger.XForm')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='xform',
+            name='has_daily_submission_counts',
+            field=onadata.apps.logger.fields.LazyDefaultBooleanField(default=False),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailysubmissioncount',
+            unique_together=set([('xform', 'day')]),
+        ),
+    ]
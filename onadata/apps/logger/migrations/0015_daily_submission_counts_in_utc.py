@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logger', '0014_dailysubmissioncount'),
+    ]
+
+    # `_submission_time` is no longer counted in the field summaries but by
+    # the daily submission counts, which are now by day in UTC: they have to
+    # be counted again with the `rebuild_daily_submission_counts` command,
+    # the submissions being queried meanwhile.
+
+    operations = [
+        migrations.RunSQL(
+            "DELETE FROM logger_fieldvaluecount "
+            "WHERE field = '_submission_time';"
+        ),
+        migrations.RunSQL(
+            "UPDATE logger_xform SET has_daily_submission_counts = NULL "
+            "WHERE has_daily_submission_counts IS NOT NULL;"
+        ),
+        migrations.RunSQL(
+            "DELETE FROM logger_dailysubmissioncount;"
+        ),
+    ]
@@ -1,5 +1,9 @@
 from onadata.apps.logger.models.attachment import Attachment  # flake8: noqa
 from onadata.apps.logger.models.instance import Instance
+from onadata.apps.logger.models.daily_submission_count import\
+    DailySubmissionCount
+from onadata.apps.logger.models.field_value_count import FieldValueCount
+from onadata.apps.logger.models.json_field_index import JSONFieldIndex
 from onadata.apps.logger.models.survey_type import SurveyType
 from onadata.apps.logger.models.xform import XForm
 from onadata.apps.logger.xform_instance_parser import InstanceParseError
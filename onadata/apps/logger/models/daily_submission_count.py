@@ -0,0 +1,89 @@
+from collections import Counter
+
+from django.db import connection, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from onadata.apps.logger.models.xform import XForm
+
+
+class DailySubmissionCount(models.Model):
+    """
+    The number of submissions of `xform`, not deleted, received on `day` in
+    UTC, the day of their `_submission_time`: the rollup read by the
+    submission stats, the dashboards and the `_submission_time` charts,
+    kept up to date as submissions are made and deleted.
+    """
+    xform = models.ForeignKey(XForm, related_name='daily_submission_counts')
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        app_label = 'logger'
+        unique_together = (('xform', 'day'),)
+
+
+def get_submission_day(date_created):
+    """The day, in UTC, of `date_created`."""
+    return timezone.localtime(date_created, timezone.utc).date()
+
+
+def update_daily_submission_counts(xform_id, counts):
+    """
+    Adds `counts`, a `Counter` of days which may be negative, to the daily
+    submission counts of the form.
+
+    The caller must hold the lock on the row of the form in `logger_xform`,
+    which all the writers of the counts of a form take, and must have
+    checked that the form `has_daily_submission_counts`.
+    """
+    for day, count in counts.items():
+        if not count:
+            continue
+        updated = DailySubmissionCount.objects.filter(
+            xform_id=xform_id, day=day).update(count=F('count') + count)
+        # rows are only ever added for positive counts, since the rows of a
+        # form being deleted may already be gone
+        if not updated and count > 0:
+            DailySubmissionCount.objects.create(
+                xform_id=xform_id, day=day, count=count)
+
+
+def count_submissions_per_day(xform):
+    """
+    Counts the submissions of `xform`, not deleted, per day from
+    `logger_instance`, for the forms without daily submission counts.
+    """
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT (date_created AT TIME ZONE 'UTC')::date AS day, COUNT(*) "
+        "FROM logger_instance WHERE xform_id = %s AND deleted_at IS NULL "
+        "GROUP BY day",
+        [xform.pk])
+    return Counter(dict(cursor.fetchall()))
+
+
+def get_daily_submission_counts(xform):
+    """Returns the `(day, count)`s of the submissions of `xform` by day."""
+    if xform.has_daily_submission_counts:
+        return list(xform.daily_submission_counts.filter(
+            count__gt=0).order_by('day').values_list('day', 'count'))
+    return sorted(count_submissions_per_day(xform).items())
+
+
+def rebuild_daily_submission_counts(xform):
+    """
+    Counts the submissions of `xform` per day again and marks it as having
+    daily submission counts, so that they are kept up to date from then on.
+    """
+    with transaction.atomic():
+        # submissions made meanwhile wait for the lock and, once it is
+        # released, find the form marked and update its counts
+        list(XForm.objects.select_for_update().filter(pk=xform.pk))
+        DailySubmissionCount.objects.filter(xform=xform).delete()
+        DailySubmissionCount.objects.bulk_create([
+            DailySubmissionCount(xform=xform, day=day, count=count)
+            for day, count in count_submissions_per_day(xform).items()])
+        XForm.objects.filter(pk=xform.pk).update(
+            has_daily_submission_counts=True)
+    xform.has_daily_submission_counts = True
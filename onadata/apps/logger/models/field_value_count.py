@@ -0,0 +1,187 @@
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, models, transaction
+
+from onadata.apps.logger.models.xform import XForm
+from onadata.libs.utils.form_schema_cache import get_form_schema
+
+
+DEFAULT_FIELD_SUMMARY_CHUNK_SIZE = 1000
+# distinct values counted per field, beyond which its summary is given up
+DEFAULT_FIELD_SUMMARY_MAX_VALUES = 1000
+MAX_VALUE_LENGTH = 255
+day_re = re.compile(r'^\d{4}-\d{2}-\d{2}')
+
+
+class FieldValueCount(models.Model):
+    """
+    The number of submissions of `xform`, not deleted, answering `value` to
+    `field`: together, the field summaries of the form, kept up to date as
+    submissions are made, edited and deleted.
+
+    The fields are those of `FormSchema.summary_fields`, answers to date
+    fields being counted by day. A `value` of None marks a field whose
+    summary must not be used, and is no longer kept, because it has answers
+    which could not be counted, e.g. too long ones, or more distinct values
+    than `FIELD_SUMMARY_MAX_VALUES`, e.g. continuous numbers: the readers
+    query the submissions for it instead.
+    """
+    xform = models.ForeignKey(XForm, related_name='field_value_counts')
+    field = models.CharField(max_length=255)
+    value = models.CharField(max_length=MAX_VALUE_LENGTH, null=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        app_label = 'logger'
+        unique_together = (('xform', 'field', 'value'),)
+
+
+def _summary_value(value, by_day):
+    if isinstance(value, (int, long, float)) and not isinstance(value, bool):
+        value = unicode(value)
+    if not isinstance(value, basestring):
+        return None
+    if by_day:
+        # as `to_char(to_date(value, 'YYYY-MM-DD'), 'YYYY-MM-DD')` does
+        return value[:10] if day_re.match(value) else None
+    return value if len(value) <= MAX_VALUE_LENGTH else None
+
+
+def get_summary_counts(xform, doc, deleted_at=None):
+    """
+    Returns the counts a submission with the JSON `doc` adds to the field
+    summaries of `xform`, as a `Counter` of `(field, value)`s; nothing if it
+    is deleted.
+    """
+    counts = Counter()
+    if deleted_at is not None or not doc:
+        return counts
+    for field, by_day in get_form_schema(xform).summary_fields.items():
+        if doc.get(field) is not None:
+            counts[(field, _summary_value(doc[field], by_day))] += 1
+    return counts
+
+
+def _get_max_values():
+    return getattr(settings, 'FIELD_SUMMARY_MAX_VALUES',
+                   DEFAULT_FIELD_SUMMARY_MAX_VALUES)
+
+
+def _mark_fields(xform_id, fields):
+    # give up the summaries of `fields`, see `FieldValueCount`
+    FieldValueCount.objects.filter(
+        xform_id=xform_id, field__in=fields).delete()
+    FieldValueCount.objects.bulk_create([
+        FieldValueCount(xform_id=xform_id, field=field, value=None)
+        for field in fields])
+
+
+def update_field_summaries(xform_id, counts):
+    """
+    Adds `counts`, a `Counter` of `(field, value)`s which may be negative, to
+    the field summaries of the form, giving up those of the fields which get
+    an answer which cannot be counted or too many distinct values.
+
+    The caller must hold the lock on the row of the form in `logger_xform`,
+    which all the writers of the summaries of a form take, and must have
+    checked that the form `has_field_summaries`.
+    """
+    counts = dict((key, count) for key, count in counts.items() if count)
+    if not counts:
+        return
+    marked = set(FieldValueCount.objects.filter(
+        xform_id=xform_id, field__in=set(field for field, value in counts),
+        value__isnull=True).values_list('field', flat=True))
+    newly_marked = set(field for (field, value), count in counts.items()
+                       if value is None and count > 0) - marked
+    if newly_marked:
+        _mark_fields(xform_id, newly_marked)
+    counts = sorted((key, count) for key, count in counts.items()
+                    if key[0] not in marked | newly_marked)
+    if not counts:
+        return
+
+    cursor = connection.cursor()
+    cursor.execute(
+        "UPDATE logger_fieldvaluecount AS c SET count = c.count + d.count "
+        "FROM (VALUES %s) AS d (field, value, count) "
+        "WHERE c.xform_id = %%s AND c.field = d.field AND c.value = d.value "
+        "RETURNING c.field, c.value" % ', '.join(['(%s, %s, %s)'] * len(
+            counts)),
+        [param for (field, value), count in counts
+         for param in (field, value, count)] + [xform_id])
+    updated = set(cursor.fetchall())
+    # rows are only ever added for positive counts, since the rows of a form
+    # being deleted may already be gone
+    added = [FieldValueCount(xform_id=xform_id, field=field, value=value,
+                             count=count)
+             for (field, value), count in counts
+             if count > 0 and (field, value) not in updated]
+    if not added:
+        return
+    FieldValueCount.objects.bulk_create(added)
+    fields = set(row.field for row in added)
+    over = [field for field, values in FieldValueCount.objects.filter(
+        xform_id=xform_id, field__in=fields).values('field').annotate(
+        num_values=models.Count('pk')).values_list('field', 'num_values')
+        if values > _get_max_values()]
+    if over:
+        _mark_fields(xform_id, over)
+
+
+def _count_field_summaries(xform, fields):
+    """
+    Returns the `(field, value, count)`s of the submissions of `xform`, not
+    deleted, counted in a single query with the values `_summary_value()`
+    gives, and a `(field, None, 0)` instead for the fields whose summary is
+    given up, see `FieldValueCount`.
+    """
+    cursor = connection.cursor()
+    cursor.execute(
+        "WITH counts AS (SELECT f.field, CASE "
+        "WHEN json_typeof(i.json->f.field) NOT IN ('string', 'number') "
+        "THEN NULL "
+        "WHEN f.by_day THEN CASE WHEN i.json->>f.field ~ %s "
+        "THEN left(i.json->>f.field, 10) END "
+        "WHEN length(i.json->>f.field) <= %s THEN i.json->>f.field "
+        "END AS value, COUNT(*) AS count "
+        "FROM logger_instance AS i, "
+        "unnest(%s::text[], %s::boolean[]) AS f (field, by_day) "
+        "WHERE i.xform_id = %s AND i.deleted_at IS NULL "
+        "AND json_typeof(i.json->f.field) <> 'null' "
+        "GROUP BY f.field, value), "
+        "checked AS (SELECT field, value, count, "
+        "bool_or(value IS NULL) OVER w OR COUNT(*) OVER w > %s AS given_up "
+        "FROM counts WINDOW w AS (PARTITION BY field)) "
+        "SELECT field, value, count FROM checked WHERE NOT given_up "
+        "UNION ALL SELECT DISTINCT field, NULL, 0 FROM checked "
+        "WHERE given_up",
+        [day_re.pattern, MAX_VALUE_LENGTH, fields.keys(), fields.values(),
+         xform.pk, _get_max_values()])
+    return cursor.fetchall()
+
+
+def rebuild_field_summaries(xform, chunk_size=None):
+    """
+    Counts the field summaries of `xform` again from its submissions and
+    marks it as having them, so that they are kept up to date from then on.
+    """
+    chunk_size = chunk_size or getattr(
+        settings, 'FIELD_SUMMARY_CHUNK_SIZE', DEFAULT_FIELD_SUMMARY_CHUNK_SIZE)
+    fields = get_form_schema(xform).summary_fields
+    with transaction.atomic():
+        # submissions made meanwhile wait for the lock and, once it is
+        # released, find the form marked and update its summaries; counting
+        # in a single query keeps them waiting as little as possible
+        list(XForm.objects.select_for_update().filter(pk=xform.pk))
+        FieldValueCount.objects.filter(xform=xform).delete()
+        FieldValueCount.objects.bulk_create([
+            FieldValueCount(xform=xform, field=field, value=value,
+                            count=count)
+            for field, value, count in _count_field_summaries(
+                xform, fields)],
+            batch_size=chunk_size)
+        XForm.objects.filter(pk=xform.pk).update(has_field_summaries=True)
+    xform.has_field_summaries = True
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+from collections import Counter
 from datetime import datetime
 from hashlib import sha256
 
@@ -9,6 +10,7 @@ from django.db import transaction
 from django.contrib.gis.db import models
 from django.db.models.signals import post_save
 from django.db.models.signals import post_delete
+from django.db.models.signals import pre_save
 from django.contrib.auth.models import User
 from django.contrib.gis.geos import GeometryCollection, Point
 from django.utils import timezone
@@ -16,13 +18,18 @@ from django.utils.translation import ugettext as _
 from jsonfield import JSONField
 from taggit.managers import TaggableManager
 
+from onadata.apps.logger.models.daily_submission_count import\
+    get_submission_day, update_daily_submission_counts
+from onadata.apps.logger.models.field_value_count import\
+    get_summary_counts, update_field_summaries
 from onadata.apps.logger.models.survey_type import SurveyType
 from onadata.apps.logger.models.xform import XForm
 from onadata.apps.logger.xform_instance_parser import XFormInstanceParser,\
-    clean_and_parse_xml, get_uuid_from_xml
+    clean_and_parse_xml, get_uuid_from_xml, get_id_string_from_xml_obj
 from onadata.libs.utils.common_tags import ATTACHMENTS, BAMBOO_DATASET_ID,\
     DELETEDAT, GEOLOCATION, ID, MONGO_STRFTIME, NOTES, SUBMISSION_TIME, TAGS,\
     UUID, XFORM_ID_STRING, SUBMITTED_BY
+from onadata.libs.utils.form_schema_cache import get_form_schema
 from onadata.libs.utils.model_tools import set_uuid
 from onadata.apps.logger.fields import LazyDefaultBooleanField
 from onadata.apps.logger.exceptions import DuplicateUUIDError, FormInactiveError
@@ -31,25 +38,7 @@ from onadata.apps.logger.exceptions import DuplicateUUIDError, FormInactiveError
 # need to establish id_string of the xform before we run get_dict since
 # we now rely on data dictionary to parse the xml
 def get_id_string_from_xml_str(xml_str):
-    xml_obj = clean_and_parse_xml(xml_str)
-    root_node = xml_obj.documentElement
-    id_string = root_node.getAttribute(u"id")
-
-    if len(id_string) == 0:
-        # may be hidden in submission/data/id_string
-        elems = root_node.getElementsByTagName('data')
-
-        for data in elems:
-            for child in data.childNodes:
-                id_string = data.childNodes[0].getAttribute('id')
-
-                if len(id_string) > 0:
-                    break
-
-            if len(id_string) > 0:
-                break
-
-    return id_string
+    return get_id_string_from_xml_obj(clean_and_parse_xml(xml_str))
 
 
 def submission_time():
@@ -63,7 +52,6 @@ def update_xform_submission_count(sender, instance, created, **kwargs):
     if getattr(instance, 'defer_counting', False):
         return
     with transaction.atomic():
-        xform = XForm.objects.only('user_id').get(pk=instance.xform_id)
         # Update with `F` expression instead of `select_for_update` to avoid
         # locks, which were mysteriously piling up during periods of high
         # traffic
@@ -71,6 +59,17 @@ def update_xform_submission_count(sender, instance, created, **kwargs):
             num_of_submissions=F('num_of_submissions') + 1,
             last_submission_time=instance.date_created,
         )
+        # Read after the update, which locks the form until the end of the
+        # transaction, so that the field summaries cannot be rebuilt meanwhile
+        xform = XForm.objects.only(
+            'user_id', 'has_field_summaries',
+            'has_daily_submission_counts').get(pk=instance.xform_id)
+        if xform.has_field_summaries:
+            update_field_summaries(instance.xform_id, get_summary_counts(
+                instance.xform, instance.json, instance.deleted_at))
+        if xform.has_daily_submission_counts:
+            update_daily_submission_counts(instance.xform_id, _submission_days(
+                instance.date_created, instance.deleted_at))
         # Hack to avoid circular imports
         UserProfile = User.profile.related.related_model
         profile, created = UserProfile.objects.only('pk').get_or_create(
@@ -91,6 +90,10 @@ def update_xform_submission_count_delete(sender, instance, **kwargs):
         if xform.num_of_submissions < 0:
             xform.num_of_submissions = 0
         xform.save()
+        if xform.has_daily_submission_counts:
+            days = _submission_days(instance.date_created, instance.deleted_at)
+            update_daily_submission_counts(xform.pk, Counter(
+                dict((day, -count) for day, count in days.items())))
         profile_qs = User.profile.get_queryset()
         try:
             profile = profile_qs.select_for_update()\
@@ -104,6 +107,73 @@ def update_xform_submission_count_delete(sender, instance, **kwargs):
             profile.save()
 
 
+def _submission_days(date_created, deleted_at):
+    # the `Counter` of the days a submission counts for, none once deleted
+    if deleted_at is not None or date_created is None:
+        return Counter()
+    return Counter([get_submission_day(date_created)])
+
+
+def _update_daily_submission_counts(xform_id, counts):
+    if not any(counts.values()):
+        return
+    with transaction.atomic():
+        if XForm.objects.select_for_update().filter(
+                pk=xform_id, has_daily_submission_counts=True).values_list(
+                'pk'):
+            update_daily_submission_counts(xform_id, counts)
+
+
+def _update_field_summaries(xform_id, counts):
+    if not any(counts.values()):
+        return
+    with transaction.atomic():
+        # the lock on the form is taken by every writer of its field summaries
+        if XForm.objects.select_for_update().filter(
+                pk=xform_id, has_field_summaries=True).values_list('pk'):
+            update_field_summaries(xform_id, counts)
+
+
+def get_saved_counts(sender, instance, **kwargs):
+    # a new submission is counted by `update_xform_submission_count()`, which
+    # `defer_counting` postpones until its last save
+    if instance.pk is None or instance.xform_id is None or \
+            getattr(instance, 'defer_counting', False):
+        return
+    try:
+        saved = Instance.objects.only(
+            'json', 'date_created', 'deleted_at').get(pk=instance.pk)
+    except Instance.DoesNotExist:
+        return
+    instance._saved_summary_counts = get_summary_counts(
+        instance.xform, saved.json, saved.deleted_at)
+    instance._saved_submission_days = _submission_days(
+        saved.date_created, saved.deleted_at)
+
+
+def update_counts_save(sender, instance, created, **kwargs):
+    saved_counts = instance.__dict__.pop('_saved_summary_counts', None)
+    saved_days = instance.__dict__.pop('_saved_submission_days', None)
+    if created or saved_counts is None:
+        return
+    counts = get_summary_counts(
+        instance.xform, instance.json, instance.deleted_at)
+    counts.subtract(saved_counts)
+    _update_field_summaries(instance.xform_id, counts)
+    days = _submission_days(instance.date_created, instance.deleted_at)
+    days.subtract(saved_days)
+    _update_daily_submission_counts(instance.xform_id, days)
+
+
+def update_field_summaries_delete(sender, instance, **kwargs):
+    if instance.xform_id is None:
+        return
+    counts = get_summary_counts(
+        instance.xform, instance.json, instance.deleted_at)
+    _update_field_summaries(instance.xform_id, Counter(
+        dict((key, -count) for key, count in counts.items())))
+
+
 @reversion.register
 class Instance(models.Model):
     XML_HASH_LENGTH = 64
@@ -181,8 +251,7 @@ class Instance(models.Model):
 
     def _set_geom(self):
         xform = self.xform
-        data_dictionary = xform.data_dictionary()
-        geo_xpaths = data_dictionary.geopoint_xpaths()
+        geo_xpaths = get_form_schema(xform).geopoint_xpaths
         doc = self.get_dict()
         points = []
 
@@ -219,8 +288,27 @@ class Instance(models.Model):
 
     def _set_parser(self):
         if not hasattr(self, "_parser"):
-            self._parser = XFormInstanceParser(
-                self.xml, self.xform.data_dictionary())
+            submission = self._get_parsed_submission()
+            if submission is not None:
+                self._parser = submission.get_parser(
+                    self.xform.data_dictionary())
+            else:
+                self._parser = XFormInstanceParser(
+                    self.xml, self.xform.data_dictionary())
+
+    def _get_parsed_submission(self):
+        submission = getattr(self, '_parsed_submission', None)
+        if submission is not None and submission.is_for(self.xml):
+            return submission
+        return None
+
+    def set_parsed_submission(self, submission):
+        """
+        Reuse `submission`, a `ParsedSubmission` of this instance's XML,
+        instead of parsing `self.xml` again. It is ignored if `self.xml` is
+        later changed to something else.
+        """
+        self._parsed_submission = submission
 
     def _set_survey_type(self):
         self.survey_type, created = \
@@ -228,7 +316,9 @@ class Instance(models.Model):
 
     def _set_uuid(self):
         if self.xml and not self.uuid:
-            uuid = get_uuid_from_xml(self.xml)
+            submission = self._get_parsed_submission()
+            uuid = submission.uuid if submission is not None \
+                else get_uuid_from_xml(self.xml)
             if uuid is not None:
                 self.uuid = uuid
         set_uuid(self)
@@ -367,6 +457,9 @@ class Instance(models.Model):
 
     def save(self, *args, **kwargs):
         force = kwargs.pop("force", False)
+        submission = kwargs.pop("submission", None)
+        if submission is not None:
+            self.set_parsed_submission(submission)
 
         self._check_active(force)
 
@@ -408,6 +501,15 @@ post_save.connect(update_xform_submission_count, sender=Instance,
 post_delete.connect(update_xform_submission_count_delete, sender=Instance,
                     dispatch_uid='update_xform_submission_count_delete')
 
+pre_save.connect(get_saved_counts, sender=Instance,
+                 dispatch_uid='get_saved_counts')
+
+post_save.connect(update_counts_save, sender=Instance,
+                  dispatch_uid='update_counts_save')
+
+post_delete.connect(update_field_summaries_delete, sender=Instance,
+                    dispatch_uid='update_field_summaries_delete')
+
 if Instance.XML_HASH_LENGTH / 2 != sha256().digest_size:
     raise AssertionError('SHA256 hash `digest_size` expected to be `{}`, not `{}`'.format(
         Instance.XML_HASH_LENGTH, sha256().digest_size))
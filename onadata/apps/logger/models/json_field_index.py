@@ -0,0 +1,133 @@
+import re
+from decimal import Decimal
+from hashlib import md5
+
+from django.db import connection, models
+from django.utils.translation import ugettext_lazy
+
+from onadata.apps.logger.models.xform import XForm
+
+
+INDEX_NAME_PREFIX = 'logger_instance_json_'
+# answers Postgres can cast to a number, others are left out of the stats;
+# the bounded lengths, within what the regular expressions of Postgres
+# allow, keep them within the range of `numeric`
+NUMERIC_PATTERN = r'^\s*[-+]?(\d{1,200}\.?\d{0,200}|\.\d{1,200})' \
+    r'([eE][-+]?\d{1,3})?\s*$'
+numeric_re = re.compile(NUMERIC_PATTERN)
+# ... of which those beyond the range of `double precision` are left out too
+MAX_NUMERIC_VALUE = Decimal('1e308')
+MIN_NUMERIC_VALUE = Decimal('1e-307')
+
+
+def get_numeric_value(value):
+    """
+    Returns the number the stats read from the answer `value`, as the
+    `numeric` expression of `get_json_expression()` does, or None.
+    """
+    if not isinstance(value, basestring) or not numeric_re.match(value):
+        return None
+    number = abs(Decimal(value.strip()))
+    if number and not MIN_NUMERIC_VALUE <= number <= MAX_NUMERIC_VALUE:
+        return None
+    return float(value)
+
+
+def get_json_expression(field, kind='text'):
+    """
+    Returns the SQL expression, and its parameters, of the answers to
+    `field` in `logger_instance.json`: as text, or as numbers for the
+    `numeric` kind, answers which are not numbers, or not within the range
+    of `double precision`, being NULL.
+
+    Queries over the answers must use these expressions so that Postgres
+    can match them with the `JSONFieldIndex`es built on them.
+    """
+    if kind == JSONFieldIndex.NUMERIC:
+        # `CASE` rather than `AND`, which does not guarantee that the answer
+        # is matched before being cast
+        return ("CASE WHEN json->>%%s ~ %%s THEN CASE "
+                "WHEN (json->>%%s)::numeric = 0 THEN 0 "
+                "WHEN abs((json->>%%s)::numeric) BETWEEN %s AND %s "
+                "THEN (json->>%%s)::double precision END END" % (
+                    MIN_NUMERIC_VALUE, MAX_NUMERIC_VALUE),
+                [field, NUMERIC_PATTERN, field, field, field])
+    return "json->>%s", [field]
+
+
+class JSONFieldIndex(models.Model):
+    """
+    A partial expression index of `logger_instance` on the answers of the
+    submissions of `xform` to `field`, not deleted, for forms large enough
+    for the queries of `onadata.libs.data.query` over that field to need
+    one. See the `json_field_indexes` command.
+    """
+    TEXT = 'text'
+    NUMERIC = 'numeric'
+    KIND_CHOICES = (
+        (TEXT, ugettext_lazy('Text')),
+        (NUMERIC, ugettext_lazy('Numeric')),
+    )
+
+    xform = models.ForeignKey(XForm, related_name='json_field_indexes')
+    field = models.CharField(max_length=255)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES,
+                            default=TEXT)
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        app_label = 'logger'
+        unique_together = (('xform', 'field', 'kind'),)
+
+    def __unicode__(self):
+        return u'%s (%s) of %s' % (self.field, self.kind, self.xform_id)
+
+    @property
+    def index_name(self):
+        # the expression is part of the name so that the indexes built on an
+        # older one are told apart, as orphans, and built again
+        expression, params = get_json_expression(self.field, self.kind)
+        digest = md5((u'%s:%s' % (expression, u':'.join(params))).encode(
+            'utf-8'))
+        return '%s%d_%s' % (INDEX_NAME_PREFIX, self.xform_id,
+                            digest.hexdigest()[:12])
+
+    def create_index(self):
+        """
+        Builds the index, without locking out writes to `logger_instance`
+        unless inside a transaction, where an index cannot be built
+        concurrently.
+        """
+        expression, params = get_json_expression(self.field, self.kind)
+        cursor = connection.cursor()
+        cursor.execute(
+            "CREATE INDEX %s IF NOT EXISTS %s ON logger_instance ((%s)) "
+            "WHERE xform_id = %%s AND deleted_at IS NULL" % (
+                '' if connection.in_atomic_block else 'CONCURRENTLY',
+                self.index_name, expression), params + [self.xform_id])
+
+    def drop_index(self):
+        drop_json_field_index(self.index_name)
+
+
+def drop_json_field_index(index_name):
+    cursor = connection.cursor()
+    cursor.execute("DROP INDEX %s IF EXISTS %s" % (
+        '' if connection.in_atomic_block else 'CONCURRENTLY', index_name))
+
+
+def get_json_field_index_usage():
+    """
+    Returns `{index name: {'scans', 'tuples_read', 'size'}}` for every
+    index built for a `JSONFieldIndex`, including those whose form was
+    deleted since, from `pg_stat_user_indexes`.
+    """
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT indexrelname, idx_scan, idx_tup_read, "
+        "pg_relation_size(indexrelid) FROM pg_stat_user_indexes "
+        "WHERE relname = 'logger_instance' AND indexrelname LIKE %s",
+        [INDEX_NAME_PREFIX.replace('_', r'\_') + '%'])
+    return dict((name, {'scans': scans, 'tuples_read': tuples_read,
+                        'size': size})
+                for name, scans, tuples_read, size in cursor.fetchall())
@@ -1,13 +1,12 @@
 # -*- coding: utf-8 -*-
 import json
 import os
-import pytz
 import re
 import io
 
+from datetime import timedelta
 from hashlib import md5
 from django.utils import timezone
-from datetime import datetime
 from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
@@ -25,6 +24,7 @@ from xml.sax import saxutils
 
 from onadata.apps.logger.xform_instance_parser import XLSFormError
 from onadata.libs.models.base_model import BaseModel
+from onadata.libs.utils.form_schema_cache import get_form_schema
 from ....koboform.pyxform_utils import convert_csv_to_xls
 from onadata.apps.logger.fields import LazyDefaultBooleanField
 from onadata.apps.logger.exceptions import DuplicateUUIDError
@@ -97,6 +97,15 @@ class XForm(BaseModel):
 
     has_kpi_hooks = LazyDefaultBooleanField(default=False)
 
+    # Whether the `FieldValueCount`s of the form are kept up to date. New forms
+    # have them from their first submission; older ones once the
+    # `rebuild_field_summaries` command has counted them.
+    has_field_summaries = LazyDefaultBooleanField(default=False)
+    # Whether the `DailySubmissionCount`s of the form are kept up to date,
+    # likewise, once the `rebuild_daily_submission_counts` command has counted
+    # them for older forms.
+    has_daily_submission_counts = LazyDefaultBooleanField(default=False)
+
     class Meta:
         app_label = 'logger'
         unique_together = (("user", "id_string"), ("user", "sms_id_string"))
@@ -124,9 +133,11 @@ class XForm(BaseModel):
         )
 
     def data_dictionary(self):
-        from onadata.apps.viewer.models.data_dictionary import\
-            DataDictionary
-        return DataDictionary.objects.get(pk=self.pk)
+        """
+        Return a `DataDictionary` of this form, sharing the parsed survey with
+        the other users of the same version of the form in this process.
+        """
+        return get_form_schema(self).get_data_dictionary(self)
 
     @property
     def has_instances_with_geopoints(self):
@@ -208,6 +219,10 @@ class XForm(BaseModel):
             except:
                 self.sms_id_string = self.id_string
 
+        if self.pk is None:
+            self.has_field_summaries = True
+            self.has_daily_submission_counts = True
+
         super(XForm, self).save(*args, **kwargs)
 
     def __unicode__(self):
@@ -223,17 +238,15 @@ class XForm(BaseModel):
 
     @property
     def submission_count_for_today(self):
-        current_timzone_name = timezone.get_current_timezone_name()
-        current_timezone = pytz.timezone(current_timzone_name)
-        today = datetime.today()
-        current_date = current_timezone.localize(
-            datetime(today.year,
-                     today.month,
-                     today.day))
-        count = self.instances.filter(
-            deleted_at__isnull=True,
-            date_created=current_date).count()
-        return count
+        # days are in UTC, as the daily submission counts have them
+        start = timezone.now().replace(hour=0, minute=0, second=0,
+                                       microsecond=0)
+        if self.has_daily_submission_counts:
+            return self.daily_submission_counts.filter(
+                day=start.date()).values_list('count', flat=True).first() or 0
+        return self.instances.filter(
+            deleted_at__isnull=True, date_created__gte=start,
+            date_created__lt=start + timedelta(days=1)).count()
 
     def geocoded_submission_count(self):
         """Number of geocoded submissions."""
@@ -0,0 +1,73 @@
+import os
+from datetime import timedelta
+
+from django.utils import timezone
+
+from onadata.apps.logger.models import DailySubmissionCount, Instance, XForm
+from onadata.apps.logger.models.daily_submission_count import\
+    get_daily_submission_counts, get_submission_day,\
+    rebuild_daily_submission_counts
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.libs.data.query import get_form_submissions_grouped_by_field
+
+
+class TestDailySubmissionCount(TestBase):
+
+    def setUp(self):
+        super(TestDailySubmissionCount, self).setUp()
+        self._create_user_and_login()
+        path = os.path.join(self.this_directory, '..', '..', 'api', 'tests',
+                            'fixtures', 'forms', 'tutorial')
+        self._publish_xls_file_and_set_xform(
+            os.path.join(path, 'tutorial.xls'))
+        self.yesterday = timezone.now() - timedelta(days=1)
+        for i in ['1', '2', '3']:
+            self._make_submission(os.path.join(
+                path, 'instances', '{}.xml'.format(i)))
+        self._make_submission(
+            os.path.join(path, 'instances', 'no_age.xml'),
+            forced_submission_time=self.yesterday)
+        self.xform = XForm.objects.get(pk=self.xform.pk)
+
+    def _counts(self):
+        return dict(DailySubmissionCount.objects.filter(
+            xform=self.xform, count__gt=0).values_list('day', 'count'))
+
+    def test_counted_on_submission(self):
+        self.assertTrue(self.xform.has_daily_submission_counts)
+        today = get_submission_day(timezone.now())
+        self.assertEqual(self._counts(), {
+            today: 3, get_submission_day(self.yesterday): 1})
+        self.assertEqual(self.xform.submission_count_for_today, 3)
+
+    def test_deleted_submission_is_uncounted(self):
+        instance = Instance.objects.get(
+            uuid='8710c719-00a5-41f1-b740-8dd618bb4a59')
+        instance.set_deleted()
+        self.assertEqual(self.xform.submission_count_for_today, 2)
+        instance.delete()
+        self.assertEqual(self.xform.submission_count_for_today, 2)
+        Instance.objects.filter(xform=self.xform).first().delete()
+        self.assertEqual(sum(self._counts().values()), 2)
+
+    def test_rebuild_matches_counts_kept_up_to_date(self):
+        counts = get_daily_submission_counts(self.xform)
+        XForm.objects.filter(pk=self.xform.pk).update(
+            has_daily_submission_counts=False)
+        DailySubmissionCount.objects.all().delete()
+        xform = XForm.objects.get(pk=self.xform.pk)
+        self.assertEqual(get_daily_submission_counts(xform), counts)
+        self.assertEqual(xform.submission_count_for_today, 3)
+        rebuild_daily_submission_counts(xform)
+        self.assertEqual(get_daily_submission_counts(xform), counts)
+
+    def test_submission_time_is_grouped_from_the_counts(self):
+        grouped = get_form_submissions_grouped_by_field(
+            self.xform, '_submission_time')
+        self.assertEqual(sorted(grouped), sorted(
+            {'_submission_time': day.isoformat(), 'count': count}
+            for day, count in self._counts().items()))
+        xform = XForm.objects.get(pk=self.xform.pk)
+        xform.has_daily_submission_counts = False
+        self.assertEqual(sorted(get_form_submissions_grouped_by_field(
+            xform, '_submission_time')), sorted(grouped))
@@ -0,0 +1,120 @@
+import os
+from collections import Counter
+
+from django.test.utils import override_settings
+
+from onadata.apps.logger.models import FieldValueCount, Instance, XForm
+from onadata.apps.logger.models.field_value_count import\
+    get_summary_counts, rebuild_field_summaries, update_field_summaries
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.libs.data.query import get_form_submissions_grouped_by_field,\
+    get_numeric_field_stats
+
+
+class TestFieldValueCount(TestBase):
+
+    def setUp(self):
+        super(TestFieldValueCount, self).setUp()
+        self._create_user_and_login()
+        path = os.path.join(self.this_directory, '..', '..', 'api', 'tests',
+                            'fixtures', 'forms', 'tutorial')
+        self._publish_xls_file_and_set_xform(
+            os.path.join(path, 'tutorial.xls'))
+        for i in ['1', '2', '3', 'no_age']:
+            self._make_submission(os.path.join(
+                path, 'instances', '{}.xml'.format(i)))
+        self.xform = XForm.objects.get(pk=self.xform.pk)
+
+    def _counts(self, field):
+        return dict(FieldValueCount.objects.filter(
+            xform=self.xform, field=field, count__gt=0).values_list(
+            'value', 'count'))
+
+    def _without_summaries(self, function, *args):
+        self.xform.has_field_summaries = False
+        self.xform.has_daily_submission_counts = False
+        try:
+            return function(self.xform, *args)
+        finally:
+            self.xform.has_field_summaries = True
+            self.xform.has_daily_submission_counts = True
+
+    def test_counted_on_submission(self):
+        self.assertTrue(self.xform.has_field_summaries)
+        self.assertEqual(self._counts('age'), {u'23': 2, u'35': 1})
+        # counted by the daily submission counts instead
+        self.assertEqual(self._counts('_submission_time'), {})
+
+    def test_deleted_submission_is_uncounted(self):
+        instance = Instance.objects.get(
+            uuid='8710c719-00a5-41f1-b740-8dd618bb4a59')
+        instance.set_deleted()
+        self.assertEqual(self._counts('age'), {u'23': 2})
+        instance.delete()
+        self.assertEqual(self._counts('age'), {u'23': 2})
+
+    def test_rebuild_matches_counts_kept_up_to_date(self):
+        counts = sorted(FieldValueCount.objects.filter(
+            xform=self.xform, count__gt=0).values_list(
+            'field', 'value', 'count'))
+        XForm.objects.filter(pk=self.xform.pk).update(
+            has_field_summaries=False)
+        FieldValueCount.objects.all().delete()
+        rebuild_field_summaries(XForm.objects.get(pk=self.xform.pk))
+        self.assertEqual(sorted(FieldValueCount.objects.filter(
+            xform=self.xform).values_list('field', 'value', 'count')),
+            counts)
+
+    def test_rebuild_counts_values_as_submissions_do(self):
+        instances = list(Instance.objects.filter(xform=self.xform))
+        for instance, age in zip(instances, [u'x' * 300, 41, None]):
+            instance.json['age'] = age
+            Instance.objects.filter(pk=instance.pk).update(
+                json=instance.json)
+        expected = Counter()
+        for instance in instances:
+            expected.update(get_summary_counts(self.xform, instance.json))
+        rebuild_field_summaries(self.xform)
+        rows = FieldValueCount.objects.filter(xform=self.xform).values_list(
+            'field', 'value', 'count')
+        # a field with an answer which cannot be counted is only marked
+        marked = set(field for field, value in expected if value is None)
+        self.assertIn('age', marked)
+        self.assertEqual(
+            sorted(rows),
+            sorted([(field, value, count)
+                    for (field, value), count in expected.items()
+                    if field not in marked] +
+                   [(field, None, 0) for field in marked]))
+
+    def test_summary_is_given_up_beyond_max_values(self):
+        with override_settings(FIELD_SUMMARY_MAX_VALUES=2):
+            update_field_summaries(self.xform.pk, Counter({('age', u'9'): 1}))
+            self.assertEqual(list(FieldValueCount.objects.filter(
+                xform=self.xform, field='age').values_list('value', 'count')),
+                [(None, 0)])
+            update_field_summaries(self.xform.pk, Counter({('age', u'9'): 1}))
+            self.assertEqual(FieldValueCount.objects.filter(
+                xform=self.xform, field='age').count(), 1)
+
+        with override_settings(FIELD_SUMMARY_MAX_VALUES=1):
+            rebuild_field_summaries(self.xform)
+        self.assertEqual(list(FieldValueCount.objects.filter(
+            xform=self.xform, field='age').values_list('value', 'count')),
+            [(None, 0)])
+        self.assertEqual(self._counts('today'), {u'2014-01-09': 4})
+        self.assertEqual(
+            get_numeric_field_stats(self.xform, ['age']),
+            self._without_summaries(get_numeric_field_stats, ['age']))
+
+    def test_summaries_match_queries(self):
+        for field in ['age', 'gender', 'date', '_submission_time']:
+            self.assertEqual(
+                sorted(get_form_submissions_grouped_by_field(
+                    self.xform, field)),
+                sorted(self._without_summaries(
+                    get_form_submissions_grouped_by_field, field)))
+        self.assertEqual(
+            get_numeric_field_stats(self.xform, ['age', 'net_worth']),
+            self._without_summaries(get_numeric_field_stats,
+                                    ['age', 'net_worth']))
@@ -0,0 +1,39 @@
+import os
+
+from django.db import connection
+
+from onadata.apps.logger.models import JSONFieldIndex
+from onadata.apps.logger.models.json_field_index import get_json_expression,\
+    get_json_field_index_usage
+from onadata.apps.main.tests.test_base import TestBase
+
+
+class TestJSONFieldIndex(TestBase):
+
+    def setUp(self):
+        super(TestJSONFieldIndex, self).setUp()
+        self._create_user_and_login()
+        path = os.path.join(self.this_directory, '..', '..', 'api', 'tests',
+                            'fixtures', 'forms', 'tutorial')
+        self._publish_xls_file_and_set_xform(
+            os.path.join(path, 'tutorial.xls'))
+        self._make_submission(os.path.join(path, 'instances', '1.xml'))
+
+    def test_queries_match_the_index(self):
+        index = JSONFieldIndex.objects.create(
+            xform=self.xform, field='age', kind=JSONFieldIndex.NUMERIC)
+        index.create_index()
+        self.assertIn(index.index_name, get_json_field_index_usage())
+
+        json, params = get_json_expression('age', JSONFieldIndex.NUMERIC)
+        cursor = connection.cursor()
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(
+            "EXPLAIN SELECT %s FROM logger_instance WHERE xform_id = %%s "
+            "AND deleted_at IS NULL ORDER BY %s" % (json, json),
+            params + [self.xform.pk] + params)
+        plan = u'\n'.join(row[0] for row in cursor.fetchall())
+        self.assertIn(index.index_name, plan)
+
+        index.drop_index()
+        self.assertNotIn(index.index_name, get_json_field_index_usage())
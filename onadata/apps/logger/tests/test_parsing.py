@@ -5,7 +5,8 @@ from xml.dom import minidom
 
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.logger.xform_instance_parser import XFormInstanceParser,\
-    xpath_from_xml_node
+    xpath_from_xml_node, ParsedSubmission, EngineFallback,\
+    _parse_with_lxml, _parse_with_minidom
 from onadata.apps.logger.xform_instance_parser import get_uuid_from_xml,\
     get_meta_from_xml, get_deprecated_uuid_from_xml,\
     _xml_node_to_dict, clean_and_parse_xml
@@ -151,6 +152,53 @@ class TestXFormInstanceParser(TestBase):
         deprecatedID = get_deprecated_uuid_from_xml(xml_str)
         self.assertEqual(deprecatedID, "729f173c688e482486a48661700455ff")
 
+    def test_parsed_submission(self):
+        with open(
+            os.path.join(
+                os.path.dirname(__file__), "..", "fixtures", "tutorial",
+                "instances", "tutorial_2012-06-27_11-27-53_w_uuid_edited.xml"),
+                "r") as xml_file:
+            xml_str = xml_file.read()
+        submission = ParsedSubmission(xml_str)
+        self.assertEqual(submission.uuid,
+                         "2d8c59eb-94e9-485d-a679-b28ffe2e9b98")
+        self.assertEqual(submission.deprecated_uuid,
+                         "729f173c688e482486a48661700455ff")
+        self.assertEqual(submission.id_string, u'tutorial')
+        self.assertEqual(submission.root_node_name, u'tutorial')
+        self.assertIsNone(submission.submission_date)
+        self.assertTrue(submission.is_for(xml_str))
+        # the document is parsed only once
+        self.assertIs(submission.xml_obj, submission.xml_obj)
+
+    def test_parsed_submission_lxml_engine_skips_minidom(self):
+        self._publish_and_submit_new_repeats()
+        data_dictionary = self.xform.data_dictionary()
+        minidom_submission = ParsedSubmission(self.xml)
+        with self.settings(XFORM_INSTANCE_PARSER_ENGINE='minidom'):
+            minidom_dict = minidom_submission.to_dict(data_dictionary)
+        with self.settings(XFORM_INSTANCE_PARSER_ENGINE='lxml'):
+            submission = ParsedSubmission(self.xml)
+            self.assertEqual(submission.to_dict(data_dictionary),
+                             minidom_dict)
+            for name in ['uuid', 'deprecated_uuid', 'submission_date',
+                         'id_string', 'root_node_name']:
+                self.assertEqual(getattr(submission, name),
+                                 getattr(minidom_submission, name))
+            self.assertNotIn('xml_obj', submission.__dict__)
+
+    def test_parsed_submission_parser_matches_xform_instance_parser(self):
+        self._publish_and_submit_new_repeats()
+        data_dictionary = self.xform.data_dictionary()
+        submission = ParsedSubmission(self.xml)
+        parser = XFormInstanceParser(self.xml, data_dictionary)
+        self.assertEqual(submission.to_dict(data_dictionary),
+                         parser.to_dict())
+        self.assertEqual(submission.to_flat_dict(data_dictionary),
+                         parser.to_flat_dict())
+        self.assertIs(submission.get_parser(data_dictionary),
+                      submission.get_parser(data_dictionary))
+
     def test_parse_xform_nested_repeats_multiple_nodes(self):
         self._create_user_and_login()
         # publish our form which contains some some repeats
@@ -186,3 +234,58 @@ class TestXFormInstanceParser(TestBase):
             with open(json_file) as jfile:
                 import json
                 self.assertEqual(jfile.read(), json.dumps(dict_))
+
+    def test_lxml_engine_matches_minidom_engine(self):
+        fixtures_dir = os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "..", "fixtures")
+        repeats = [u'kids/kids_details', u'question_group']
+        for root, dirs, files in os.walk(fixtures_dir):
+            for filename in files:
+                if not filename.endswith('.xml'):
+                    continue
+                with open(os.path.join(root, filename)) as xml_file:
+                    xml_str = xml_file.read()
+                root_name, d, attributes, xml_obj = _parse_with_minidom(
+                    xml_str, repeats)
+                lxml_root_name, lxml_d, lxml_attributes, lxml_xml_obj = \
+                    _parse_with_lxml(xml_str, repeats)
+                self.assertEqual(lxml_root_name, root_name)
+                self.assertEqual(lxml_d, d)
+                self.assertEqual(sorted(lxml_attributes), sorted(attributes))
+                self.assertIsNone(lxml_xml_obj)
+
+    def test_lxml_engine_mixed_content_and_namespaces(self):
+        xml_str = u'<a xmlns:orx="http://openrosa.org/xforms" id="a">' \
+                  u'<b>t<!-- c --></b><e>x<f>y</f>z</e>' \
+                  u'<orx:meta><orx:instanceID>uuid:1</orx:instanceID>' \
+                  u'</orx:meta><r><x>1</x></r><r><x>\xe9</x></r></a>'
+        minidom_parsed = _parse_with_minidom(xml_str, [u'r'])
+        lxml_parsed = _parse_with_lxml(xml_str, [u'r'])
+        self.assertEqual(lxml_parsed[1], minidom_parsed[1])
+        self.assertEqual(sorted(lxml_parsed[2]), sorted(minidom_parsed[2]))
+        self.assertEqual(lxml_parsed[1], {u'a': {
+            u'e': {u'f': u'y'},
+            u'orx:meta': {u'orx:instanceID': u'uuid:1'},
+            u'r': [{u'x': u'1'}, {u'x': u'\xe9'}]}})
+
+    def test_lxml_engine_falls_back_on_cdata(self):
+        with self.assertRaises(EngineFallback):
+            _parse_with_lxml('<a><b><![CDATA[x]]></b></a>', [])
+
+    def test_parser_engines_give_the_same_parser_output(self):
+        self._publish_and_submit_new_repeats()
+        data_dictionary = self.xform.data_dictionary()
+        parsers = []
+        for engine in ['minidom', 'lxml']:
+            with self.settings(XFORM_INSTANCE_PARSER_ENGINE=engine):
+                parsers.append(
+                    XFormInstanceParser(self.xml, data_dictionary))
+        minidom_parser, lxml_parser = parsers
+        self.assertEqual(lxml_parser.to_dict(), minidom_parser.to_dict())
+        self.assertEqual(lxml_parser.to_flat_dict(),
+                         minidom_parser.to_flat_dict())
+        self.assertEqual(lxml_parser.get_attributes(),
+                         minidom_parser.get_attributes())
+        self.assertEqual(lxml_parser.get_root_node_name(), u'new_repeats')
+        self.assertEqual(lxml_parser.get_root_node().toxml(),
+                         minidom_parser.get_root_node().toxml())
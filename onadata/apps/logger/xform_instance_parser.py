@@ -2,10 +2,22 @@ import re
 import logging
 import dateutil.parser
 from xml.dom import minidom, Node
+from django.conf import settings
 from django.utils.encoding import smart_unicode, smart_str
+from django.utils.functional import cached_property
 from django.utils.translation import ugettext as _
 
 from onadata.libs.utils.common_tags import XFORM_ID_STRING
+from onadata.libs.utils.form_schema_cache import get_form_schema
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+
+UUID_REGEX = re.compile(r"uuid:(.*)")
+XML_NAMESPACE = 'http://www.w3.org/XML/1998/namespace'
 
 
 class XLSFormError(Exception):
@@ -48,14 +60,17 @@ class InstanceMultipleNodeError(Exception):
     pass
 
 
-def get_meta_from_xml(xml_str, meta_name):
-    xml = clean_and_parse_xml(xml_str)
-    children = xml.childNodes
+def _get_survey_node(xml_obj):
+    children = xml_obj.childNodes
     # children ideally contains a single element
     # that is the parent of all survey elements
     if children.length == 0:
         raise ValueError(_("XML string must have a survey element."))
-    survey_node = children[0]
+    return children[0]
+
+
+def _get_meta_from_xml_obj(xml_obj, meta_name):
+    survey_node = _get_survey_node(xml_obj)
     meta_tags = [n for n in survey_node.childNodes if
                  n.nodeType == Node.ELEMENT_NODE and
                  (n.tagName.lower() == "meta" or
@@ -77,59 +92,86 @@ def get_meta_from_xml(xml_str, meta_name):
         else None
 
 
-def get_uuid_from_xml(xml):
-    def _uuid_only(uuid, regex):
-        matches = regex.match(uuid)
-        if matches and len(matches.groups()) > 0:
-            return matches.groups()[0]
-        return None
-    uuid = get_meta_from_xml(xml, "instanceID")
-    regex = re.compile(r"uuid:(.*)")
+def _uuid_only(uuid):
+    matches = UUID_REGEX.match(uuid)
+    if matches and len(matches.groups()) > 0:
+        return matches.groups()[0]
+    return None
+
+
+def _get_uuid_from_xml_obj(xml_obj):
+    uuid = _get_meta_from_xml_obj(xml_obj, "instanceID")
     if uuid:
-        return _uuid_only(uuid, regex)
+        return _uuid_only(uuid)
     # check in survey_node attributes
-    xml = clean_and_parse_xml(xml)
-    children = xml.childNodes
-    # children ideally contains a single element
-    # that is the parent of all survey elements
-    if children.length == 0:
-        raise ValueError(_("XML string must have a survey element."))
-    survey_node = children[0]
+    survey_node = _get_survey_node(xml_obj)
     uuid = survey_node.getAttribute('instanceID')
     if uuid != '':
-        return _uuid_only(uuid, regex)
+        return _uuid_only(uuid)
     return None
 
 
-def get_submission_date_from_xml(xml):
+def _get_submission_date_from_xml_obj(xml_obj):
     # check in survey_node attributes
-    xml = clean_and_parse_xml(xml)
-    children = xml.childNodes
-    # children ideally contains a single element
-    # that is the parent of all survey elements
-    if children.length == 0:
-        raise ValueError(_("XML string must have a survey element."))
-    survey_node = children[0]
+    survey_node = _get_survey_node(xml_obj)
     submissionDate = survey_node.getAttribute('submissionDate')
     if submissionDate != '':
         return dateutil.parser.parse(submissionDate)
     return None
 
 
-def get_deprecated_uuid_from_xml(xml):
-    uuid = get_meta_from_xml(xml, "deprecatedID")
-    regex = re.compile(r"uuid:(.*)")
+def _get_deprecated_uuid_from_xml_obj(xml_obj):
+    uuid = _get_meta_from_xml_obj(xml_obj, "deprecatedID")
     if uuid:
-        matches = regex.match(uuid)
-        if matches and len(matches.groups()) > 0:
-            return matches.groups()[0]
+        return _uuid_only(uuid)
     return None
 
 
-def clean_and_parse_xml(xml_string):
+def get_id_string_from_xml_obj(xml_obj):
+    root_node = xml_obj.documentElement
+    id_string = root_node.getAttribute(u"id")
+
+    if len(id_string) == 0:
+        # may be hidden in submission/data/id_string
+        elems = root_node.getElementsByTagName('data')
+
+        for data in elems:
+            for child in data.childNodes:
+                id_string = data.childNodes[0].getAttribute('id')
+
+                if len(id_string) > 0:
+                    break
+
+            if len(id_string) > 0:
+                break
+
+    return id_string
+
+
+def get_meta_from_xml(xml_str, meta_name):
+    return _get_meta_from_xml_obj(clean_and_parse_xml(xml_str), meta_name)
+
+
+def get_uuid_from_xml(xml):
+    return _get_uuid_from_xml_obj(clean_and_parse_xml(xml))
+
+
+def get_submission_date_from_xml(xml):
+    return _get_submission_date_from_xml_obj(clean_and_parse_xml(xml))
+
+
+def get_deprecated_uuid_from_xml(xml):
+    return _get_deprecated_uuid_from_xml_obj(clean_and_parse_xml(xml))
+
+
+def _clean_xml_str(xml_string):
     clean_xml_str = xml_string.strip()
     clean_xml_str = re.sub(ur">\s+<", u"><", smart_unicode(clean_xml_str))
-    xml_obj = minidom.parseString(smart_str(clean_xml_str))
+    return smart_str(clean_xml_str)
+
+
+def clean_and_parse_xml(xml_string):
+    xml_obj = minidom.parseString(_clean_xml_str(xml_string))
     return xml_obj
 
 
@@ -278,37 +320,289 @@ def _get_all_attributes(node):
             yield pair
 
 
+class EngineFallback(Exception):
+    """
+    Raised by a parser engine for a document it cannot turn into exactly the
+    output of the minidom engine, which is then used instead.
+    """
+    pass
+
+
+def _parse_with_minidom(xml_str, repeats, xml_obj=None, lxml_root=None):
+    """
+    Return the root node name, the nested dict and the list of attributes of
+    an instance, walking a minidom tree.
+    """
+    if xml_obj is None:
+        xml_obj = clean_and_parse_xml(xml_str)
+    root_node = xml_obj.documentElement
+    return (root_node.nodeName,
+            _xml_node_to_dict(root_node, repeats),
+            list(_get_all_attributes(root_node)),
+            xml_obj)
+
+
+def _lxml_node_name(element, names):
+    """
+    Return the name minidom would give `element`, i.e. its qualified name
+    with the prefix used in the document rather than the namespace URI.
+    """
+    key = (element.tag, element.prefix)
+    if key not in names:
+        tag = element.tag
+        if tag[0] == '{':
+            tag = tag.split('}', 1)[1]
+        if element.prefix:
+            tag = u'%s:%s' % (element.prefix, tag)
+        names[key] = unicode(tag)
+    return names[key]
+
+
+def _lxml_attribute_name(element, name):
+    if name[0] != '{':
+        return unicode(name)
+    uri, local_name = name[1:].split('}', 1)
+    if uri == XML_NAMESPACE:
+        return u'xml:%s' % local_name
+    prefixes = [prefix for prefix, prefix_uri in element.nsmap.items()
+                if prefix is not None and prefix_uri == uri]
+    if len(prefixes) != 1:
+        # the prefix used in the document cannot be told apart
+        raise EngineFallback()
+    return u'%s:%s' % (prefixes[0], local_name)
+
+
+def parse_lxml_tree(xml_str):
+    """
+    Return the root element of `xml_str` parsed by lxml, raising
+    `EngineFallback` for the documents lxml cannot read exactly as minidom
+    does.
+    """
+    if etree is None:
+        raise EngineFallback()
+    clean_xml_str = _clean_xml_str(xml_str)
+    # minidom keeps CDATA sections as separate nodes and expands entities
+    # declared in a DOCTYPE, neither of which lxml lets us see
+    if '<![CDATA[' in clean_xml_str or '<!DOCTYPE' in clean_xml_str:
+        raise EngineFallback()
+    try:
+        return etree.fromstring(
+            clean_xml_str, etree.XMLParser(resolve_entities=False))
+    except etree.LxmlError:
+        # let the minidom engine raise the errors callers expect
+        raise EngineFallback()
+
+
+def _parse_with_lxml(xml_str, repeats, xml_obj=None, lxml_root=None):
+    """
+    Same output as `_parse_with_minidom()`, built in a single pass over the
+    lxml tree of the document, `lxml_root` when the caller already holds it
+    (see `ParsedSubmission`): xpaths are carried down from the parent
+    instead of being rebuilt from the root for every node, and the
+    attributes are collected on the way.
+
+    `xml_obj` is returned untouched; a minidom tree is only built if one is
+    asked for later (see `XFormInstanceParser.get_root_node()`).
+    """
+    if lxml_root is None:
+        lxml_root = parse_lxml_tree(xml_str)
+
+    repeats = frozenset(repeats)
+    names = {}
+    attributes = []
+    namespaces = []
+    # one [name, xpath, value] frame per open element
+    stack = []
+    root_node_name = result = None
+    for event, element in etree.iterwalk(
+            lxml_root, events=('start-ns', 'start', 'end')):
+        if event == 'start-ns':
+            prefix, uri = element
+            namespaces.append(
+                (u'xmlns:%s' % prefix if prefix else u'xmlns',
+                 unicode(uri)))
+        elif event == 'start':
+            if namespaces:
+                attributes.extend(namespaces)
+                namespaces = []
+            for key, value in element.attrib.items():
+                attributes.append(
+                    (_lxml_attribute_name(element, key), unicode(value)))
+            name = _lxml_node_name(element, names)
+            if not stack:
+                xpath = u''
+                root_node_name = name
+            elif not stack[-1][1]:
+                xpath = name
+            else:
+                xpath = stack[-1][1] + u'/' + name
+            stack.append([name, xpath, {}])
+        else:
+            name, xpath, value = stack.pop()
+            if len(element) == 0:
+                # a leaf node, with or without data
+                value = unicode(element.text) \
+                    if element.text is not None else None
+            elif not value:
+                value = None
+            if not stack:
+                result = {name: value} if value is not None else None
+            elif value is not None:
+                parent_value = stack[-1][2]
+                if xpath in repeats:
+                    if name not in parent_value:
+                        parent_value[name] = [value]
+                    else:
+                        parent_value[name].append(value)
+                elif name not in parent_value:
+                    parent_value[name] = value
+                else:
+                    # see the duplicate node handling in
+                    # `_xml_node_to_dict()`
+                    if not isinstance(parent_value[name], list):
+                        parent_value[name] = [parent_value[name]]
+                    parent_value[name].append(value)
+
+    return root_node_name, result, attributes, xml_obj
+
+
+def _get_lxml_survey_node(lxml_root):
+    # minidom would take a comment or processing instruction before the
+    # root element for the survey node
+    if lxml_root.getprevious() is not None:
+        raise EngineFallback()
+    return lxml_root
+
+
+def _lxml_child_elements(element, names, tag_names):
+    return [child for child in element
+            if isinstance(child.tag, basestring) and
+            _lxml_node_name(child, names).lower() in tag_names]
+
+
+def _get_meta_from_lxml_root(lxml_root, meta_name):
+    """Same as `_get_meta_from_xml_obj()`, from the lxml tree."""
+    names = {}
+    meta_tags = _lxml_child_elements(
+        _get_lxml_survey_node(lxml_root), names, (u'meta', u'orx:meta'))
+    if len(meta_tags) == 0:
+        return None
+
+    meta_name = meta_name.lower()
+    uuid_tags = _lxml_child_elements(
+        meta_tags[0], names, (meta_name, u'orx:%s' % meta_name))
+    if len(uuid_tags) == 0:
+        return None
+
+    uuid_tag = uuid_tags[0]
+    if uuid_tag.text is not None:
+        return unicode(uuid_tag.text).strip()
+    if len(uuid_tag):
+        # the first child is not text
+        raise EngineFallback()
+    return None
+
+
+def _get_uuid_from_lxml_root(lxml_root):
+    uuid = _get_meta_from_lxml_root(lxml_root, "instanceID")
+    if uuid:
+        return _uuid_only(uuid)
+    uuid = _get_lxml_survey_node(lxml_root).get('instanceID', u'')
+    if uuid != '':
+        return _uuid_only(uuid)
+    return None
+
+
+def _get_submission_date_from_lxml_root(lxml_root):
+    submissionDate = _get_lxml_survey_node(lxml_root).get(
+        'submissionDate', u'')
+    if submissionDate != '':
+        return dateutil.parser.parse(submissionDate)
+    return None
+
+
+def _get_deprecated_uuid_from_lxml_root(lxml_root):
+    uuid = _get_meta_from_lxml_root(lxml_root, "deprecatedID")
+    if uuid:
+        return _uuid_only(uuid)
+    return None
+
+
+def _get_id_string_from_lxml_root(lxml_root):
+    """Same as `get_id_string_from_xml_obj()`, from the lxml tree."""
+    id_string = lxml_root.get(u"id", u'')
+    if len(id_string) > 0:
+        return id_string
+
+    # may be hidden in submission/data/id_string
+    names = {}
+    for data in lxml_root.iterdescendants():
+        if not isinstance(data.tag, basestring) or \
+                _lxml_node_name(data, names) != u'data':
+            continue
+        if data.text is None and len(data) == 0:
+            continue
+        if data.text is not None or not isinstance(data[0].tag, basestring):
+            # minidom fails on a first child which is not an element
+            raise EngineFallback()
+        id_string = data[0].get(u'id', u'')
+        if len(id_string) > 0:
+            break
+    return id_string
+
+
+XFORM_INSTANCE_PARSER_ENGINES = {
+    'lxml': _parse_with_lxml,
+    'minidom': _parse_with_minidom,
+}
+
+
+def get_xform_instance_parser_engine():
+    return XFORM_INSTANCE_PARSER_ENGINES[
+        getattr(settings, 'XFORM_INSTANCE_PARSER_ENGINE', 'lxml')]
+
+
 class XFormInstanceParser(object):
 
-    def __init__(self, xml_str, data_dictionary):
+    def __init__(self, xml_str, data_dictionary, xml_obj=None,
+                 lxml_root=None):
         self.dd = data_dictionary
         # The two following variables need to be initialized in the constructor, in case parsing fails.
         self._flat_dict = {}
         self._attributes = {}
         try:
-            self.parse(xml_str)
+            self.parse(xml_str, xml_obj, lxml_root)
         except Exception as err:
             logger = logging.getLogger("console_logger")
             logger.error(
                 "Failed to parse instance '%s'" % xml_str, exc_info=True)
 
-    def parse(self, xml_str):
-        self._xml_obj = clean_and_parse_xml(xml_str)
-        self._root_node = self._xml_obj.documentElement
-        repeats = [e.get_abbreviated_xpath()
-                   for e in self.dd.get_survey_elements_of_type(u"repeat")]
-        self._dict = _xml_node_to_dict(self._root_node, repeats)
+    def parse(self, xml_str, xml_obj=None, lxml_root=None):
+        # `xml_obj` and `lxml_root` let callers that already hold the parsed
+        # minidom document or lxml tree of `xml_str` (see `ParsedSubmission`)
+        # skip parsing it again
+        self._xml_str = xml_str
+        repeats = get_form_schema(self.dd).repeat_xpaths
+        engine = get_xform_instance_parser_engine()
+        try:
+            parsed = engine(xml_str, repeats, xml_obj, lxml_root)
+        except EngineFallback:
+            parsed = _parse_with_minidom(xml_str, repeats, xml_obj)
+        self._root_node_name, self._dict, all_attributes, self._xml_obj = \
+            parsed
         if self._dict is None:
             raise InstanceEmptyError
         for path, value in _flatten_dict_nest_repeats(self._dict, []):
             self._flat_dict[u"/".join(path[1:])] = value
-        self._set_attributes()
+        self._set_attributes(all_attributes)
 
     def get_root_node(self):
-        return self._root_node
+        if self._xml_obj is None:
+            self._xml_obj = clean_and_parse_xml(self._xml_str)
+        return self._xml_obj.documentElement
 
     def get_root_node_name(self):
-        return self._root_node.nodeName
+        return self._root_node_name
 
     def get(self, abbreviated_xpath):
         return self.to_flat_dict()[abbreviated_xpath]
@@ -322,8 +616,7 @@ class XFormInstanceParser(object):
     def get_attributes(self):
         return self._attributes
 
-    def _set_attributes(self):
-        all_attributes = list(_get_all_attributes(self._root_node))
+    def _set_attributes(self, all_attributes):
         for key, value in all_attributes:
             # commented since enketo forms may have the template attribute in
             # multiple xml tags and I dont see the harm in overiding
@@ -347,6 +640,95 @@ class XFormInstanceParser(object):
         return result
 
 
+class ParsedSubmission(object):
+    """
+    A submitted instance XML string which is parsed at most once, no matter
+    how many of its properties are read along the ingestion path.
+
+    Parsing is deferred until a property is first accessed, so that creating
+    one is free and parsing errors surface where they always have.
+    """
+
+    def __init__(self, xml_str):
+        self.xml = xml_str
+        self._parsers = {}
+
+    @cached_property
+    def lxml_root(self):
+        """
+        The lxml tree of the document when the lxml engine is used and can
+        read it, from which its properties are then read; None otherwise.
+        """
+        if get_xform_instance_parser_engine() is not _parse_with_lxml:
+            return None
+        try:
+            return parse_lxml_tree(self.xml)
+        except EngineFallback:
+            return None
+
+    @cached_property
+    def xml_obj(self):
+        return clean_and_parse_xml(self.xml)
+
+    def _get(self, from_lxml_root, from_xml_obj):
+        if self.lxml_root is not None:
+            try:
+                return from_lxml_root(self.lxml_root)
+            except EngineFallback:
+                pass
+        return from_xml_obj(self.xml_obj)
+
+    @cached_property
+    def uuid(self):
+        return self._get(_get_uuid_from_lxml_root, _get_uuid_from_xml_obj)
+
+    @cached_property
+    def deprecated_uuid(self):
+        return self._get(_get_deprecated_uuid_from_lxml_root,
+                         _get_deprecated_uuid_from_xml_obj)
+
+    @cached_property
+    def submission_date(self):
+        return self._get(_get_submission_date_from_lxml_root,
+                         _get_submission_date_from_xml_obj)
+
+    @cached_property
+    def id_string(self):
+        return self._get(_get_id_string_from_lxml_root,
+                         get_id_string_from_xml_obj)
+
+    @cached_property
+    def root_node_name(self):
+        return self._get(lambda lxml_root: _lxml_node_name(lxml_root, {}),
+                         lambda xml_obj: xml_obj.documentElement.nodeName)
+
+    def is_for(self, xml_str):
+        """Return `True` if this is the parsed form of `xml_str`."""
+        return xml_str is self.xml or xml_str == self.xml
+
+    def get_parser(self, data_dictionary):
+        """
+        Return an `XFormInstanceParser` for `data_dictionary` built from the
+        already parsed document.
+        """
+        key = data_dictionary.pk
+        if key not in self._parsers:
+            if self.lxml_root is not None:
+                parser = XFormInstanceParser(
+                    self.xml, data_dictionary, lxml_root=self.lxml_root)
+            else:
+                parser = XFormInstanceParser(
+                    self.xml, data_dictionary, xml_obj=self.xml_obj)
+            self._parsers[key] = parser
+        return self._parsers[key]
+
+    def to_dict(self, data_dictionary):
+        return self.get_parser(data_dictionary).to_dict()
+
+    def to_flat_dict(self, data_dictionary):
+        return self.get_parser(data_dictionary).to_flat_dict()
+
+
 def xform_instance_to_dict(xml_str, data_dictionary):
     parser = XFormInstanceParser(xml_str, data_dictionary)
     return parser.to_dict()
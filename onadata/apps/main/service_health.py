@@ -5,6 +5,7 @@ from django.conf import settings
 from django.http import HttpResponse
 
 from onadata.apps.logger.models import Instance
+from onadata.libs.utils.form_schema_cache import form_schema_cache
 
 def service_health(request):
     ''' Return a HTTP 200 if some very basic runtime tests of the application
@@ -35,10 +36,13 @@ def service_health(request):
         u'{}\r\n\r\n'
         u'Mongo: {} in {:.3} seconds\r\n'
         u'Postgres: {} in {:.3} seconds\r\n'
+        u'Form schema cache: {hits} hits, {misses} misses, '
+        u'{size}/{max_size} entries\r\n'
     ).format(
         'FAIL' if any_failure else 'OK',
         mongo_message, mongo_time,
         postgres_message, postgres_time,
+        **form_schema_cache.stats()
     )
 
     return HttpResponse(
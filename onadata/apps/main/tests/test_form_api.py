@@ -5,6 +5,7 @@ from django.core.urlresolvers import reverse
 
 from onadata.apps.main.views import api
 from onadata.apps.api.mongo_helper import MongoHelper
+from onadata.apps.viewer.models.parsed_instance import ParsedInstance
 from test_base import TestBase
 
 
@@ -32,7 +33,7 @@ class TestFormAPI(TestBase):
         self.assertEqual(response.status_code, 200)
         d = dict_for_mongo_without_userform_id(
             self.xform.instances.all()[0].parsed_instance)
-        find_d = json.loads(response.content)[0]
+        find_d = json.loads(self._get_response_content(response))[0]
         self.assertEqual(find_d, d)
 
     def test_api_with_query(self):
@@ -44,7 +45,7 @@ class TestFormAPI(TestBase):
         self.assertEqual(response.status_code, 200)
         d = dict_for_mongo_without_userform_id(
             self.xform.instances.all()[0].parsed_instance)
-        find_d = json.loads(response.content)[0]
+        find_d = json.loads(self._get_response_content(response))[0]
         self.assertEqual(find_d, d)
 
     def test_api_query_no_records(self):
@@ -54,28 +55,39 @@ class TestFormAPI(TestBase):
         data = {'query': query}
         response = self.client.get(self.api_url, data)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.content, '[]')
+        self.assertEqual(self._get_response_content(response), '[]')
 
     def test_handle_bad_json(self):
         response = self.client.get(self.api_url, {'query': 'bad'})
         self.assertEqual(response.status_code, 400)
-        self.assertEqual(True, 'JSON' in response.content)
+        self.assertEqual(True, 'JSON' in self._get_response_content(response))
 
     def test_api_jsonp(self):
         # query string
         callback = 'jsonpCallback'
         response = self.client.get(self.api_url, {'callback': callback})
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.content.startswith(callback + '('), True)
-        self.assertEqual(response.content.endswith(')'), True)
+        content = self._get_response_content(response)
+        self.assertEqual(content.startswith(callback + '('), True)
+        self.assertEqual(content.endswith(')'), True)
         start = callback.__len__() + 1
-        end = response.content.__len__() - 1
-        content = response.content[start: end]
+        end = content.__len__() - 1
+        content = content[start: end]
         d = dict_for_mongo_without_userform_id(
             self.xform.instances.all()[0].parsed_instance)
         find_d = json.loads(content)[0]
         self.assertEqual(find_d, d)
 
+    def test_api_ndjson(self):
+        response = self.client.get(self.api_url, {'format': 'ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        d = dict_for_mongo_without_userform_id(
+            self.xform.instances.all()[0].parsed_instance)
+        lines = self._get_response_content(response).splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0]), d)
+
     def test_api_with_query_start_limit(self):
         # query string
         query = '{"transport/available_transportation_types_to_referral_facil'\
@@ -85,7 +97,7 @@ class TestFormAPI(TestBase):
         self.assertEqual(response.status_code, 200)
         d = dict_for_mongo_without_userform_id(
             self.xform.instances.all()[0].parsed_instance)
-        find_d = json.loads(response.content)[0]
+        find_d = json.loads(self._get_response_content(response))[0]
         self.assertEqual(find_d, d)
 
     def test_api_with_query_invalid_start_limit(self):
@@ -96,6 +108,26 @@ class TestFormAPI(TestBase):
         response = self.client.get(self.api_url, data)
         self.assertEqual(response.status_code, 400)
 
+    def test_api_with_after(self):
+        instance = self.xform.instances.all()[0]
+        data = {'after': 0, 'limit': 1}
+        response = self.client.get(self.api_url, data)
+        self.assertEqual(response.status_code, 200)
+        find_d = json.loads(self._get_response_content(response))[0]
+        self.assertEqual(find_d['_id'], instance.pk)
+        self.assertIn('after=%s' % instance.pk, response['Link'])
+
+        data = {'after': instance.pk, 'limit': 1}
+        response = self.client.get(self.api_url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._get_response_content(response), '[]')
+        self.assertFalse(response.has_header('Link'))
+
+    def test_api_with_after_and_start(self):
+        data = {'after': 0, 'start': 1}
+        response = self.client.get(self.api_url, data)
+        self.assertEqual(response.status_code, 400)
+
     def test_api_count(self):
         # query string
         query = '{"transport/available_transportation_types_to_referral_facil'\
@@ -103,7 +135,7 @@ class TestFormAPI(TestBase):
         data = {'query': query, 'count': 1}
         response = self.client.get(self.api_url, data)
         self.assertEqual(response.status_code, 200)
-        find_d = json.loads(response.content)[0]
+        find_d = json.loads(self._get_response_content(response))[0]
         self.assertTrue('count' in find_d)
         self.assertEqual(find_d.get('count'), 1)
 
@@ -116,7 +148,7 @@ class TestFormAPI(TestBase):
         data = {'query': query, 'fields': columns}
         response = self.client.get(self.api_url, data)
         self.assertEqual(response.status_code, 200)
-        find_d = json.loads(response.content)[0]
+        find_d = json.loads(self._get_response_content(response))[0]
         self.assertTrue(
             'transport/available_transportation_types_to_referral_facility' in
             find_d)
@@ -151,14 +183,14 @@ class TestFormAPI(TestBase):
             'lity": "daily"}]}'}
         response = self.client.get(self.api_url, params)
         self.assertEqual(response.status_code, 200)
-        data = json.loads(response.content)
+        data = json.loads(self._get_response_content(response))
         self.assertEqual(len(data), 2)
 
         # check that blank params give us all our records i.e. 3
         params = {}
         response = self.client.get(self.api_url, params)
         self.assertEqual(response.status_code, 200)
-        data = json.loads(response.content)
+        data = json.loads(self._get_response_content(response))
         self.assertEqual(len(data), 3)
 
     def test_api_cors_options(self):
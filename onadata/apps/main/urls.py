@@ -159,8 +159,15 @@ urlpatterns = patterns(
     url(r"^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/data\.sav.zip",
         'onadata.apps.viewer.views.data_export', name='sav_zip_export',
         kwargs={'export_type': 'sav_zip'}),
+    url(r"^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/data\.parquet.zip",
+        'onadata.apps.viewer.views.data_export', name='parquet_zip_export',
+        kwargs={'export_type': 'parquet_zip'}),
     url(r"^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/data\.kml$",
         'onadata.apps.viewer.views.kml_export'),
+    url(r"^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/data\.geojson$",
+        'onadata.apps.viewer.views.geojson_export', name='geojson_export'),
+    url(r"^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/data\.zip$",
+        'onadata.apps.viewer.views.zip_export', name='zip_export'),
     url(r"^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/gdocs$",
         'onadata.apps.viewer.views.google_xls_export'),
     url(r"^(?P<username>\w+)/forms/(?P<id_string>[^/]+)/map_embed",
@@ -59,7 +59,10 @@ from onadata.libs.utils.user_auth import helper_auth_helper
 from onadata.libs.utils.user_auth import set_profile_data
 from onadata.libs.utils.log import audit_log, Actions
 from onadata.libs.utils.qrcode import generate_qrcode
-from onadata.libs.utils.viewer_tools import enketo_url
+from onadata.libs.utils.streaming import CONTENT_TYPES, JSON, JSONP,\
+    NDJSON, stream_records
+from onadata.libs.utils.viewer_tools import add_next_cursor_link,\
+    enketo_url
 from onadata.libs.utils.export_tools import upload_template_for_external_export
 
 
@@ -492,6 +495,12 @@ def api(request, username=None, id_string=None):
     http://json.parser.online.fr/
 
     E.g. api?query='{"last_name": "Smith"}'
+
+    Pass `after`, starting with 0, to page through the results in `_id`
+    order; the `Link` header of the response points to the next page.
+
+    Results are streamed as a JSON array, as JSONP if a `callback` is given,
+    or as newline delimited JSON with `format=ndjson`.
     """
     if request.method == "OPTIONS":
         response = HttpResponse()
@@ -520,19 +529,29 @@ def api(request, username=None, id_string=None):
         if 'count' in request.GET:
             args["count"] = True if int(request.GET.get('count')) > 0\
                 else False
-        cursor = ParsedInstance.query_mongo(**args)
+        if request.GET.get('after'):
+            args["after"] = request.GET.get('after')
+        cursor = ParsedInstance.query_mongo(xform=xform, **args)
     except ValueError as e:
         return HttpResponseBadRequest(e.__str__())
 
-    records = list(record for record in cursor)
-    response_text = json_util.dumps(records)
-
-    if 'callback' in request.GET and request.GET.get('callback') != '':
-        callback = request.GET.get('callback')
-        response_text = ("%s(%s)" % (callback, response_text))
+    callback = request.GET.get('callback')
+    if callback:
+        stream_format = JSONP
+    elif request.GET.get('format') == NDJSON:
+        stream_format = NDJSON
+    else:
+        stream_format = JSON
 
-    response = HttpResponse(response_text, content_type='application/json')
+    # records are read from Mongo as they are sent
+    response = stream_records(cursor, stream_format, callback,
+                              dumps=json_util.dumps)
     add_cors_headers(response)
+    if stream_format == NDJSON:
+        response['Content-Type'] = CONTENT_TYPES[NDJSON]
+    if "after" in args and not args.get("count"):
+        add_next_cursor_link(request, response, ParsedInstance.get_next_cursor(
+            cursor, args.get("limit", ParsedInstance.DEFAULT_LIMIT)))
 
     return response
 
@@ -11,9 +11,9 @@
     Output is HTML ; not raw. Output uses only span markup with classes
     so it should be somewhat easy to restyle """
 
-import json
 import datetime
 
+from onadata.libs.utils.form_schema_cache import get_form_schema
 from tools import (DEFAULT_SEPARATOR, DEFAULT_ALLOW_MEDIA, MEDIA_TYPES,
                    DEFAULT_DATE_FORMAT, DEFAULT_DATETIME_FORMAT)
 
@@ -157,7 +157,7 @@ def get_autodoc_for(xform):
 
         Helper texts are based on type of question and accepted values """
 
-    json_survey = json.loads(xform.json)
+    json_survey = get_form_schema(xform).json_survey
 
     # setup formatting values
     separator = json_survey.get('sms_separator', DEFAULT_SEPARATOR) \
@@ -1,6 +1,5 @@
 import base64
 from datetime import datetime, date
-import json
 import re
 import StringIO
 
@@ -12,6 +11,7 @@ from onadata.apps.sms_support.tools import SMS_API_ERROR, SMS_PARSING_ERROR,\
     DEFAULT_SEPARATOR, NA_VALUE, META_FIELDS, MEDIA_TYPES,\
     DEFAULT_DATE_FORMAT, DEFAULT_DATETIME_FORMAT, SMS_SUBMISSION_ACCEPTED,\
     is_last
+from onadata.libs.utils.form_schema_cache import get_form_schema
 from onadata.libs.utils.logger_tools import dict2xform
 
 
@@ -30,7 +30,7 @@ class SMSCastingError(ValueError):
 
 def parse_sms_text(xform, identity, text):
 
-    json_survey = json.loads(xform.json)
+    json_survey = get_form_schema(xform).json_survey
 
     separator = json_survey.get('sms_separator', DEFAULT_SEPARATOR) \
         or DEFAULT_SEPARATOR
@@ -298,7 +298,7 @@ def process_incoming_smses(username, incomings,
                                                                    text)
 
         # retrieve sms_response if exist in the form.
-        json_survey = json.loads(xform.json)
+        json_survey = get_form_schema(xform).json_survey
         if json_survey.get('sms_response'):
             resp_str.update({'success': json_survey.get('sms_response')})
 
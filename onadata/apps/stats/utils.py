@@ -1,7 +1,8 @@
-from onadata.libs.data.query import get_form_submissions_grouped_by_field
+from onadata.apps.logger.models.daily_submission_count import\
+    get_daily_submission_counts
 
 
 def get_form_submissions_per_day(xform):
     """Number of submissions per day for the form."""
-    return get_form_submissions_grouped_by_field(xform, '_submission_time',
-                                                 'date')
+    return [{'date': day.isoformat(), 'count': count}
+            for day, count in get_daily_submission_counts(xform)]
@@ -15,7 +15,7 @@ def stats(request, username=None, id_string=None):
             XForm, user=request.user, id_string__exact=id_string)
         data = {
             'xform': xform,
-            'context.submission_stats': get_form_submissions_per_day(xform)
+            'submission_stats': get_form_submissions_per_day(xform)
         }
     else:
         data = {'xforms': XForm.objects.filter(user=request.user)}
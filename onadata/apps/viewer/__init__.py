@@ -0,0 +1 @@
+default_app_config = "onadata.apps.viewer.app.ViewerConfig"
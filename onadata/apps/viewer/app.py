@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+from django.apps import AppConfig
+from django.conf import settings
+
+
+class ViewerConfig(AppConfig):
+    name = "onadata.apps.viewer"
+    verbose_name = "viewer"
+
+    def ready(self):
+        if getattr(settings, 'MONGO_ENSURE_INDEXES_ON_STARTUP', False):
+            from onadata.apps.viewer.mongo_indexes import\
+                ensure_indexes_in_background
+            ensure_indexes_in_background()
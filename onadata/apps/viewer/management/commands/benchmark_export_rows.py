@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# vim: ai ts=4 sts=4 et sw=4 fileencoding=utf-8
+'''
+Django management command timing how `ExportBuilder` turns the rows of a
+wide form into the values it writes: field by field through the row dicts,
+as before the row plans compiled by `ExportBuilder.set_survey()`, and with
+the plans. The generated form has grouped integer, decimal, date, select
+multiple and geopoint questions, some with names containing dots, and a
+repeat group.
+
+:Example:
+    python manage.py benchmark_export_rows
+    python manage.py benchmark_export_rows --fields 2000 --records 100
+'''
+import copy
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.translation import ugettext_lazy
+from pyxform.builder import create_survey_element_from_dict
+
+from onadata.apps.api.mongo_helper import MongoHelper
+from onadata.libs.utils.export_tools import ExportBuilder,\
+    dict_to_joined_export, encode_if_str, encode_value
+
+
+REPEAT_FIELDS = 20
+REPEAT_COUNT = 5
+CHOICES = ['a', 'b', 'c', 'd']
+# question type, answer
+QUESTION_TYPES = [
+    ('text', u'answer'),
+    ('integer', u'12'),
+    ('decimal', u'1.5'),
+    ('date', u'2019-01-01'),
+    ('select all that apply', u'a c'),
+    ('geopoint', u'-1.2 36.8 1700 5'),
+]
+
+
+def _generate_question(i, name):
+    question_type, answer = QUESTION_TYPES[i % len(QUESTION_TYPES)]
+    question = {'type': question_type, 'name': name, 'label': name}
+    if question_type == 'select all that apply':
+        question['choices'] = [{'name': c, 'label': c} for c in CHOICES]
+    return question, answer
+
+
+def _generate_survey_and_record(fields):
+    groups = [{'type': 'group', 'name': u'group_%d' % i, 'label': u'Group',
+               'children': []} for i in range(25)]
+    record = {}
+    for i in range(fields):
+        # one question in ten has a name Mongo does not accept as a key
+        name = u'question.%d' % i if i % 10 == 0 else u'question_%d' % i
+        group = groups[i % len(groups)]
+        question, answer = _generate_question(i, name)
+        group['children'].append(question)
+        record[MongoHelper.encode(u'%s/%s' % (group['name'], name))] = answer
+
+    repeat = {'type': 'repeat', 'name': u'repeat_group', 'label': u'Repeat',
+              'children': []}
+    repeat_answers = {}
+    for i in range(REPEAT_FIELDS):
+        name = u'item_%d' % i
+        question, answer = _generate_question(i, name)
+        repeat['children'].append(question)
+        repeat_answers[u'repeat_group/%s' % name] = answer
+    record[u'repeat_group'] = [dict(repeat_answers)
+                               for _ in range(REPEAT_COUNT)]
+    record.update({
+        u'_id': 1,
+        u'_uuid': u'2e599f6fe0de42d3a1417fb7d821c859',
+        u'_submission_time': u'2019-01-01T00:00:00',
+        u'_tags': [],
+        u'_notes': [],
+    })
+
+    survey = create_survey_element_from_dict({
+        'type': 'survey', 'name': u'wide_form', 'id_string': u'wide_form',
+        'children': groups + [repeat]})
+    return survey, record
+
+
+def _get_values_through_dicts(export_builder, row, section):
+    # what `ExportBuilder.pre_process_row()` and the writers did for each
+    # row before the row plans
+    section_name = section['name']
+    if section_name in export_builder.encoded_fields:
+        row = ExportBuilder.decode_mongo_encoded_fields(
+            row, export_builder.encoded_fields[section_name])
+    if section_name in export_builder.select_multiples:
+        row = ExportBuilder.split_select_multiples(
+            row, export_builder.select_multiples[section_name])
+    if section_name in export_builder.gps_fields:
+        row = ExportBuilder.split_gps_components(
+            row, export_builder.gps_fields[section_name])
+    for elm in section['elements']:
+        value = row.get(elm['xpath'])
+        if elm['type'] in ExportBuilder.TYPES_TO_CONVERT\
+                and value is not None and value != '':
+            row[elm['xpath']] = ExportBuilder.convert_type(
+                value, elm['type'])
+    return [encode_if_str(row, field)
+            for field in export_builder.get_fields(section)]
+
+
+def _get_values_through_plan(export_builder, row, section):
+    return [encode_value(value)
+            for value in export_builder.get_row_values(row, section)]
+
+
+class Command(BaseCommand):
+    help = ugettext_lazy("Benchmark the processing of the rows of a wide "
+                         "form for export.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fields',
+            type=int,
+            default=1000,
+            help='Number of questions of the form, outside of the repeat.',
+        )
+        parser.add_argument(
+            '--records',
+            type=int,
+            default=200,
+            help='Number of records processed in each mode.',
+        )
+
+    def _get_section_rows(self, export_builder, record, records):
+        survey_name = export_builder.survey.name
+        indices = {}
+        section_rows = []
+        for index in range(1, records + 1):
+            output = ExportBuilder.decode_mongo_encoded_section_names(
+                dict_to_joined_export(copy.deepcopy(record), index, indices,
+                                      survey_name))
+            for section in export_builder.sections:
+                rows = output.get(section['name'], [])
+                for row in rows if isinstance(rows, list) else [rows]:
+                    section_rows.append((section, row))
+        return section_rows
+
+    def _time(self, function, export_builder, section_rows):
+        section_rows = [(section, copy.deepcopy(row))
+                        for section, row in section_rows]
+        start = time.time()
+        values = [function(export_builder, row, section)
+                  for section, row in section_rows]
+        return (time.time() - start) * 1000, values
+
+    def handle(self, *args, **options):
+        survey, record = _generate_survey_and_record(options['fields'])
+        export_builder = ExportBuilder()
+        export_builder.set_survey(survey)
+        section_rows = self._get_section_rows(
+            export_builder, record, options['records'])
+        self.stdout.write(u'%d columns, %d rows' % (
+            sum(len(export_builder.get_fields(section))
+                for section in export_builder.sections), len(section_rows)))
+
+        results = []
+        for name, function in [('dicts', _get_values_through_dicts),
+                               ('plan', _get_values_through_plan)]:
+            ms, values = self._time(function, export_builder, section_rows)
+            results.append(values)
+            self.stdout.write(u'%-5s  %.1fms  (%.3fms per record)' % (
+                name, ms, ms / options['records']))
+        if results[0] != results[1]:
+            self.stderr.write(u'the modes wrote different values')
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.translation import ugettext_lazy
+
+from onadata.apps.viewer.models.outbox import OutboxEntry
+
+
+class Command(BaseCommand):
+    help = ugettext_lazy("Sync the submissions waiting in the outbox to "
+                         "MongoDB and call their REST services.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batchsize',
+            type=int,
+            default=None,
+            help=ugettext_lazy("Number of outbox entries per batch"))
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            default=False,
+            help=ugettext_lazy("Keep draining the outbox until interrupted"))
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1,
+            help=ugettext_lazy("Seconds to wait when no outbox entry could "
+                               "be completed in loop mode"))
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            # entries which failed are put off, so a batch completing
+            # nothing means there is nothing left to do for now
+            completed = OutboxEntry.drain(options['batchsize'])
+            total += completed
+            if not completed:
+                if not options['loop']:
+                    break
+                time.sleep(options['sleep'])
+        self.stdout.write("Completed %d outbox entries." % total)
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# vim: ai ts=4 sts=4 et sw=4 fileencoding=utf-8
+'''
+Django management command creating the MongoDB indexes declared in
+`onadata.apps.viewer.mongo_indexes` and checking that the queries sent on
+the hot paths use them.
+
+:Example:
+    python manage.py ensure_mongo_indexes
+    python manage.py ensure_mongo_indexes --dry-run --explain
+'''
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.translation import ugettext_lazy
+
+from onadata.apps.viewer.mongo_indexes import ensure_indexes,\
+    explain_canonical_queries, get_missing_indexes
+
+
+class Command(BaseCommand):
+    help = ugettext_lazy("Create the missing MongoDB indexes and report "
+                         "queries which scan whole collections.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            default=False,
+            help=ugettext_lazy("Only list the missing indexes"))
+        parser.add_argument(
+            '--explain',
+            action='store_true',
+            default=False,
+            help=ugettext_lazy("Explain the canonical queries and report "
+                               "collection scans"))
+        parser.add_argument(
+            '-u', '--username',
+            default='username',
+            help=ugettext_lazy("Username used in the explained queries"))
+        parser.add_argument(
+            '-i', '--id_string',
+            default='id_string',
+            help=ugettext_lazy("Form id string used in the explained "
+                               "queries"))
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            for name, indexes in sorted(get_missing_indexes().items()):
+                for index in indexes:
+                    self.stdout.write(u'Missing index on %s: %s' % (
+                        name, index.document['name']))
+        else:
+            for name, index_names in sorted(ensure_indexes().items()):
+                self.stdout.write(u'Created indexes on %s: %s' % (
+                    name, u', '.join(index_names)))
+
+        if not options['explain']:
+            return
+
+        collection_scans = 0
+        for description, stages, is_collection_scan in \
+                explain_canonical_queries(options['username'],
+                                          options['id_string']):
+            if is_collection_scan:
+                collection_scans += 1
+            self.stdout.write(u'%s%s: %s' % (
+                u'COLLECTION SCAN ' if is_collection_scan else u'',
+                description, u' > '.join(unicode(s) for s in stages)))
+
+        if collection_scans:
+            raise CommandError(u'%d queries scan whole collections.'
+                               % collection_scans)
@@ -1,10 +1,11 @@
-from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 from django.utils.translation import ugettext_lazy
 from optparse import make_option
 
 from onadata.apps.viewer.models.parsed_instance import ParsedInstance
-from onadata.libs.utils.common_tags import USERFORM_ID
+from onadata.apps.viewer.mongo_indexes import ensure_indexes
+from onadata.apps.viewer.mongo_rebuild import RebuildCheckpoint,\
+    rebuild_mongo
 
 
 class Command(BaseCommand):
@@ -13,50 +14,54 @@ class Command(BaseCommand):
         make_option(
             '--batchsize',
             type='int',
-            default=100,
+            default=500,
             help=ugettext_lazy("Number of records to process per query")),
+        make_option(
+            '--workers',
+            type='int',
+            default=1,
+            help=ugettext_lazy("Number of processes writing to MongoDB")),
+        make_option(
+            '--checkpoint',
+            help=ugettext_lazy("File recording the progress, from which an "
+                               "interrupted run resumes")),
         make_option('-u', '--username',
                     help=ugettext_lazy("Username of the form user")),
         make_option('-i', '--id_string',
                     help=ugettext_lazy("id string of the form")))
 
     def handle(self, *args, **kwargs):
-        ids = None
         # check for username AND id_string - if one exists so must the other
         if (kwargs.get('username') and not kwargs.get('id_string')) or (
                 not kwargs.get('username') and kwargs.get('id_string')):
             raise CommandError("username and id_string must either both be "
                                "specified or neither")
-        elif kwargs.get('username') and kwargs.get('id_string'):
-            from onadata.apps.logger.models import XForm, Instance
+        filter_queryset = ParsedInstance.objects.all()
+        if kwargs.get('username') and kwargs.get('id_string'):
+            from onadata.apps.logger.models import XForm
             xform = XForm.objects.get(user__username=kwargs.get('username'),
                                       id_string=kwargs.get('id_string'))
-            ids = [i.pk for i in Instance.objects.filter(xform=xform)]
-        # num records per run
-        batchsize = kwargs['batchsize']
-        start = 0
-        end = start + batchsize
-        filter_queryset = ParsedInstance.objects.all()
-        # instance ids for when we have a username and id_string
-        if ids:
-            filter_queryset = ParsedInstance.objects.filter(instance__in=ids)
-        # total number of records
-        record_count = filter_queryset.count()
-        i = 0
-        while start < record_count:
-            print 'Querying record %s to %s' % (start, end-1)
-            queryset = filter_queryset.order_by('pk')[start:end]
-            for pi in queryset.iterator():
-                if pi.update_mongo(async=False):
-                    i += 1
-                else:
-                    print("\033[91m[ERROR] Could not parse instance {}\033[0m".format(pi.instance.uuid))
+            filter_queryset = filter_queryset.filter(instance__xform=xform)
+
+        checkpoint = None
+        if kwargs.get('checkpoint'):
+            checkpoint = RebuildCheckpoint(kwargs['checkpoint'])
+            if checkpoint.load():
+                print 'Resuming after instance %d' % checkpoint.load()
+
+        def progress(synced, failed_ids, last_id):
+            print 'Updated %d records, up to instance %d' % (synced, last_id)
 
-                if (i % 1000) == 0:
-                    print 'Updated %d records, flushing MongoDB...' % i
-                    settings.MONGO_CONNECTION.admin.command({'fsync': 1})
-            start = start + batchsize
-            end = min(record_count, start + batchsize)
+        synced, failed_ids = rebuild_mongo(
+            filter_queryset, chunk_size=kwargs['batchsize'],
+            workers=kwargs['workers'], checkpoint=checkpoint,
+            progress=progress)
+        for instance_id in failed_ids:
+            print("\033[91m[ERROR] Could not update instance {}\033[0m"
+                  .format(instance_id))
+        print 'Updated %d records, %d errors' % (synced, len(failed_ids))
+        if checkpoint:
+            checkpoint.clear()
         # add indexes after writing so the writing operation above is not
         # slowed
-        settings.MONGO_DB.instances.create_index(USERFORM_ID)
+        ensure_indexes()
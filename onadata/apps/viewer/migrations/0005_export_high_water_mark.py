@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewer', '0004_outboxentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='export',
+            name='last_instance_id',
+            field=models.IntegerField(null=True, default=None),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='instance_count',
+            field=models.IntegerField(null=True, default=None),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='options_key',
+            field=models.CharField(max_length=255, null=True, blank=True),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewer', '0006_parquet_zip_export'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='export',
+            name='export_key',
+            field=models.CharField(max_length=40, null=True, blank=True,
+                                   db_index=True),
+        ),
+        migrations.AddField(
+            model_name='export',
+            name='filtered',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('viewer', '0007_export_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='outboxentry',
+            name='attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='outboxentry',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now,
+                                       db_index=True),
+        ),
+        migrations.AddField(
+            model_name='outboxentry',
+            name='is_dead_letter',
+            field=models.BooleanField(default=False),
+        ),
+    ]
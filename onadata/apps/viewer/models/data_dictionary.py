@@ -2,7 +2,7 @@ import os
 import re
 
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from guardian.shortcuts import assign_perm, get_perms_for_model
 from pyxform import SurveyElementBuilder
 from pyxform.builder import create_survey_from_xls
@@ -17,6 +17,7 @@ from onadata.apps.api.mongo_helper import MongoHelper
 from onadata.libs.utils.common_tags import UUID, SUBMISSION_TIME, TAGS, NOTES
 from onadata.libs.utils.export_tools import question_types_to_exclude,\
     DictOrganizer
+from onadata.libs.utils.form_schema_cache import invalidate_form_schema
 from onadata.libs.utils.model_tools import queryset_iterator, set_uuid
 
 
@@ -424,3 +425,10 @@ def set_object_permissions(sender, instance=None, created=False, **kwargs):
             assign_perm(perm.codename, instance.user, instance)
 post_save.connect(set_object_permissions, sender=DataDictionary,
                   dispatch_uid='xform_object_permissions')
+
+# keep the per-process form schema cache from serving replaced forms
+for model in (XForm, DataDictionary):
+    post_save.connect(invalidate_form_schema, sender=model,
+                      dispatch_uid='invalidate_form_schema_%s' % model.__name__)
+    post_delete.connect(invalidate_form_schema, sender=model,
+                        dispatch_uid='delete_form_schema_%s' % model.__name__)
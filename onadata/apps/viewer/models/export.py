@@ -31,6 +31,7 @@ class Export(models.Model):
     GDOC_EXPORT = 'gdoc'
     CSV_ZIP_EXPORT = 'csv_zip'
     SAV_ZIP_EXPORT = 'sav_zip'
+    PARQUET_ZIP_EXPORT = 'parquet_zip'
     SAV_EXPORT = 'sav'
     EXTERNAL_EXPORT = 'external'
     ANALYSER_EXPORT= 'analyser'
@@ -42,6 +43,7 @@ class Export(models.Model):
         'zip': 'zip',
         'csv_zip': 'zip',
         'sav_zip': 'zip',
+        'parquet_zip': 'zip',
         'sav': 'sav',
         'kml': 'vnd.google-earth.kml+xml'
     }
@@ -54,6 +56,7 @@ class Export(models.Model):
         (KML_EXPORT, 'kml'),
         (CSV_ZIP_EXPORT, 'CSV ZIP'),
         (SAV_ZIP_EXPORT, 'SAV ZIP'),
+        (PARQUET_ZIP_EXPORT, 'Parquet ZIP'),
         (SAV_EXPORT, 'SAV'),
         (EXTERNAL_EXPORT, 'Excel'),
         (ANALYSER_EXPORT, 'Analyser')
@@ -76,7 +79,7 @@ class Export(models.Model):
     # deleted xform - bad things happen
     filedir = models.CharField(max_length=255, null=True, blank=True)
     export_type = models.CharField(
-        max_length=10, choices=EXPORT_TYPES, default=XLS_EXPORT
+        max_length=16, choices=EXPORT_TYPES, default=XLS_EXPORT
     )
     task_id = models.CharField(max_length=255, null=True, blank=True)
     # time of last submission when this export was created
@@ -84,6 +87,17 @@ class Export(models.Model):
     # status
     internal_status = models.SmallIntegerField(default=PENDING)
     export_url = models.URLField(null=True, default=None)
+    # high-water mark of incremental exports: the greatest instance id
+    # exported, how many submissions were exported and with which options
+    last_instance_id = models.IntegerField(null=True, default=None)
+    instance_count = models.IntegerField(null=True, default=None)
+    options_key = models.CharField(max_length=255, null=True, blank=True)
+    # hash of the parameters of the export and of the state of the form's
+    # submissions when it was built, see `export_tools.get_export_key()`
+    export_key = models.CharField(max_length=40, null=True, blank=True,
+                                  db_index=True)
+    # whether only the submissions matching a query were exported
+    filtered = models.BooleanField(default=False)
 
     class Meta:
         app_label = "viewer"
@@ -94,24 +108,31 @@ class Export(models.Model):
             # if new, check if we've hit our limit for exports for this form,
             # if so, delete oldest
             # TODO: let user know that last export will be deleted
+            # filtered exports are counted apart, so that they never push
+            # out those of all the submissions
             num_existing_exports = Export.objects.filter(
-                xform=self.xform, export_type=self.export_type).count()
+                xform=self.xform, export_type=self.export_type,
+                filtered=self.filtered).count()
 
             if num_existing_exports >= self.MAX_EXPORTS:
-                Export._delete_oldest_export(self.xform, self.export_type)
+                Export._delete_oldest_export(
+                    self.xform, self.export_type, self.filtered)
 
             # update time_of_last_submission with
-            # xform.time_of_last_submission_update
-            self.time_of_last_submission = self.xform.\
-                time_of_last_submission_update()
+            # xform.time_of_last_submission_update, unless the export set it
+            # when it read the submissions
+            if self.time_of_last_submission is None:
+                self.time_of_last_submission = self.xform.\
+                    time_of_last_submission_update()
         if self.filename:
             self.internal_status = Export.SUCCESSFUL
         super(Export, self).save(*args, **kwargs)
 
     @classmethod
-    def _delete_oldest_export(cls, xform, export_type):
+    def _delete_oldest_export(cls, xform, export_type, filtered=False):
         oldest_export = Export.objects.filter(
-            xform=xform, export_type=export_type).order_by('created_on')[0]
+            xform=xform, export_type=export_type,
+            filtered=filtered).order_by('created_on')[0]
         oldest_export.delete()
 
     @property
@@ -150,6 +171,18 @@ class Export(models.Model):
             return os.path.join(self.filedir, self.filename)
         return None
 
+    @property
+    def is_stored_locally(self):
+        """
+        Whether `full_filepath` is the path of the file in the storage,
+        rather than that of a temporary copy which its caller must remove.
+        """
+        try:
+            get_storage_class()().path(self.filepath)
+        except NotImplementedError:
+            return False
+        return True
+
     @property
     def full_filepath(self):
         if self.filepath:
@@ -171,7 +204,7 @@ class Export(models.Model):
         # get newest export for xform
         try:
             latest_export = Export.objects.filter(
-                xform=xform, export_type=export_type,
+                xform=xform, export_type=export_type, filtered=False,
                 internal_status__in=[Export.SUCCESSFUL, Export.PENDING])\
                 .latest('created_on')
         except cls.DoesNotExist:
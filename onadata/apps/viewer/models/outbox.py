@@ -0,0 +1,138 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone
+
+from onadata.apps.logger.models import Instance
+from onadata.apps.restservice.utils import call_service
+from onadata.apps.viewer.models.parsed_instance import ParsedInstance
+from onadata.apps.viewer.mongo_bulk_writer import MongoBulkWriter
+
+
+DEFAULT_OUTBOX_BATCH_SIZE = 500
+DEFAULT_OUTBOX_MAX_ATTEMPTS = 10
+# seconds before the first retry, doubled after each failed attempt
+DEFAULT_OUTBOX_RETRY_DELAY = 30
+DEFAULT_OUTBOX_MAX_RETRY_DELAY = 3600
+
+
+def outbox_enabled():
+    return getattr(settings, 'SUBMISSION_OUTBOX_ENABLED', False)
+
+
+class OutboxEntry(models.Model):
+    """
+    Work left to do for an `Instance` once the transaction which saved it is
+    committed: syncing it to Mongo and, for new submissions, calling the
+    form's REST services.
+
+    Entries are written by `ParsedInstance.save()` in the same transaction
+    as the `Instance` when `SUBMISSION_OUTBOX_ENABLED` is set, and are
+    processed by `drain()`.
+
+    An entry whose Mongo write fails is retried with an exponential backoff
+    and, after `SUBMISSION_OUTBOX_MAX_ATTEMPTS` attempts, is marked as a
+    dead letter: it is kept for inspection but no longer claimed.
+    """
+    instance = models.ForeignKey(Instance, related_name='outbox_entries')
+    call_services = models.BooleanField(default=False)
+    date_created = models.DateTimeField(auto_now_add=True)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now,
+                                           db_index=True)
+    is_dead_letter = models.BooleanField(default=False)
+
+    class Meta:
+        app_label = 'viewer'
+
+    @classmethod
+    def claim(cls, batch_size):
+        """
+        Lock up to `batch_size` of the oldest entries which are due, are not
+        dead letters and which no other worker has locked. Must be called
+        inside a transaction.
+        """
+        return list(cls.objects.raw(
+            'SELECT * FROM {table} WHERE NOT is_dead_letter '
+            'AND next_attempt_at <= %s ORDER BY id LIMIT %s '
+            'FOR UPDATE SKIP LOCKED'.format(table=cls._meta.db_table),
+            [timezone.now(), batch_size]))
+
+    def retry_later(self):
+        """
+        Count a failed attempt and put off the next one, doubling the delay
+        each time, or mark the entry as a dead letter after the last one.
+        """
+        self.attempts += 1
+        max_attempts = getattr(settings, 'SUBMISSION_OUTBOX_MAX_ATTEMPTS',
+                               DEFAULT_OUTBOX_MAX_ATTEMPTS)
+        if self.attempts >= max_attempts:
+            self.is_dead_letter = True
+        else:
+            delay = getattr(settings, 'SUBMISSION_OUTBOX_RETRY_DELAY',
+                            DEFAULT_OUTBOX_RETRY_DELAY)
+            max_delay = getattr(settings, 'SUBMISSION_OUTBOX_MAX_RETRY_DELAY',
+                                DEFAULT_OUTBOX_MAX_RETRY_DELAY)
+            self.next_attempt_at = timezone.now() + timedelta(
+                seconds=min(delay * 2 ** (self.attempts - 1), max_delay))
+        self.save(update_fields=['attempts', 'next_attempt_at',
+                                 'is_dead_letter'])
+
+    @classmethod
+    def drain(cls, batch_size=None):
+        """
+        Process one batch of entries: save their instances to Mongo in a
+        single bulk write, then call the REST services of new submissions.
+
+        Entries whose Mongo write failed are retried later, see
+        `retry_later()`. Returns the number of entries completed, so that
+        callers can stop once a batch makes no progress.
+        """
+        batch_size = batch_size or getattr(
+            settings, 'SUBMISSION_OUTBOX_BATCH_SIZE',
+            DEFAULT_OUTBOX_BATCH_SIZE)
+
+        with transaction.atomic():
+            entries = cls.claim(batch_size)
+            if not entries:
+                return 0
+
+            # several entries for the same instance are written only once
+            call_services = {}
+            for entry in entries:
+                call_services[entry.instance_id] = \
+                    call_services.get(entry.instance_id) or \
+                    entry.call_services
+
+            parsed_instances = ParsedInstance.objects.filter(
+                instance_id__in=call_services.keys()).select_related(
+                'instance', 'instance__xform', 'instance__xform__user',
+                'instance__user')
+            writer = MongoBulkWriter(max_size=len(call_services) + 1)
+            done_ids = set(call_services) - set(
+                pi.instance_id for pi in parsed_instances)
+            written = []
+            for pi in parsed_instances:
+                if pi.update_mongo(writer=writer):
+                    written.append(pi)
+                else:
+                    # could not be parsed; as without the outbox, there is
+                    # nothing to save nor to send
+                    done_ids.add(pi.instance_id)
+            synced_ids = set(writer.flush())
+
+            for pi in written:
+                if pi.instance_id in synced_ids:
+                    if call_services[pi.instance_id]:
+                        call_service(pi)
+                    done_ids.add(pi.instance_id)
+
+            done = [entry for entry in entries
+                    if entry.instance_id in done_ids]
+            cls.objects.filter(pk__in=[entry.pk for entry in done]).delete()
+            for entry in entries:
+                if entry.instance_id not in done_ids:
+                    entry.retry_later()
+
+        return len(done)
@@ -13,10 +13,12 @@ from django.utils.translation import ugettext as _
 from onadata.apps.logger.models import Instance
 from onadata.apps.logger.models import Note
 from onadata.apps.restservice.utils import call_service
+from onadata.apps.viewer.mongo_bulk_writer import MongoBulkWriter
 from onadata.libs.utils.common_tags import ID, UUID, ATTACHMENTS, GEOLOCATION,\
     SUBMISSION_TIME, MONGO_STRFTIME, BAMBOO_DATASET_ID, DELETEDAT, TAGS,\
     NOTES, SUBMITTED_BY, VALIDATION_STATUS
 from onadata.libs.utils.decorators import apply_form_field_names
+from onadata.libs.utils.form_schema_cache import get_form_schema
 from onadata.libs.utils.model_tools import queryset_iterator
 from onadata.apps.api.mongo_helper import MongoHelper
 
@@ -56,6 +58,14 @@ def update_mongo_instance(record):
     return False
 
 
+@task
+def update_mongo_instances(records):
+    """
+    Upsert a batch of records at once with a `MongoBulkWriter`.
+    """
+    return MongoBulkWriter().write(records)
+
+
 class ParsedInstance(models.Model):
     USERFORM_ID = u'_userform_id'
     STATUS = u'_status'
@@ -75,9 +85,16 @@ class ParsedInstance(models.Model):
     @classmethod
     @apply_form_field_names
     def query_mongo(cls, username, id_string, query, fields, sort, start=0,
-                    limit=DEFAULT_LIMIT, count=False, hide_deleted=True):
-
-        cursor = cls._get_mongo_cursor(query, fields, hide_deleted, username, id_string)
+                    limit=DEFAULT_LIMIT, count=False, hide_deleted=True,
+                    after=None):
+        """
+        Pass `after`, the `_id` of the last record of the previous page,
+        instead of `start` to page through the results in `_id` order without
+        Mongo having to skip over all the preceding records.
+        """
+        after = cls._get_after(after, start)
+        cursor = cls._get_mongo_cursor(query, fields, hide_deleted, username,
+                                       id_string, after=after)
 
         if count:
             return [{"count": cursor.count()}]
@@ -89,7 +106,8 @@ class ParsedInstance(models.Model):
         if start < 0 or limit < 0:
             raise ValueError(_("Invalid start/limit params"))
 
-        return cls._get_paginated_and_sorted_cursor(cursor, start, limit, sort)
+        return cls._get_paginated_and_sorted_cursor(cursor, start, limit, sort,
+                                                    after)
 
     @classmethod
     @apply_form_field_names
@@ -126,9 +144,11 @@ class ParsedInstance(models.Model):
     @apply_form_field_names
     def query_mongo_minimal(
             cls, query, fields, sort, start=0, limit=DEFAULT_LIMIT,
-            count=False, hide_deleted=True):
+            count=False, hide_deleted=True, after=None):
 
-        cursor = cls._get_mongo_cursor(query, fields, hide_deleted)
+        after = cls._get_after(after, start)
+        cursor = cls._get_mongo_cursor(query, fields, hide_deleted,
+                                       after=after)
 
         if count:
             return [{"count": cursor.count()}]
@@ -143,7 +163,8 @@ class ParsedInstance(models.Model):
         if limit > cls.DEFAULT_LIMIT:
             limit = cls.DEFAULT_LIMIT
 
-        return cls._get_paginated_and_sorted_cursor(cursor, start, limit, sort)
+        return cls._get_paginated_and_sorted_cursor(cursor, start, limit, sort,
+                                                    after)
 
     @classmethod
     @apply_form_field_names
@@ -156,8 +177,34 @@ class ParsedInstance(models.Model):
         else:
             return cursor
 
+    @staticmethod
+    def _get_after(after, start):
+        if after is None or after == '':
+            return None
+        if start:
+            raise ValueError(_("start and after params cannot be combined"))
+        try:
+            return int(after)
+        except (TypeError, ValueError):
+            raise ValueError(_("Invalid after param"))
+
+    @classmethod
+    def get_next_cursor(cls, records, limit=DEFAULT_LIMIT):
+        """
+        Returns the `after` value of the page following `records`, the
+        records of a keyset page as a list or a `DecodedCursor` which has not
+        been read yet, or `None` if it was the last one.
+        """
+        if limit < 1:
+            return None
+        try:
+            return records[limit - 1].get(ID)
+        except IndexError:
+            return None
+
     @classmethod
-    def _get_mongo_cursor(cls, query, fields, hide_deleted, username=None, id_string=None):
+    def _get_mongo_cursor(cls, query, fields, hide_deleted, username=None,
+                          id_string=None, after=None):
         """
         Returns a Mongo cursor based on the query.
 
@@ -166,6 +213,7 @@ class ParsedInstance(models.Model):
         :param hide_deleted: boolean
         :param username: string
         :param id_string: string
+        :param after: integer, only return records with a greater `_id`
         :return: pymongo Cursor
         """
         fields_to_select = {cls.USERFORM_ID: 0}
@@ -187,6 +235,9 @@ class ParsedInstance(models.Model):
             # join existing query with deleted_at_query on an $and
             query = {"$and": [query, {"_deleted_at": None}]}
 
+        if after is not None:
+            query = {"$and": [query, {ID: {"$gt": after}}]}
+
         # fields must be a string array i.e. '["name", "age"]'
         if isinstance(fields, basestring):
             fields = json.loads(fields, object_hook=json_util.object_hook)
@@ -201,7 +252,8 @@ class ParsedInstance(models.Model):
         return xform_instances.find(query, fields_to_select)
 
     @classmethod
-    def _get_paginated_and_sorted_cursor(cls, cursor, start, limit, sort):
+    def _get_paginated_and_sorted_cursor(cls, cursor, start, limit, sort,
+                                         after=None):
         """
         Applies pagination and sorting on mongo cursor.
 
@@ -209,8 +261,18 @@ class ParsedInstance(models.Model):
         :param start: integer
         :param limit: integer
         :param sort: dict
+        :param after: integer, the cursor is already filtered on it
         :return: pymongo.cursor.Cursor
         """
+        if after is not None:
+            # keyset pages only follow each other in `_id` order
+            if sort and sort != {ID: 1}:
+                raise ValueError(_("Results are sorted by _id when the after "
+                                   "param is used"))
+            cursor.limit(limit).sort(ID, 1)
+            cursor.batch_size(cls.DEFAULT_BATCHSIZE)
+            return cursor
+
         cursor.skip(start).limit(limit)
 
         if type(sort) == dict and len(sort) == 1:
@@ -220,7 +282,7 @@ class ParsedInstance(models.Model):
             cursor.sort(sort_key, sort_dir)
 
         # set batch size
-        cursor.batch_size = cls.DEFAULT_BATCHSIZE
+        cursor.batch_size(cls.DEFAULT_BATCHSIZE)
         return cursor
 
     def to_dict_for_mongo(self):
@@ -237,7 +299,8 @@ class ParsedInstance(models.Model):
             GEOLOCATION: [self.lat, self.lng],
             SUBMISSION_TIME: self.instance.date_created.strftime(
                 MONGO_STRFTIME),
-            TAGS: list(self.instance.tags.names()),
+            # not `names()`, which would not use prefetched tags
+            TAGS: [tag.name for tag in self.instance.tags.all()],
             NOTES: self.get_notes(),
             VALIDATION_STATUS: self.instance.get_validation_status(),
             SUBMITTED_BY: self.instance.user.username
@@ -249,18 +312,31 @@ class ParsedInstance(models.Model):
 
         d.update(data)
 
-        return MongoHelper.to_safe_dict(d)
+        return MongoHelper.to_safe_dict(
+            d, safe_keys=get_form_schema(self.instance.xform).mongo_safe_keys)
 
-    def update_mongo(self, async=True):
+    def update_mongo(self, async=True, submission=None, writer=None):
+        """
+        Save this instance to Mongo, either
+            * with `writer`, a `MongoBulkWriter` which the caller flushes,
+              as the outbox and the Mongo rebuild do to save their batches,
+            * by a Celery task if `async` is `True`,
+            * or right away.
+        """
+        if submission is not None:
+            # reuse the XML already parsed by the ingestion path
+            self.instance.set_parsed_submission(submission)
         d = self.to_dict_for_mongo()
         if d.get("_xform_id_string") is None:
             # if _xform_id_string, Instance could not be parsed.
             # so, we don't update mongo.
             return False
         else:
-            if async:
-                # TODO update self.instance after async save is made
-                update_mongo_instance.apply_async((), {"record": d})
+            if writer is not None:
+                writer.add(d)
+            elif async:
+                # `is_synced_with_mongo` is updated once the record is saved
+                update_mongo_instances.apply_async((), {"records": [d]})
             else:
                 success = update_mongo_instance(d)
                 # Only update self.instance is `success` is different from
@@ -287,7 +363,8 @@ class ParsedInstance(models.Model):
 
     @classmethod
     def dicts(cls, xform):
-        qs = cls.objects.filter(instance__xform=xform)
+        qs = cls.objects.filter(instance__xform=xform).select_related(
+            'instance')
         for parsed_instance in queryset_iterator(qs):
             yield parsed_instance.to_dict()
 
@@ -327,15 +404,26 @@ class ParsedInstance(models.Model):
         # start/end_time obsolete: originally used to approximate for
         # instanceID, before instanceIDs were implemented
         created = self.pk is None
+        submission = kwargs.pop('submission', None)
         self.start_time = None
         self.end_time = None
         self._set_geopoint()
         super(ParsedInstance, self).save(*args, **kwargs)
 
+        # TODO: fix hack to get around a circular import
+        from onadata.apps.viewer.models.outbox import OutboxEntry,\
+            outbox_enabled
+        if outbox_enabled():
+            # Mongo and the Rest Services are updated by
+            # `OutboxEntry.drain()` once this transaction is committed
+            OutboxEntry.objects.create(
+                instance=self.instance, call_services=created)
+            return True
+
         # insert into Mongo.
         # Signal has been removed because of a race condition.
         # Rest Services were called before data was saved in DB.
-        success = self.update_mongo(async)
+        success = self.update_mongo(async, submission=submission)
         if success and created:
             call_service(self)
         return success
@@ -350,14 +438,14 @@ class ParsedInstance(models.Model):
 
     def get_notes(self):
         notes = []
-        note_qs = self.instance.notes.values(
-            'id', 'note', 'date_created', 'date_modified')
-        for note in note_qs:
-            note['date_created'] = \
-                note['date_created'].strftime(MONGO_STRFTIME)
-            note['date_modified'] = \
-                note['date_modified'].strftime(MONGO_STRFTIME)
-            notes.append(note)
+        # iterate over the instances so that prefetched notes are used
+        for note in self.instance.notes.all():
+            notes.append({
+                'id': note.id,
+                'note': note.note,
+                'date_created': note.date_created.strftime(MONGO_STRFTIME),
+                'date_modified': note.date_modified.strftime(MONGO_STRFTIME),
+            })
         return notes
 
 
@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from onadata.apps.logger.models import Instance
+from onadata.libs.utils.common_tags import ID
+
+
+DEFAULT_MONGO_BULK_WRITE_SIZE = 500
+# seconds
+DEFAULT_MONGO_BULK_WRITE_MAX_AGE = 2
+
+
+class MongoBulkWriter(object):
+    """
+    Buffers Mongo records, keyed by `_id` so that the last write of a record
+    wins, and upserts them with a single unordered bulk write once
+    `max_size` records are pending or, as records are added, the oldest one
+    has waited `max_age` seconds, or when `flush()` is called.
+
+    Documents rejected by the bulk write are retried one by one, and the
+    `Instance.is_synced_with_mongo` flags are set in bulk afterwards.
+
+    Use it as a context manager to flush whatever is left on exit:
+
+        with MongoBulkWriter() as writer:
+            for parsed_instance in parsed_instances:
+                parsed_instance.update_mongo(writer=writer)
+    """
+
+    def __init__(self, max_size=None, max_age=None, collection=None):
+        self.max_size = max_size or getattr(
+            settings, 'MONGO_BULK_WRITE_SIZE', DEFAULT_MONGO_BULK_WRITE_SIZE)
+        self.max_age = max_age or getattr(
+            settings, 'MONGO_BULK_WRITE_MAX_AGE',
+            DEFAULT_MONGO_BULK_WRITE_MAX_AGE)
+        self.collection = collection or settings.MONGO_DB.instances
+        self._records = OrderedDict()
+        self._oldest = None
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, record):
+        with self._lock:
+            # re-insert so that the record is written in its latest position
+            self._records.pop(record[ID], None)
+            self._records[record[ID]] = record
+            if self._oldest is None:
+                self._oldest = time.time()
+            if len(self._records) >= self.max_size or \
+                    time.time() - self._oldest >= self.max_age:
+                self.flush()
+
+    def flush(self):
+        """
+        Write all pending records and return the ids of those which were
+        saved.
+        """
+        with self._lock:
+            records = self._records.values()
+            self._records = OrderedDict()
+            self._oldest = None
+        if not records:
+            return []
+        return self.write(records)
+
+    def write(self, records):
+        failed_ids = set()
+        try:
+            self.collection.bulk_write(
+                [ReplaceOne({ID: record[ID]}, record, upsert=True)
+                 for record in records],
+                ordered=False)
+        except BulkWriteError as e:
+            retries = [records[error['index']]
+                       for error in e.details.get('writeErrors', [])]
+            failed_ids = self._write_one_by_one(retries)
+        except PyMongoError:
+            logging.getLogger().warning(
+                'Bulk write to Mongo failed, retrying records one by one.',
+                exc_info=True)
+            failed_ids = self._write_one_by_one(records)
+
+        synced_ids = [record[ID] for record in records
+                      if record[ID] not in failed_ids]
+        self._set_synced_with_mongo(synced_ids, True)
+        self._set_synced_with_mongo(failed_ids, False)
+        return synced_ids
+
+    def _write_one_by_one(self, records):
+        failed_ids = set()
+        for record in records:
+            try:
+                self.collection.replace_one(
+                    {ID: record[ID]}, record, upsert=True)
+            except Exception as e:
+                logging.getLogger().error(
+                    "MongoBulkWriter - {}".format(str(e)), exc_info=True)
+                failed_ids.add(record[ID])
+        return failed_ids
+
+    def _set_synced_with_mongo(self, instance_ids, synced):
+        if instance_ids:
+            # Skip the labor-intensive stuff in Instance.save()
+            Instance.objects.filter(pk__in=list(instance_ids)).update(
+                is_synced_with_mongo=synced)
+
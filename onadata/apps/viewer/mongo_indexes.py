@@ -0,0 +1,152 @@
+import logging
+import threading
+
+from django.conf import settings
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+from onadata.libs.utils.common_tags import DELETEDAT, ID, SUBMISSION_TIME,\
+    USERFORM_ID
+
+
+# Indexes needed by the queries the application sends to each collection,
+# see `get_canonical_queries()`. They are built in the background so that
+# the collections stay usable meanwhile.
+MONGO_INDEXES = {
+    'instances': [
+        # data API and exports: one form's submissions which are not deleted,
+        # in `_id` order (also used by keyset pagination)
+        IndexModel([(USERFORM_ID, ASCENDING), (DELETEDAT, ASCENDING),
+                    (ID, ASCENDING)], background=True),
+        # same, sorted by submission time
+        IndexModel([(USERFORM_ID, ASCENDING), (DELETEDAT, ASCENDING),
+                    (SUBMISSION_TIME, ASCENDING)], background=True),
+    ],
+    'auditlog': [
+        # one account's log, filtered and sorted by date
+        IndexModel([(u'account', ASCENDING), (u'created_on', ASCENDING)],
+                   background=True),
+    ],
+}
+COLLECTION_SCAN_STAGE = 'COLLSCAN'
+
+
+def _normalize_keys(keys):
+    # the server may return directions as floats
+    return [(field, int(direction) if isinstance(direction, float)
+             else direction) for field, direction in keys]
+
+
+def get_missing_indexes(db=None):
+    """
+    Returns the declared indexes which do not exist yet, by collection name.
+    """
+    db = db or settings.MONGO_DB
+    missing = {}
+    for name, indexes in MONGO_INDEXES.items():
+        existing = [_normalize_keys(info['key'])
+                    for info in db[name].index_information().values()]
+        models = [index for index in indexes
+                  if _normalize_keys(index.document['key'].items())
+                  not in existing]
+        if models:
+            missing[name] = models
+    return missing
+
+
+def ensure_indexes(db=None):
+    """
+    Creates the declared indexes which do not exist yet and returns their
+    names by collection name.
+    """
+    db = db or settings.MONGO_DB
+    created = {}
+    for name, indexes in get_missing_indexes(db).items():
+        created[name] = db[name].create_indexes(indexes)
+    return created
+
+
+def ensure_indexes_in_background():
+    """
+    Called on startup: indexes are created from a separate thread so that
+    the process does not wait for Mongo.
+    """
+    def _ensure_indexes():
+        try:
+            for name, index_names in ensure_indexes().items():
+                logging.getLogger().info(
+                    'Created Mongo indexes on %s: %s', name,
+                    ', '.join(index_names))
+        except PyMongoError:
+            logging.getLogger().warning(
+                'Mongo indexes could not be checked.', exc_info=True)
+
+    thread = threading.Thread(target=_ensure_indexes)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def get_canonical_queries(username, id_string):
+    """
+    Returns the cursors of the queries sent on the hot paths, built by the
+    code which sends them, by description.
+    """
+    # TODO: fix hack to get around a circular import
+    from onadata.apps.main.models.audit import AuditLog
+    from onadata.apps.viewer.models.parsed_instance import ParsedInstance
+    from onadata.libs.utils.export_tools import query_mongo
+
+    def data_api_cursor():
+        return ParsedInstance._get_mongo_cursor(
+            None, None, True, username, id_string)
+
+    return [
+        ('data API, sorted by _id',
+         data_api_cursor().sort(ID, ASCENDING)),
+        ('data API, keyset page',
+         ParsedInstance._get_mongo_cursor(
+             None, None, True, username, id_string, after=0).sort(
+             ID, ASCENDING)),
+        ('data API, sorted by _submission_time',
+         data_api_cursor().sort(SUBMISSION_TIME, ASCENDING)),
+        ('exports', query_mongo(username, id_string)),
+        ('audit log', AuditLog.query_mongo(
+            username, {AuditLog.CREATED_ON: {'$gte': '2000-01-01T00:00:00'}},
+            sort={AuditLog.CREATED_ON: -1})),
+    ]
+
+
+def _get_stages(plan):
+    stages = [plan.get('stage')]
+    if plan.get('inputStage'):
+        stages.extend(_get_stages(plan['inputStage']))
+    for input_stage in plan.get('inputStages', []):
+        stages.extend(_get_stages(input_stage))
+    return stages
+
+
+def get_plan_stages(explanation):
+    """
+    Returns the stages of the winning plan of an `explain()`, outermost
+    first, e.g. `['FETCH', 'IXSCAN']`.
+    """
+    if 'queryPlanner' in explanation:
+        return _get_stages(explanation['queryPlanner']['winningPlan'])
+    # MongoDB < 3.0
+    if explanation.get('cursor', '').startswith('BasicCursor'):
+        return [COLLECTION_SCAN_STAGE]
+    return [explanation.get('cursor')]
+
+
+def explain_canonical_queries(username, id_string):
+    """
+    Returns `(description, stages, is_collection_scan)` for each of the
+    canonical queries.
+    """
+    results = []
+    for description, cursor in get_canonical_queries(username, id_string):
+        stages = get_plan_stages(cursor.explain())
+        results.append(
+            (description, stages, COLLECTION_SCAN_STAGE in stages))
+    return results
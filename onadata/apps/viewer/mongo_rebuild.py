@@ -0,0 +1,187 @@
+import json
+import os
+
+from django.conf import settings
+
+from onadata.apps.logger.models import Instance
+from onadata.apps.viewer.models.parsed_instance import ParsedInstance
+from onadata.apps.viewer.mongo_bulk_writer import MongoBulkWriter
+from onadata.libs.utils.worker_pool import get_worker_instances_collection,\
+    imap_bounded, start_pool
+
+
+DEFAULT_REBUILD_CHUNK_SIZE = 500
+# collection written to by the processes of the pool, see `_init_worker()`
+_worker_collection = None
+
+
+def iter_id_chunks(queryset, chunk_size, field='pk', after=0):
+    """
+    Yields the values of `field` of `queryset`, in ascending order, as lists
+    of at most `chunk_size` values. Each chunk is read with a keyset query
+    (`field > last value`) so that it costs the same at the end of the
+    table as at the beginning.
+    """
+    while True:
+        ids = list(queryset.filter(**{'%s__gt' % field: after}).order_by(
+            field).values_list(field, flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids
+        after = ids[-1]
+
+
+def get_parsed_instances(instance_ids):
+    """
+    Returns the `ParsedInstance`s of `instance_ids` with everything
+    `ParsedInstance.to_dict_for_mongo()` reads fetched in a fixed number of
+    queries.
+    """
+    return ParsedInstance.objects.filter(
+        instance_id__in=instance_ids).select_related(
+        'instance', 'instance__xform', 'instance__xform__user',
+        'instance__user').prefetch_related(
+        'instance__attachments', 'instance__tags', 'instance__notes')
+
+
+def create_missing_parsed_instances(instance_ids):
+    """
+    Creates, in bulk, the `ParsedInstance`s which do not exist yet for
+    `instance_ids`.
+    """
+    missing_ids = set(instance_ids) - set(ParsedInstance.objects.filter(
+        instance_id__in=instance_ids).values_list('instance_id', flat=True))
+    if not missing_ids:
+        return 0
+    parsed_instances = []
+    for instance in Instance.objects.filter(pk__in=missing_ids):
+        parsed_instance = ParsedInstance(instance=instance)
+        parsed_instance._set_geopoint()
+        parsed_instances.append(parsed_instance)
+    ParsedInstance.objects.bulk_create(parsed_instances)
+    return len(parsed_instances)
+
+
+def rebuild_chunk(instance_ids, collection=None):
+    """
+    Writes the Mongo records of `instance_ids` with a single bulk upsert.
+    Returns the ids of the instances which were written and of those which
+    could not be parsed or written.
+    """
+    writer = MongoBulkWriter(max_size=len(instance_ids) + 1,
+                             collection=collection)
+    for parsed_instance in get_parsed_instances(instance_ids):
+        parsed_instance.update_mongo(writer=writer)
+    synced_ids = writer.flush()
+    failed_ids = sorted(set(instance_ids) - set(synced_ids))
+    return synced_ids, failed_ids
+
+
+def _init_worker():
+    global _worker_collection
+    _worker_collection = get_worker_instances_collection()
+
+
+def _rebuild_chunk_in_worker(instance_ids):
+    # `_worker_collection` is None outside of a pool: the default is used
+    synced_ids, failed_ids = rebuild_chunk(instance_ids, _worker_collection)
+    return instance_ids[-1], len(synced_ids), failed_ids
+
+
+class RebuildCheckpoint(object):
+    """
+    The last instance id up to which a rebuild has been done, kept in a JSON
+    file so that an interrupted rebuild can resume from there.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)['last_id']
+        except IOError:
+            return 0
+
+    def save(self, last_id):
+        # replace the file at once so that it is never left half written
+        temp_path = '%s.tmp' % self.path
+        with open(temp_path, 'w') as f:
+            json.dump({'last_id': last_id}, f)
+        os.rename(temp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def rebuild_mongo(queryset=None, chunk_size=None, workers=1,
+                  checkpoint=None, progress=None):
+    """
+    Rewrites the Mongo records of the `ParsedInstance`s of `queryset` (all
+    of them by default), `chunk_size` instances at a time, optionally with a
+    pool of `workers` processes.
+
+    Chunks are processed in `instance_id` order and, once a chunk and all
+    those before it are written, its last id is saved to `checkpoint` (a
+    `RebuildCheckpoint`), from which a later call resumes.
+
+    :param progress: called with `(synced, failed_ids, last_id)` after each
+        chunk, `synced` being the number of records written so far
+    :returns: `(synced, failed_ids)`
+    """
+    if queryset is None:
+        queryset = ParsedInstance.objects.all()
+    chunk_size = chunk_size or getattr(
+        settings, 'MONGO_REBUILD_CHUNK_SIZE', DEFAULT_REBUILD_CHUNK_SIZE)
+    after = checkpoint.load() if checkpoint else 0
+    chunks = iter_id_chunks(queryset, chunk_size, 'instance_id', after)
+
+    pool = None
+    if workers > 1:
+        pool = start_pool(workers, _init_worker)
+        results = imap_bounded(pool, _rebuild_chunk_in_worker, chunks,
+                               workers * 2)
+    else:
+        results = (_rebuild_chunk_in_worker(ids) for ids in chunks)
+
+    synced = 0
+    failed_ids = []
+    try:
+        # the results are returned in order, so the checkpoint never skips
+        # a chunk which is still being worked on
+        for last_id, chunk_synced, chunk_failed_ids in results:
+            synced += chunk_synced
+            failed_ids.extend(chunk_failed_ids)
+            if checkpoint:
+                checkpoint.save(last_id)
+            if progress:
+                progress(synced, failed_ids, last_id)
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+    return synced, failed_ids
+
+
+def rebuild_instances(instance_ids, chunk_size=None, progress=None):
+    """
+    Writes the Mongo records of `instance_ids`, creating their missing
+    `ParsedInstance`s first. Returns `(synced, failed_ids)`.
+    """
+    chunk_size = chunk_size or getattr(
+        settings, 'MONGO_REBUILD_CHUNK_SIZE', DEFAULT_REBUILD_CHUNK_SIZE)
+    instance_ids = sorted(instance_ids)
+    synced = 0
+    failed_ids = []
+    for i in range(0, len(instance_ids), chunk_size):
+        chunk = instance_ids[i:i + chunk_size]
+        create_missing_parsed_instances(chunk)
+        chunk_synced_ids, chunk_failed_ids = rebuild_chunk(chunk)
+        synced += len(chunk_synced_ids)
+        failed_ids.extend(chunk_failed_ids)
+        if progress:
+            progress(synced, failed_ids, chunk[-1])
+    return synced, failed_ids
@@ -1,6 +1,7 @@
 from collections import OrderedDict
+from cStringIO import StringIO
 from itertools import chain
-import time
+import json
 
 from django.conf import settings
 from pandas.core.frame import DataFrame
@@ -192,6 +193,23 @@ class AbstractDataFrameBuilder(object):
                         cls._split_gps_fields(list_item, gps_fields)
         record.update(updated_gps_fields)
 
+    def _iter_batches(self, batchsize, fields='[]'):
+        """
+        Yields the records matching the filter query as lists of
+        `batchsize` records, in `_id` order, reading each batch with a
+        keyset query.
+        """
+        after = 0
+        while True:
+            records = list(ParsedInstance.query_mongo(
+                username=self.username, id_string=self.id_string,
+                query=self.filter_query, fields=fields, sort='{}',
+                limit=batchsize, after=after, xform=self.dd))
+            if not records:
+                return
+            yield records
+            after = records[-1][ID]
+
     def _query_mongo(self, query='{}', start=0,
                      limit=ParsedInstance.DEFAULT_LIMIT,
                      fields='[]', count=False):
@@ -226,7 +244,7 @@ class AbstractDataFrameBuilder(object):
                 'count': False
             }
             # use ParsedInstance.query_mongo
-            cursor = ParsedInstance.query_mongo(**query_args)
+            cursor = ParsedInstance.query_mongo(xform=self.dd, **query_args)
             return cursor
 
 
@@ -263,18 +281,15 @@ class XLSDataFrameBuilder(AbstractDataFrameBuilder):
     def export_to(self, file_path, batchsize=1000):
         self.xls_writer = ExcelWriter(file_path)
 
-        # get record count
-        record_count = self._query_mongo(count=True)
+        # raises NoRecordsFoundError before the file is written
+        self._query_mongo(query=self.filter_query, count=True)
 
         # query in batches and for each batch create an XLSDataFrameWriter and
-        # write to existing xls_writer object
-        start = 0
+        # write to existing xls_writer object; the columns come from the form
+        # so a single pass is enough
         header = True
-        while start < record_count:
-            cursor = self._query_mongo(self.filter_query, start=start,
-                                       limit=batchsize)
-
-            data = self._format_for_dataframe(cursor)
+        for records in self._iter_batches(batchsize):
+            data = self._format_for_dataframe(records)
 
             # write all cursor's data to their respective sheets
             for section_name, section in self.sections.iteritems():
@@ -292,9 +307,6 @@ class XLSDataFrameBuilder(AbstractDataFrameBuilder):
                     writer.write_to_excel(self.xls_writer, section_name,
                                           header=header, index=False)
             header = False
-            # increment counter(s)
-            start += batchsize
-            time.sleep(0.1)
         self.xls_writer.save()
 
     def _format_for_dataframe(self, cursor):
@@ -613,28 +625,21 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
             data.append(flat_dict)
         return data
 
-    def export_to(self, file_or_path, data_frame_max_size=30000):
-        from math import ceil
-        # get record count
-        record_count = self._query_mongo(query=self.filter_query, count=True)
-
-        self.ordered_columns = OrderedDict()
-        self._build_ordered_columns(self.dd.survey, self.ordered_columns)
-
-        # pandas will only export 30k records in a dataframe to a csv
-        # - we need to create multiple 30k dataframes if required,
-        # we need to go through all the records though so that
-        # we can figure out the columns we need for repeats
-        datas = []
-        num_data_frames = \
-            int(ceil(float(record_count) / float(data_frame_max_size)))
-        for i in range(num_data_frames):
-            cursor = self._query_mongo(
-                self.filter_query, start=(i * data_frame_max_size),
-                limit=data_frame_max_size)
-            data = self._format_for_dataframe(cursor)
-            datas.append(data)
+    @classmethod
+    def _get_repeat_xpaths(cls, survey_element):
+        """
+        Returns the xpaths of the repeats which are not within another one,
+        i.e. the record keys holding lists of repeat items.
+        """
+        xpaths = []
+        for child in survey_element.children:
+            if isinstance(child, RepeatingSection):
+                xpaths.append(child.get_abbreviated_xpath())
+            elif isinstance(child, Section):
+                xpaths.extend(cls._get_repeat_xpaths(child))
+        return xpaths
 
+    def _get_columns(self):
         columns = list(chain.from_iterable(
             [[xpath] if cols is None else cols
              for xpath, cols in self.ordered_columns.iteritems()]))
@@ -646,8 +651,77 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
 
         # add extra columns
         columns += [col for col in self.ADDITIONAL_COLUMNS]
+        return columns
 
-        header = True
+    def _read_columns(self, batchsize):
+        """
+        Returns the columns of the records matching the filter query, reading
+        only their repeats, if the form has any, to find out the repeat
+        columns.
+        """
+        self.ordered_columns = OrderedDict()
+        self._build_ordered_columns(self.dd.survey, self.ordered_columns)
+        repeat_xpaths = self._get_repeat_xpaths(self.dd.survey)
+        if repeat_xpaths:
+            for records in self._iter_batches(
+                    batchsize, fields=json.dumps(repeat_xpaths)):
+                self._format_for_dataframe(records)
+        return self._get_columns()
+
+    def append_to(self, csv_file, header, batchsize=1000):
+        """
+        Appends the records matching the filter query to `csv_file`, a CSV
+        export whose columns are `header`.
+
+        Returns False, without writing anything, when the records need
+        columns which `header` does not have, i.e. more repeat items than any
+        record of the export.
+        """
+        header = [column.decode('utf-8') for column in header]
+        columns = [column for column in self._read_columns(batchsize)
+                   if column not in self.IGNORED_COLUMNS]
+        if set(columns) - set(header):
+            return False
+
+        for records in self._iter_batches(batchsize):
+            writer = CSVDataFrameWriter(
+                self._format_for_dataframe(records), header)
+            writer.write_to_csv(csv_file, header=False)
+        return True
+
+    def iter_csv(self, batchsize=1000):
+        """
+        Returns an iterator over the CSV `export_to()` writes, built
+        `batchsize` records at a time.
+
+        The repeat columns depend on the data: when the form has repeats,
+        the records are read twice, their repeats only the first time.
+        """
+        # raises NoRecordsFoundError before anything is sent
+        self._query_mongo(query=self.filter_query, count=True)
+        columns = self._read_columns(batchsize)
+
+        def _iter_csv():
+            header = True
+            for records in self._iter_batches(batchsize):
+                csv_file = StringIO()
+                writer = CSVDataFrameWriter(
+                    self._format_for_dataframe(records), columns)
+                writer.write_to_csv(csv_file, header=header)
+                header = False
+                yield csv_file.getvalue()
+
+        return _iter_csv()
+
+    def export_to(self, file_or_path, data_frame_max_size=1000):
+        """
+        Writes the CSV of the records matching the filter query to
+        `file_or_path`, a path or a file, reading and writing
+        `data_frame_max_size` records at a time so that memory use does not
+        grow with the number of records, see `iter_csv()`.
+        """
+        # raises NoRecordsFoundError before the file is opened
+        chunks = self.iter_csv(data_frame_max_size)
         if hasattr(file_or_path, 'read'):
             csv_file = file_or_path
             close = False
@@ -655,12 +729,12 @@ class CSVDataFrameBuilder(AbstractDataFrameBuilder):
             csv_file = open(file_or_path, "wb")
             close = True
 
-        for data in datas:
-            writer = CSVDataFrameWriter(data, columns)
-            writer.write_to_csv(csv_file, header=header)
-            header = False
-        if close:
-            csv_file.close()
+        try:
+            for chunk in chunks:
+                csv_file.write(chunk)
+        finally:
+            if close:
+                csv_file.close()
 
 
 class XLSDataFrameWriter(object):
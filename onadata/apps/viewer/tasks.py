@@ -3,16 +3,21 @@ import pytz
 import re
 import sys
 from celery import task, shared_task
+from celery.result import AsyncResult
+from celery.utils import uuid
 from datetime import datetime, timedelta
 from django.conf import settings
 from django.core.mail import mail_admins
+from django.db import transaction
 from requests import ConnectionError
 
 from onadata.apps.viewer.models.export import Export
+from onadata.apps.viewer.models.outbox import OutboxEntry
 from onadata.libs.exceptions import NoRecordsFoundError
-from onadata.libs.utils.export_tools import generate_export,\
-    generate_attachments_zip_export, generate_kml_export,\
-    generate_external_export
+from onadata.libs.utils.export_tools import CACHED_EXPORT_TYPES,\
+    generate_export, generate_attachments_zip_export, generate_kml_export,\
+    generate_external_export, get_cached_export, get_export_extension,\
+    get_export_key, lock_export_key
 from onadata.libs.utils.logger_tools import mongo_sync_status, report_exception
 
 
@@ -20,11 +25,36 @@ def create_async_export(xform, export_type, query, force_xlsx, options=None):
     username = xform.user.username
     id_string = xform.id_string
 
-    def _create_export(xform, export_type):
-        return Export.objects.create(xform=xform, export_type=export_type)
+    export_key = None
+    extension = get_export_extension(export_type, force_xlsx)
+    if export_type in CACHED_EXPORT_TYPES:
+        export_options = dict(
+            (key, options[key]) for key in [
+                'group_delimiter', 'split_select_multiples',
+                'binary_select_multiples'] if options and key in options)
+        export_key = get_export_key(xform, export_type, query,
+                                    extension=extension, **export_options)
 
-    # Generate a placeholder `Export` object to be populated with the export file.
-    export = _create_export(xform, export_type)
+    def _create_export(xform, export_type):
+        # the task id is known beforehand so that identical requests can
+        # attach to the task as soon as the export exists
+        return Export.objects.create(
+            xform=xform, export_type=export_type, task_id=uuid(),
+            export_key=export_key, filtered=query is not None)
+
+    with transaction.atomic():
+        if export_key:
+            # an identical request either reuses the export built for this
+            # one, or waits until it is created to attach to its task
+            lock_export_key(export_key)
+            export = get_cached_export(xform, export_type, export_key,
+                                       extension, pending=True)
+            if export is not None:
+                return export, AsyncResult(export.task_id)\
+                    if export.task_id else None
+        # Generate a placeholder `Export` object to be populated with the
+        # export file.
+        export = _create_export(xform, export_type)
     result = None
     arguments = {
         'username': username,
@@ -34,7 +64,7 @@ def create_async_export(xform, export_type, query, force_xlsx, options=None):
     }
     if export_type in [Export.XLS_EXPORT, Export.GDOC_EXPORT,
                        Export.CSV_EXPORT, Export.CSV_ZIP_EXPORT,
-                       Export.SAV_ZIP_EXPORT]:
+                       Export.SAV_ZIP_EXPORT, Export.PARQUET_ZIP_EXPORT]:
         if options and "group_delimiter" in options:
             arguments["group_delimiter"] = options["group_delimiter"]
         if options and "split_select_multiples" in options:
@@ -43,29 +73,35 @@ def create_async_export(xform, export_type, query, force_xlsx, options=None):
         if options and "binary_select_multiples" in options:
             arguments["binary_select_multiples"] =\
                 options["binary_select_multiples"]
+        if export_type in [Export.XLS_EXPORT, Export.GDOC_EXPORT]:
+            arguments["force_xlsx"] = force_xlsx
 
         # start async export
         if export_type in [Export.XLS_EXPORT, Export.GDOC_EXPORT]:
-            result = create_xls_export.apply_async((), arguments, countdown=10)
+            result = create_xls_export.apply_async(
+                (), arguments, countdown=10, task_id=export.task_id)
         elif export_type == Export.CSV_EXPORT:
             result = create_csv_export.apply_async(
-                (), arguments, countdown=10)
+                (), arguments, countdown=10, task_id=export.task_id)
         elif export_type == Export.CSV_ZIP_EXPORT:
             result = create_csv_zip_export.apply_async(
-                (), arguments, countdown=10)
+                (), arguments, countdown=10, task_id=export.task_id)
         elif export_type == Export.SAV_ZIP_EXPORT:
             result = create_sav_zip_export.apply_async(
-                (), arguments, countdown=10)
+                (), arguments, countdown=10, task_id=export.task_id)
+        elif export_type == Export.PARQUET_ZIP_EXPORT:
+            result = create_parquet_zip_export.apply_async(
+                (), arguments, countdown=10, task_id=export.task_id)
         else:
             raise Export.ExportTypeError
     elif export_type == Export.ZIP_EXPORT:
         # start async export
         result = create_zip_export.apply_async(
-            (), arguments, countdown=10)
+            (), arguments, countdown=10, task_id=export.task_id)
     elif export_type == Export.KML_EXPORT:
         # start async export
         result = create_kml_export.apply_async(
-            (), arguments, countdown=10)
+            (), arguments, countdown=10, task_id=export.task_id)
     elif export_type == Export.EXTERNAL_EXPORT:
         if options and "token" in options:
             arguments["token"] = options["token"]
@@ -73,9 +109,10 @@ def create_async_export(xform, export_type, query, force_xlsx, options=None):
             arguments["meta"] = options["meta"]
 
         result = create_external_export.apply_async(
-            (), arguments, countdown=10)
+            (), arguments, countdown=10, task_id=export.task_id)
     elif export_type == Export.ANALYSER_EXPORT:
-        result= create_analyser_export.apply_async((), arguments, countdown=10)
+        result= create_analyser_export.apply_async(
+            (), arguments, countdown=10, task_id=export.task_id)
     else:
         raise Export.ExportTypeError
     if result:
@@ -318,6 +355,36 @@ def create_sav_zip_export(username, id_string, export_id, query=None,
         return gen_export.id
 
 
+@task()
+def create_parquet_zip_export(username, id_string, export_id, query=None,
+                              group_delimiter='/', split_select_multiples=True,
+                              binary_select_multiples=False):
+    export = Export.objects.get(id=export_id)
+    try:
+        # though export is not available when for has 0 submissions, we
+        # catch this since it potentially stops celery
+        gen_export = generate_export(
+            Export.PARQUET_ZIP_EXPORT, 'zip', username, id_string, export_id,
+            query, group_delimiter, split_select_multiples,
+            binary_select_multiples
+        )
+    except (Exception, NoRecordsFoundError) as e:
+        export.internal_status = Export.FAILED
+        export.save()
+        # mail admins
+        details = {
+            'export_id': export_id,
+            'username': username,
+            'id_string': id_string
+        }
+        report_exception("Parquet ZIP Export Exception: Export ID - "
+                         "%(export_id)s, /%(username)s/%(id_string)s"
+                         % details, e, sys.exc_info())
+        raise
+    else:
+        return gen_export.id
+
+
 @task()
 def create_external_export(username, id_string, export_id, query=None,
                            token=None, meta=None):
@@ -424,3 +491,15 @@ def log_stuck_exports_and_mark_failed():
         # Export.save() is a busybody; bypass it with update()
         stuck_exports.filter(pk=stuck_export.pk).update(
             internal_status=Export.FAILED)
+
+
+@shared_task(soft_time_limit=50, time_limit=60)
+def drain_submission_outbox(max_batches=20):
+    """
+    Sync the submissions waiting in the outbox to Mongo and call their REST
+    services, see `OutboxEntry`. Stops when a batch completes no entry or
+    after `max_batches` batches so that runs do not pile up.
+    """
+    for i in range(max_batches):
+        if not OutboxEntry.drain():
+            break
@@ -1,22 +1,34 @@
+import copy
 import csv
 import datetime
 import os
 import shutil
 import tempfile
+import traceback
 import zipfile
 
+import billiard
 from django.conf import settings
 from django.core.files.temp import NamedTemporaryFile
+from django.db import connections
+from django.test.utils import override_settings
+from mock import Mock
 from openpyxl import load_workbook
+import pyarrow
+import pyarrow.parquet
 from pyxform.builder import create_survey_from_xls
 from savReaderWriter import SavReader
 
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.api.mongo_helper import MongoHelper
 from onadata.apps.viewer.tests.export_helpers import viewer_fixture_path
+from onadata.apps.viewer.models.export import Export
+from onadata.libs.utils.common_tags import ID, USERFORM_ID
 from onadata.libs.utils.export_tools import (
     dict_to_joined_export,
     ExportBuilder)
+from onadata.libs.utils.parallel_export import get_shards,\
+    iter_shard_rows, write_parallel_export, write_shard_parts
 
 
 def _logger_fixture_path(*args):
@@ -246,6 +258,85 @@ class TestExportBuilder(TestBase):
         self.assertEqual(
             sorted(expected_element_names), sorted(element_names))
 
+    def test_iter_shard_rows(self):
+        survey = self._create_childrens_survey()
+        export_builder = ExportBuilder()
+        export_builder.set_survey(survey)
+        expected = [(section['name'], row) for section, row in
+                    export_builder.iter_section_rows(copy.deepcopy(self.data))]
+
+        # each record in its own shard
+        shard_parts = [write_shard_parts(export_builder, [copy.deepcopy(d)])
+                       for d in self.data]
+        rows = [(section['name'], row) for section, row in
+                iter_shard_rows(export_builder, shard_parts)]
+        self.assertEqual(sorted(rows), sorted(expected))
+        for parts in shard_parts:
+            for path, count in parts.values():
+                self.assertFalse(os.path.exists(path))
+
+    def _read_zip(self, path):
+        with zipfile.ZipFile(path) as zip_file:
+            return dict((name, zip_file.read(name))
+                        for name in zip_file.namelist())
+
+    def test_get_shards(self):
+        records = []
+        for i in range(5):
+            record = copy.deepcopy(self.data[i % len(self.data)])
+            record.update({ID: i + 1, USERFORM_ID: u'bob_shards'})
+            records.append(record)
+        settings.MONGO_DB.instances.insert_many(records)
+        self.assertEqual(get_shards('bob', 'shards', shard_size=2),
+                         [{'$lte': 2}, {'$gt': 2, '$lte': 4},
+                          {'$gt': 4, '$lte': 5}])
+        self.assertEqual(get_shards('bob', 'shards', shard_size=5),
+                         [{'$lte': 5}])
+        self.assertEqual(get_shards('bob', 'none', shard_size=2), [])
+
+    @override_settings(EXPORT_SHARD_SIZE=2)
+    def test_parallel_export_from_daemonic_worker(self):
+        survey = self._create_childrens_survey()
+        export_builder = ExportBuilder()
+        export_builder.set_survey(survey)
+        xform = Mock(id_string=survey.name, user=Mock(username='bob'))
+        records = []
+        for i in range(6):
+            record = copy.deepcopy(self.data[i % len(self.data)])
+            record.update({ID: i + 1, USERFORM_ID: u'bob_%s' % survey.name})
+            records.append(record)
+        settings.MONGO_DB.instances.insert_many(copy.deepcopy(records))
+        serial_file = NamedTemporaryFile(suffix='.zip')
+        export_builder.to_zipped_csv(serial_file.name, records)
+        parallel_file = NamedTemporaryFile(suffix='.zip')
+
+        def export(errors):
+            # the connections of the test process are shared with it and
+            # must not be closed here; the process never frees them
+            inherited = [connection.connection
+                         for connection in connections.all()]
+            for connection in connections.all():
+                connection.connection = None
+            try:
+                write_parallel_export(
+                    export_builder, Export.CSV_ZIP_EXPORT,
+                    parallel_file.name, xform, workers=2)
+            except Exception:
+                errors.put(traceback.format_exc())
+            else:
+                errors.put(None)
+
+        # a daemonic process, like those of the Celery prefork pool
+        errors = billiard.Queue()
+        worker = billiard.Process(target=export, args=(errors,))
+        worker.daemon = True
+        worker.start()
+        error = errors.get(timeout=60)
+        worker.join()
+        self.assertIsNone(error)
+        self.assertEqual(self._read_zip(parallel_file.name),
+                         self._read_zip(serial_file.name))
+
     def test_zipped_csv_export_works(self):
         survey = self._create_childrens_survey()
         export_builder = ExportBuilder()
@@ -629,6 +720,33 @@ class TestExportBuilder(TestBase):
             }
         self.assertEqual(new_row, expected_row)
 
+    def test_get_row_values(self):
+        survey = self._create_childrens_survey()
+        export_builder = ExportBuilder()
+        export_builder.BINARY_SELECT_MULTIPLES = True
+        export_builder.set_survey(survey)
+        main_section, children_section = export_builder.sections[:2]
+
+        row = {
+            'tel/{0}'.format(MongoHelper.encode('tel.office')): '123-456',
+            'geo/geolocation': '1.0 36.1 2000 20',
+            '_index': 1,
+        }
+        values = dict(zip(export_builder.get_fields(main_section),
+                          export_builder.get_row_values(row, main_section)))
+        self.assertEqual(values['tel/tel.office'], '123-456')
+        self.assertEqual(values['geo/_geolocation_latitude'], 1.0)
+        self.assertEqual(values['geo/_geolocation_precision'], 20.0)
+        self.assertEqual(values['_index'], 1)
+
+        row = {'children/age': '5', 'children/fav_colors': 'red blue'}
+        values = dict(zip(
+            export_builder.get_fields(children_section),
+            export_builder.get_row_values(row, children_section)))
+        self.assertEqual(values['children/age'], 5)
+        self.assertEqual(values['children/fav_colors/red'], 1)
+        self.assertEqual(values['children/fav_colors/pink'], 0)
+
     def test_generate_field_title(self):
         field_name = ExportBuilder.format_field_title("child/age", ".")
         expected_field_name = "child.age"
@@ -999,3 +1117,64 @@ class TestExportBuilder(TestBase):
         for section in export_builder.sections:
             section_name = section['name'].replace('/', '_')
             _test_sav_file(section_name)
+
+    def test_to_parquet_export(self):
+        survey = create_survey_from_xls(viewer_fixture_path(
+            'test_data_types/test_data_types.xls'))
+        export_builder = ExportBuilder()
+        export_builder.set_survey(survey)
+        data = [
+            {
+                '_id': 579827,
+                'name': 'Smith',
+                'age': '107',
+                'amount': '250.0',
+                'when': '1899-07-03',
+                'precisely': '2013-07-03T15:24:00.000+03',
+                'geolocation': '-1.2625482 36.7924794 0.0 21.0',
+                '_submission_time': '2013-07-03T08:25:30',
+            },
+            {
+                'name': 'Jones',
+                'age': 'not a number',
+            },
+        ]
+        temp_zip_file = NamedTemporaryFile(suffix='.zip')
+        export_builder.to_zipped_parquet(temp_zip_file.name, data)
+        with zipfile.ZipFile(temp_zip_file.name) as zip_file:
+            table = pyarrow.parquet.read_table(pyarrow.BufferReader(
+                zip_file.read('{0}.parquet'.format(survey.name))))
+        temp_zip_file.close()
+
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(table.schema.names,
+                         export_builder.get_headers(export_builder.sections[0]))
+        rows = table.to_pydict()
+        self.assertEqual(rows['name'], [u'Smith', u'Jones'])
+        self.assertEqual(rows['age'], [107, None])
+        self.assertEqual(rows['amount'], [250.0, None])
+        self.assertEqual(rows['when'], [datetime.date(1899, 7, 3), None])
+        self.assertEqual(
+            rows['precisely'][0].replace(tzinfo=None),
+            datetime.datetime(2013, 7, 3, 12, 24))
+        self.assertEqual(rows['_geolocation_latitude'], [-1.2625482, None])
+        self.assertEqual(rows['_index'], [1, 2])
+
+    def test_to_parquet_export_select_multiple_columns(self):
+        survey = self._create_childrens_survey()
+        export_builder = ExportBuilder()
+        export_builder.set_survey(survey)
+        temp_zip_file = NamedTemporaryFile(suffix='.zip')
+        export_builder.to_zipped_parquet(temp_zip_file.name, self.data)
+        with zipfile.ZipFile(temp_zip_file.name) as zip_file:
+            self.assertEqual(
+                sorted(zip_file.namelist()),
+                sorted('{0}.parquet'.format(section['name'].replace('/', '_'))
+                       for section in export_builder.sections))
+            table = pyarrow.parquet.read_table(pyarrow.BufferReader(
+                zip_file.read('children.parquet')))
+        temp_zip_file.close()
+
+        rows = table.to_pydict()
+        self.assertEqual(rows['children/fav_colors/red'], [True, None, None])
+        self.assertEqual(rows['children/age'], [5, 2, 3])
@@ -4,12 +4,17 @@ import json
 import os
 import StringIO
 import unittest
+import zipfile
+from tempfile import NamedTemporaryFile
 from time import sleep
 
+from celery.result import AsyncResult
 from django.conf import settings
 from django.core.files.storage import get_storage_class
 from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
 from django.utils.dateparse import parse_datetime
+from mock import patch
 from xlrd import open_workbook
 
 from onadata.apps.main.views import delete_data
@@ -21,10 +26,12 @@ from onadata.apps.viewer.xls_writer import XlsWriter
 from onadata.apps.viewer.models.export import Export
 from onadata.apps.main.models.meta_data import MetaData
 from onadata.apps.viewer.models.parsed_instance import ParsedInstance
-from onadata.apps.logger.models import Instance
-from onadata.apps.viewer.tasks import create_xls_export
+from onadata.apps.logger.models import Instance, XForm
+from onadata.apps.viewer.tasks import create_async_export, create_xls_export
 from onadata.libs.utils.export_tools import generate_export,\
-    increment_index_in_filename, dict_to_joined_export
+    increment_index_in_filename, dict_to_joined_export, ExportBuilder,\
+    generate_attachments_zip_export, get_cached_export, get_export_key,\
+    newset_export_for
 
 AMBULANCE_KEY = 'transport/available_transportation_types_to_referral_fac'\
                 'ility/ambulance'
@@ -1054,6 +1061,235 @@ class TestExports(TestBase):
         path, ext = os.path.splitext(export.filename)
         self.assertEqual(ext, '.zip')
 
+    def _get_export_rows(self, export, name=None):
+        storage = get_storage_class()()
+        with storage.open(export.filepath) as export_file:
+            content = export_file.read()
+        if name is not None:
+            content = zipfile.ZipFile(StringIO.StringIO(content)).read(name)
+        return list(csv.reader(StringIO.StringIO(content)))
+
+    def test_incremental_csv_zip_export(self):
+        self._publish_transportation_form()
+        self._submit_transport_instance(0)
+        self._submit_transport_instance(1)
+        export = generate_export(
+            Export.CSV_ZIP_EXPORT, 'zip', self.user.username,
+            self.xform.id_string)
+        self.assertEqual(export.instance_count, 2)
+
+        self._submit_transport_instance(2)
+        with patch.object(ExportBuilder, 'to_zipped_csv') as to_zipped_csv:
+            export = generate_export(
+                Export.CSV_ZIP_EXPORT, 'zip', self.user.username,
+                self.xform.id_string)
+        self.assertFalse(to_zipped_csv.called)
+        self.assertEqual(export.instance_count, 3)
+        self.assertEqual(export.last_instance_id,
+                         self.xform.instances.latest('pk').pk)
+
+        rows = self._get_export_rows(export, 'transportation.csv')
+        self.assertEqual(len(rows), 4)
+        index_column = rows[0].index('_index')
+        self.assertEqual([row[index_column] for row in rows[1:]],
+                         ['1', '2', '3'])
+
+    def test_incremental_export_removes_downloaded_previous_export(self):
+        self._publish_transportation_form()
+        self._submit_transport_instance(0)
+        generate_export(
+            Export.CSV_ZIP_EXPORT, 'zip', self.user.username,
+            self.xform.id_string)
+
+        downloads = []
+
+        def download(export):
+            # what `full_filepath` does on storages without local paths
+            with get_storage_class()().open(export.filepath) as export_file:
+                with NamedTemporaryFile(suffix='.zip',
+                                        delete=False) as tmp:
+                    tmp.write(export_file.read())
+            downloads.append(tmp.name)
+            return tmp.name
+
+        self._submit_transport_instance(1)
+        with patch.object(Export, 'full_filepath', property(download)),\
+                patch.object(Export, 'is_stored_locally', False):
+            export = generate_export(
+                Export.CSV_ZIP_EXPORT, 'zip', self.user.username,
+                self.xform.id_string)
+        self.assertEqual(export.instance_count, 2)
+        self.assertEqual(len(downloads), 1)
+        self.assertFalse(os.path.exists(downloads[0]))
+
+    def test_incremental_csv_export(self):
+        self._publish_transportation_form()
+        self._submit_transport_instance(0)
+        generate_export(
+            Export.CSV_EXPORT, 'csv', self.user.username,
+            self.xform.id_string)
+
+        self._submit_transport_instance(1)
+        with patch.object(ExportBuilder, 'to_flat_csv_export') as to_csv:
+            export = generate_export(
+                Export.CSV_EXPORT, 'csv', self.user.username,
+                self.xform.id_string)
+        self.assertFalse(to_csv.called)
+        self.assertEqual(export.instance_count, 2)
+        rows = self._get_export_rows(export)
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(len(set(len(row) for row in rows)), 1)
+
+    def test_edited_submissions_rebuild_incremental_export(self):
+        self._publish_transportation_form()
+        self._submit_transport_instance(0)
+        self._submit_transport_instance(1)
+        generate_export(
+            Export.CSV_ZIP_EXPORT, 'zip', self.user.username,
+            self.xform.id_string)
+
+        self.xform.instances.earliest('pk').save()
+        with patch.object(ExportBuilder, 'append_zipped_csv') as append:
+            export = generate_export(
+                Export.CSV_ZIP_EXPORT, 'zip', self.user.username,
+                self.xform.id_string)
+        self.assertFalse(append.called)
+        self.assertEqual(export.instance_count, 2)
+        self.assertEqual(
+            len(self._get_export_rows(export, 'transportation.csv')), 3)
+
+    @override_settings(INCREMENTAL_EXPORTS_ENABLED=False, EXPORT_WORKERS=2,
+                       EXPORT_PARALLEL_MIN_RECORDS=0, EXPORT_SHARD_SIZE=1)
+    def test_no_parallel_export_inside_a_transaction(self):
+        # as for the exports made during a request; forking would close the
+        # connection in the middle of the transaction
+        self._publish_transportation_form()
+        self._make_submissions()
+        with patch('onadata.libs.utils.parallel_export.'
+                   'write_parallel_export') as write_parallel_export:
+            export = generate_export(
+                Export.CSV_ZIP_EXPORT, 'zip', self.user.username,
+                self.xform.id_string)
+        self.assertFalse(write_parallel_export.called)
+        self.assertTrue(export.is_successful)
+        self.assertEqual(
+            len(self._get_export_rows(export, 'transportation.csv')), 5)
+
+    def test_identical_async_exports_are_shared(self):
+        self._publish_transportation_form()
+        self._submit_transport_instance()
+        xform = XForm.objects.get(pk=self.xform.pk)
+        num_exports = Export.objects.count()
+        export, result = create_async_export(
+            xform, Export.CSV_EXPORT, None, False)
+        self.assertTrue(export.is_successful)
+        same_export, same_result = create_async_export(
+            xform, Export.CSV_EXPORT, None, False)
+        self.assertEqual(same_export.pk, export.pk)
+        self.assertEqual(same_result.task_id, result.task_id)
+        self.assertEqual(Export.objects.count(), num_exports + 1)
+
+        # other options, or new submissions, make for another export
+        other_export, result = create_async_export(
+            xform, Export.CSV_EXPORT, None, False,
+            {'group_delimiter': '.'})
+        self.assertNotEqual(other_export.pk, export.pk)
+        self._submit_transport_instance_w_uuid(
+            "transport_2011-07-25_19-05-36")
+        new_export, result = create_async_export(
+            XForm.objects.get(pk=self.xform.pk), Export.CSV_EXPORT, None,
+            False)
+        self.assertNotEqual(new_export.pk, export.pk)
+
+    def test_pending_async_export_is_attached_to(self):
+        self._publish_transportation_form()
+        self._submit_transport_instance()
+        with patch('onadata.apps.viewer.tasks.create_csv_export.'
+                   'apply_async') as apply_async:
+            apply_async.side_effect = lambda *args, **kwargs: AsyncResult(
+                kwargs['task_id'])
+            export, result = create_async_export(
+                self.xform, Export.CSV_EXPORT, None, False)
+            same_export, same_result = create_async_export(
+                self.xform, Export.CSV_EXPORT, None, False)
+        self.assertTrue(export.is_pending)
+        self.assertEqual(same_export.pk, export.pk)
+        self.assertEqual(same_result.task_id, export.task_id)
+        self.assertEqual(apply_async.call_count, 1)
+
+        # unless it has been pending for too long
+        with override_settings(EXPORT_PENDING_TIMEOUT=-1):
+            self.assertIsNone(get_cached_export(
+                self.xform, Export.CSV_EXPORT, export.export_key,
+                pending=True))
+
+    def test_xls_and_xlsx_async_exports_are_kept_apart(self):
+        self._publish_transportation_form()
+        self._submit_transport_instance()
+        xform = XForm.objects.get(pk=self.xform.pk)
+        with patch('onadata.apps.viewer.tasks.create_xls_export.'
+                   'apply_async') as apply_async:
+            apply_async.side_effect = lambda *args, **kwargs: AsyncResult(
+                kwargs['task_id'])
+            xlsx_export, result = create_async_export(
+                xform, Export.XLS_EXPORT, None, True)
+            xls_export, result = create_async_export(
+                xform, Export.XLS_EXPORT, None, False)
+        self.assertNotEqual(xls_export.pk, xlsx_export.pk)
+        self.assertEqual(apply_async.call_count, 2)
+        self.assertFalse(apply_async.call_args[0][1]['force_xlsx'])
+
+    def test_filtered_exports_are_kept_apart(self):
+        self._publish_transportation_form()
+        self._make_submissions()
+        xform = XForm.objects.get(pk=self.xform.pk)
+        export = generate_export(
+            Export.CSV_EXPORT, 'csv', self.user.username,
+            self.xform.id_string)
+        query = json.dumps({'_uuid': xform.instances.all()[0].uuid})
+        filtered_export = generate_export(
+            Export.CSV_EXPORT, 'csv', self.user.username,
+            self.xform.id_string, None, query)
+        self.assertTrue(filtered_export.filtered)
+        self.assertEqual(
+            get_cached_export(
+                xform, Export.CSV_EXPORT,
+                get_export_key(xform, Export.CSV_EXPORT, query,
+                               extension='csv'), 'csv'),
+            filtered_export)
+        self.assertIsNone(get_cached_export(
+            xform, Export.CSV_EXPORT,
+            get_export_key(xform, Export.CSV_EXPORT, query,
+                           extension='csv'), 'zip'))
+        self.assertEqual(
+            newset_export_for(self.xform, Export.CSV_EXPORT), export)
+
+    def test_attachments_zip_export(self):
+        self._publish_transportation_form()
+        self._submit_transport_instance_w_attachment()
+        name = self.attachment_media_file.name
+        with get_storage_class()().open(name) as f:
+            content = f.read()
+        export = generate_attachments_zip_export(
+            Export.ZIP_EXPORT, 'zip', self.user.username,
+            self.xform.id_string)
+        zip_file = zipfile.ZipFile(export.full_filepath)
+        self.assertIsNone(zip_file.testzip())
+        self.assertEqual(zip_file.read(name), content)
+
+        # streamed straight to the client
+        url = reverse('zip_export', kwargs={
+            'username': self.user.username,
+            'id_string': self.xform.id_string
+        })
+        with override_settings(ATTACHMENT_ZIP_CHUNK_SIZE=1024):
+            response = self.client.get(url)
+            self.assertTrue(response.streaming)
+            data = ''.join(response.streaming_content)
+        zip_file = zipfile.ZipFile(StringIO.StringIO(data))
+        self.assertEqual(zip_file.namelist(), [name])
+        self.assertEqual(zip_file.read(name), content)
+
     def test_dict_to_joined_export_notes(self):
         submission = {
             "_id": 579828,
@@ -1,3 +1,4 @@
+import json
 import os
 import unittest
 
@@ -5,7 +6,7 @@ from django.core.urlresolvers import reverse
 
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.logger.models.instance import Instance
-from onadata.apps.viewer.views import kml_export
+from onadata.apps.viewer.views import geojson_export, kml_export
 
 
 class TestKMLExport(TestBase):
@@ -43,3 +44,43 @@ class TestKMLExport(TestBase):
 
             self.assertMultiLineEqual(
                 expected_content.strip(), response.content.strip())
+
+    def test_kml_export_is_streamed(self):
+        self._publish_survey()
+        self._make_submissions_gps()
+        url = reverse(
+            kml_export,
+            kwargs={'username': self.user.username, 'id_string': 'gps'})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = ''.join(response.streaming_content)
+        for uuid in Instance.objects.filter(
+                xform__id_string='gps').values_list('uuid', flat=True):
+            self.assertIn('Survey Instance: %s' % uuid, content)
+        self.assertIn(
+            '<coordinates>-73.96446704864502,40.81101715564728</coordinates>',
+            content)
+
+    def test_geojson_export_bbox(self):
+        self._publish_survey()
+        self._make_submissions_gps()
+        url = reverse(
+            geojson_export,
+            kwargs={'username': self.user.username, 'id_string': 'gps'})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(''.join(response.streaming_content))
+        self.assertEqual(data['type'], 'FeatureCollection')
+        self.assertEqual(len(data['features']), 2)
+
+        response = self.client.get(
+            url, {'bbox': '-73.96447,40.811,-73.96446,40.8111'})
+        data = json.loads(''.join(response.streaming_content))
+        self.assertEqual(
+            [feature['geometry']['coordinates']
+             for feature in data['features']],
+            [[-73.96446704864502, 40.81101715564728]])
+
+        response = self.client.get(url, {'bbox': '-73.96447,40.811'})
+        self.assertEqual(response.status_code, 400)
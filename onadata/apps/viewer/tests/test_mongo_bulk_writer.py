@@ -0,0 +1,49 @@
+from django.conf import settings
+
+from onadata.apps.logger.models import Instance
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.apps.viewer.models.parsed_instance import ParsedInstance
+from onadata.apps.viewer.mongo_bulk_writer import MongoBulkWriter
+from onadata.libs.utils.common_tags import ID
+
+
+class TestMongoBulkWriter(TestBase):
+
+    def setUp(self):
+        super(TestMongoBulkWriter, self).setUp()
+        self._publish_transportation_form()
+        self._make_submissions()
+        settings.MONGO_DB.instances.drop()
+        Instance.objects.update(is_synced_with_mongo=False)
+
+    def test_records_are_written_on_flush(self):
+        writer = MongoBulkWriter(max_size=100)
+        for pi in ParsedInstance.objects.all():
+            self.assertTrue(pi.update_mongo(writer=writer))
+        self.assertEqual(settings.MONGO_DB.instances.count(), 0)
+        self.assertEqual(len(writer), 4)
+
+        synced_ids = writer.flush()
+
+        self.assertEqual(len(synced_ids), 4)
+        self.assertEqual(len(writer), 0)
+        self.assertEqual(settings.MONGO_DB.instances.count(), 4)
+        self.assertEqual(
+            Instance.objects.filter(is_synced_with_mongo=True).count(), 4)
+
+    def test_writer_flushes_when_full(self):
+        with MongoBulkWriter(max_size=3) as writer:
+            for pi in ParsedInstance.objects.all():
+                pi.update_mongo(writer=writer)
+            self.assertEqual(settings.MONGO_DB.instances.count(), 3)
+        self.assertEqual(settings.MONGO_DB.instances.count(), 4)
+
+    def test_last_write_wins(self):
+        pi = ParsedInstance.objects.all()[0]
+        record = pi.to_dict_for_mongo()
+        with MongoBulkWriter() as writer:
+            writer.add(dict(record, _status=u'first'))
+            writer.add(dict(record, _status=u'last'))
+            self.assertEqual(len(writer), 1)
+        saved = settings.MONGO_DB.instances.find_one({ID: record[ID]})
+        self.assertEqual(saved[u'_status'], u'last')
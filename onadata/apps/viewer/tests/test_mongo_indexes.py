@@ -0,0 +1,41 @@
+from django.conf import settings
+
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.apps.viewer.mongo_indexes import COLLECTION_SCAN_STAGE,\
+    MONGO_INDEXES, ensure_indexes, explain_canonical_queries,\
+    get_missing_indexes, get_plan_stages
+
+
+class TestMongoIndexes(TestBase):
+
+    def test_ensure_indexes(self):
+        settings.MONGO_DB.instances.drop()
+        settings.MONGO_DB.auditlog.drop()
+        self.assertEqual(get_missing_indexes(), MONGO_INDEXES)
+
+        created = ensure_indexes()
+        self.assertEqual(
+            dict((name, len(names)) for name, names in created.items()),
+            dict((name, len(indexes))
+                 for name, indexes in MONGO_INDEXES.items()))
+        self.assertEqual(get_missing_indexes(), {})
+        self.assertEqual(ensure_indexes(), {})
+
+    def test_canonical_queries_use_indexes(self):
+        self._publish_transportation_form_and_submit_instance()
+        ensure_indexes()
+        results = explain_canonical_queries(
+            self.user.username, self.xform.id_string)
+        self.assertEqual(
+            [description for description, stages, is_collection_scan
+             in results if is_collection_scan], [])
+
+    def test_get_plan_stages(self):
+        explanation = {'queryPlanner': {'winningPlan': {
+            'stage': 'SORT',
+            'inputStage': {'stage': 'OR', 'inputStages': [
+                {'stage': 'IXSCAN'}, {'stage': COLLECTION_SCAN_STAGE}]}}}}
+        self.assertEqual(get_plan_stages(explanation),
+                         ['SORT', 'OR', 'IXSCAN', COLLECTION_SCAN_STAGE])
+        self.assertEqual(get_plan_stages({'cursor': 'BasicCursor'}),
+                         [COLLECTION_SCAN_STAGE])
@@ -0,0 +1,70 @@
+import os
+import tempfile
+
+from django.conf import settings
+
+from onadata.apps.logger.models import Instance
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.apps.viewer.models.parsed_instance import ParsedInstance
+from onadata.apps.viewer.mongo_rebuild import RebuildCheckpoint,\
+    iter_id_chunks, rebuild_instances, rebuild_mongo
+from onadata.libs.utils.logger_tools import mongo_sync_status
+
+
+class TestMongoRebuild(TestBase):
+
+    def setUp(self):
+        super(TestMongoRebuild, self).setUp()
+        self._publish_transportation_form()
+        self._make_submissions()
+        self.instance_ids = sorted(
+            Instance.objects.values_list('pk', flat=True))
+        settings.MONGO_DB.instances.drop()
+        self.checkpoint = RebuildCheckpoint(
+            os.path.join(tempfile.mkdtemp(), 'checkpoint.json'))
+
+    def test_iter_id_chunks(self):
+        chunks = list(iter_id_chunks(Instance.objects.all(), 3))
+        self.assertEqual(chunks, [self.instance_ids[:3],
+                                  self.instance_ids[3:]])
+        self.assertEqual(
+            list(iter_id_chunks(Instance.objects.all(), 3,
+                                after=self.instance_ids[2])),
+            [self.instance_ids[3:]])
+
+    def test_rebuild_mongo(self):
+        progress = []
+        synced, failed_ids = rebuild_mongo(
+            chunk_size=3, checkpoint=self.checkpoint,
+            progress=lambda *args: progress.append(args[0]))
+        self.assertEqual((synced, failed_ids), (4, []))
+        self.assertEqual(progress, [3, 4])
+        self.assertEqual(settings.MONGO_DB.instances.count(), 4)
+        self.assertEqual(self.checkpoint.load(), self.instance_ids[-1])
+
+    def test_rebuild_mongo_resumes_from_checkpoint(self):
+        self.checkpoint.save(self.instance_ids[1])
+        synced, failed_ids = rebuild_mongo(checkpoint=self.checkpoint)
+        self.assertEqual(synced, 2)
+        self.assertEqual(
+            sorted(record['_id'] for record in
+                   settings.MONGO_DB.instances.find({}, {'_id': 1})),
+            self.instance_ids[2:])
+        self.checkpoint.clear()
+        self.assertEqual(self.checkpoint.load(), 0)
+
+    def test_rebuild_instances_creates_parsed_instances(self):
+        ParsedInstance.objects.filter(
+            instance_id=self.instance_ids[0]).delete()
+        synced, failed_ids = rebuild_instances(self.instance_ids)
+        self.assertEqual((synced, failed_ids), (4, []))
+        self.assertEqual(ParsedInstance.objects.count(), 4)
+
+    def test_mongo_sync_status(self):
+        report = mongo_sync_status()
+        self.assertIn('Instance count: 4\tMongo count: 0', report)
+        self.assertIn('Total # of records to remongo: 4', report)
+        mongo_sync_status(remongo=True)
+        self.assertEqual(settings.MONGO_DB.instances.count(), 4)
+        self.assertIn('Total # of forms out of sync: 0',
+                      mongo_sync_status(user=self.user))
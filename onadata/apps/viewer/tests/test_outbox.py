@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.utils import timezone
+from mock import patch
+
+from onadata.apps.logger.models import Instance
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.apps.viewer.models.outbox import OutboxEntry
+
+
+class TestOutbox(TestBase):
+
+    def setUp(self):
+        super(TestOutbox, self).setUp()
+        self._publish_transportation_form()
+
+    def test_submission_is_synced_by_drain(self):
+        with self.settings(SUBMISSION_OUTBOX_ENABLED=True):
+            self._make_submissions()
+        self.assertEqual(settings.MONGO_DB.instances.count(), 0)
+        self.assertEqual(OutboxEntry.objects.count(), 4)
+        self.assertTrue(all(
+            OutboxEntry.objects.values_list('call_services', flat=True)))
+
+        with patch('onadata.apps.viewer.models.outbox.call_service') \
+                as call_service:
+            self.assertEqual(OutboxEntry.drain(), 4)
+            self.assertEqual(call_service.call_count, 4)
+
+        self.assertEqual(OutboxEntry.objects.count(), 0)
+        self.assertEqual(settings.MONGO_DB.instances.count(), 4)
+        self.assertEqual(
+            Instance.objects.filter(is_synced_with_mongo=True).count(), 4)
+        self.assertEqual(OutboxEntry.drain(), 0)
+
+    def test_outbox_is_not_used_by_default(self):
+        self._make_submissions()
+        self.assertEqual(OutboxEntry.objects.count(), 0)
+        self.assertEqual(settings.MONGO_DB.instances.count(), 4)
+
+    def test_failed_entries_are_retried_later(self):
+        with self.settings(SUBMISSION_OUTBOX_ENABLED=True):
+            self._make_submissions()
+        with patch('onadata.apps.viewer.models.outbox.MongoBulkWriter.flush',
+                   return_value=[]):
+            self.assertEqual(OutboxEntry.drain(), 0)
+        self.assertEqual(OutboxEntry.objects.count(), 4)
+        self.assertTrue(all(
+            entry.attempts == 1 and entry.next_attempt_at > timezone.now()
+            for entry in OutboxEntry.objects.all()))
+        # they are not claimed again until they are due, newer entries are
+        OutboxEntry.objects.create(instance=Instance.objects.first())
+        self.assertEqual(OutboxEntry.drain(), 1)
+        self.assertEqual(OutboxEntry.objects.count(), 4)
+
+        OutboxEntry.objects.update(next_attempt_at=timezone.now())
+        with self.settings(SUBMISSION_OUTBOX_MAX_ATTEMPTS=2), \
+                patch('onadata.apps.viewer.models.outbox.MongoBulkWriter'
+                      '.flush', return_value=[]):
+            self.assertEqual(OutboxEntry.drain(), 0)
+        self.assertEqual(
+            OutboxEntry.objects.filter(is_dead_letter=True).count(), 4)
+        self.assertEqual(OutboxEntry.drain(), 0)
@@ -1,9 +1,11 @@
 import csv
+import json
 import os
 from tempfile import NamedTemporaryFile
 
 from django.utils.dateparse import parse_datetime
 from django.core.urlresolvers import reverse
+from mock import patch
 
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.apps.logger.models.xform import XForm
@@ -586,6 +588,27 @@ class TestPandasMongoBridge(TestBase):
         csv_file.close()
         os.unlink(temp_file.name)
 
+    def test_csv_export_reads_repeats_then_records(self):
+        self._publish_single_level_repeat_form()
+        self._submit_fixture_instance("new_repeats", "01")
+        csv_df_builder = CSVDataFrameBuilder(self.user.username,
+                                             self.xform.id_string)
+        iter_batches = CSVDataFrameBuilder._iter_batches
+        fields_read = []
+
+        def _iter_batches(builder, batchsize, fields='[]'):
+            fields_read.append(json.loads(fields))
+            return iter_batches(builder, batchsize, fields)
+
+        temp_file = NamedTemporaryFile(suffix=".csv")
+        with patch.object(CSVDataFrameBuilder, '_iter_batches',
+                          _iter_batches):
+            csv_df_builder.export_to(temp_file.name)
+        temp_file.close()
+        self.assertEqual(fields_read, [
+            CSVDataFrameBuilder._get_repeat_xpaths(self.xform.data_dictionary(
+            ).survey), []])
+
     def test_csv_column_indices_in_groups_within_repeats(self):
         self._publish_xls_fixture_set_xform("groups_in_repeats")
         self._submit_fixture_instance("groups_in_repeats", "01")
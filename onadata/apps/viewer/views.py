@@ -17,10 +17,11 @@ from django.core.urlresolvers import reverse
 from django.db.models import Q
 from django.http import (
     HttpResponseForbidden, HttpResponseRedirect, HttpResponseNotFound,
-    HttpResponseBadRequest, HttpResponse)
+    HttpResponseBadRequest, HttpResponse, StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
 from django.shortcuts import redirect
 from django.shortcuts import render
+from django.utils import timezone
 from django.utils.http import urlquote
 from django.utils.translation import ugettext as _
 from django.views.decorators.http import require_POST
@@ -38,16 +39,21 @@ from onadata.libs.exceptions import NoRecordsFoundError
 from onadata.libs.utils.common_tags import SUBMISSION_TIME
 from onadata.libs.utils.export_tools import (
     generate_export,
+    get_cached_export,
+    get_export_key,
     should_create_new_export,
-    kml_export_data,
-    newset_export_for)
+    iter_geojson,
+    iter_kml,
+    newset_export_for,
+    parse_bbox)
 from onadata.libs.utils.image_tools import image_url
 from onadata.libs.utils.google import google_export_xls, redirect_uri
 from onadata.libs.utils.log import audit_log, Actions
 from onadata.libs.utils.logger_tools import response_with_mimetype_and_name,\
     disposition_ext_and_date
-from onadata.libs.utils.viewer_tools import create_attachments_zipfile,\
-    export_def_from_filename
+from onadata.libs.utils.streaming import chunked
+from onadata.libs.utils.viewer_tools import export_def_from_filename,\
+    iter_attachments_zip
 from onadata.libs.utils.user_auth import has_permission, get_xform_and_perms,\
     helper_auth_helper, has_edit_permission
 from xls_writer import XlsWriter
@@ -242,7 +248,8 @@ def data_export(request, username, id_string, export_type):
     force_xlsx = request.GET.get('xls') != 'true'
     if export_type == Export.XLS_EXPORT and force_xlsx:
         extension = 'xlsx'
-    elif export_type in [Export.CSV_ZIP_EXPORT, Export.SAV_ZIP_EXPORT]:
+    elif export_type in [Export.CSV_ZIP_EXPORT, Export.SAV_ZIP_EXPORT,
+                         Export.PARQUET_ZIP_EXPORT]:
         extension = 'zip'
 
     audit = {
@@ -260,8 +267,17 @@ def data_export(request, username, id_string, export_type):
             query = json.dumps(
                 _set_submission_time_to_query(json.loads(query), request))
         try:
-            export = generate_export(
-                export_type, extension, username, id_string, None, query)
+            export = None
+            if query is not None:
+                # filtered exports are kept for identical requests
+                export = get_cached_export(
+                    xform, export_type,
+                    get_export_key(xform, export_type, query,
+                                   extension=extension), extension)
+            if export is None:
+                export = generate_export(
+                    export_type, extension, username, id_string, None,
+                    query)
             audit_log(
                 Actions.EXPORT_CREATED, request.user, owner,
                 _("Created %(export_type)s export on '%(id_string)s'.") %
@@ -568,33 +584,98 @@ def delete_export(request, username, id_string, export_type):
         }))
 
 
-def kml_export(request, username, id_string):
-    # read the locations from the database
+def _get_geo_filters(request):
+    """
+    Returns the `bbox`, `start` and `end` filters of a KML or GeoJSON export
+    from the query string. Raises ValueError if one of them is invalid.
+    """
+    filters = {}
+    if request.GET.get('bbox'):
+        filters['bbox'] = parse_bbox(request.GET['bbox'])
+    for key in ['start', 'end']:
+        if request.GET.get(key):
+            filters[key] = datetime.strptime(
+                request.GET[key], '%y_%m_%d_%H_%M_%S').replace(
+                tzinfo=timezone.utc)
+    return filters
+
+
+def _geo_export(request, username, id_string, export_type, extension,
+                content_type, iter_export):
     owner = get_object_or_404(User, username__iexact=username)
     xform = get_object_or_404(XForm, id_string__exact=id_string, user=owner)
     helper_auth_helper(request)
     if not has_permission(xform, owner, request):
         return HttpResponseForbidden(_(u'Not shared.'))
-    data = {'data': kml_export_data(id_string, user=owner)}
-    response = \
-        render(request, "survey.kml", data,
-               content_type="application/vnd.google-earth.kml+xml")
+    try:
+        filters = _get_geo_filters(request)
+    except ValueError:
+        return HttpResponseBadRequest(
+            _(u"The bounding box must be in the format xmin,ymin,xmax,ymax "
+              u"and dates in the format YY_MM_DD_hh_mm_ss"))
+
+    response = StreamingHttpResponse(
+        chunked(iter_export(xform, **filters)), content_type=content_type)
     response['Content-Disposition'] = \
-        disposition_ext_and_date(id_string, 'kml')
+        disposition_ext_and_date(id_string, extension)
     audit = {
         "xform": xform.id_string,
-        "export_type": Export.KML_EXPORT
+        "export_type": export_type
     }
     audit_log(
         Actions.EXPORT_CREATED, request.user, owner,
-        _("Created KML export on '%(id_string)s'.") %
+        _("Created %(export_type)s export on '%(id_string)s'.") %
         {
+            'export_type': export_type.upper(),
             'id_string': xform.id_string,
         }, audit, request)
     # log download as well
     audit_log(
         Actions.EXPORT_DOWNLOADED, request.user, owner,
-        _("Downloaded KML export on '%(id_string)s'.") %
+        _("Downloaded %(export_type)s export on '%(id_string)s'.") %
+        {
+            'export_type': export_type.upper(),
+            'id_string': xform.id_string,
+        }, audit, request)
+
+    return response
+
+
+def kml_export(request, username, id_string):
+    return _geo_export(
+        request, username, id_string, Export.KML_EXPORT, 'kml',
+        "application/vnd.google-earth.kml+xml", iter_kml)
+
+
+def geojson_export(request, username, id_string):
+    return _geo_export(
+        request, username, id_string, 'geojson', 'geojson',
+        "application/geo+json", iter_geojson)
+
+
+def zip_export(request, username, id_string):
+    """
+    Streams a ZIP archive of the attachments of a form to the client while
+    it is built, instead of saving it to storage first.
+    """
+    owner = get_object_or_404(User, username__iexact=username)
+    xform = get_object_or_404(XForm, id_string__exact=id_string, user=owner)
+    helper_auth_helper(request)
+    if not has_permission(xform, owner, request):
+        return HttpResponseForbidden(_(u'Not shared.'))
+    attachments = Attachment.objects.filter(instance__xform=xform)
+    response = StreamingHttpResponse(
+        iter_attachments_zip(attachments),
+        content_type="application/%s" % Export.EXPORT_MIMES['zip'])
+    response['Content-Disposition'] = \
+        disposition_ext_and_date(id_string, 'zip')
+    audit = {
+        "xform": xform.id_string,
+        "export_type": Export.ZIP_EXPORT
+    }
+    audit_log(
+        Actions.EXPORT_DOWNLOADED, request.user, owner,
+        _("Downloaded ZIP export on '%(id_string)s'.") %
         {
             'id_string': xform.id_string,
         }, audit, request)
@@ -1,35 +1,38 @@
+from collections import Counter
+
 from django.conf import settings
 from django.db import connection
 
+from onadata.apps.logger.models.daily_submission_count import\
+    get_daily_submission_counts
+from onadata.apps.logger.models.field_value_count import FieldValueCount
+from onadata.apps.logger.models.json_field_index import JSONFieldIndex,\
+    get_json_expression, get_numeric_value
 from onadata.libs.utils.common_tags import SUBMISSION_TIME
+from onadata.libs.utils.form_schema_cache import get_form_schema
+
+POSTGRES_ALIAS_LENGTH = 63
+
+# the aggregates of `get_numeric_field_stats()` per field
+STATS_AGGREGATES = [
+    ('count', 'COUNT(%s)'),
+    ('min', 'MIN(%s)'),
+    ('max', 'MAX(%s)'),
+    ('mean', 'AVG(%s)'),
+    ('median', 'PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY %s)'),
+    ('mode', 'MODE() WITHIN GROUP (ORDER BY %s)'),
+]
 
 
-def _count_group(field, name, xform):
+def _count_groups(xform, fields):
     if using_postgres:
-        result = _postgres_count_group(field, name, xform)
+        result = _postgres_count_groups(xform, fields)
     else:
         raise Exception("Unsupported Database")
 
     return result
 
 
-def _dictfetchall(cursor):
-    "Returns all rows from a cursor as a dict"
-    desc = cursor.description
-
-    return [
-        dict(zip([col[0] for col in desc], row))
-        for row in cursor.fetchall()
-    ]
-
-
-def _execute_query(query, to_dict=True):
-    cursor = connection.cursor()
-    cursor.execute(query)
-
-    return _dictfetchall(cursor) if to_dict else cursor
-
-
 def _get_fields_of_type(xform, types):
     k = []
     dd = xform.data_dictionary()
@@ -43,47 +46,102 @@ def _get_fields_of_type(xform, types):
     return k
 
 
-def _json_query(field):
-    return "json->>'%s'" % field
-
-
-def _postgres_count_group(field, name, xform):
-    string_args = _query_args(field, name, xform)
-    if is_date_field(xform, field):
-        string_args['json'] = "to_char(to_date(%(json)s, 'YYYY-MM-DD'), 'YYYY"\
-                              "-MM-DD')" % string_args
-
-    return "SELECT %(json)s AS \"%(name)s\", COUNT(*) AS count FROM "\
-           "%(table)s WHERE %(restrict_field)s=%(restrict_value)s "\
-           "AND %(exclude_deleted)s "\
-           "GROUP BY %(json)s" % string_args
-
-
-def _postgres_select_key(field, name, xform):
-    string_args = _query_args(field, name, xform)
-
-    return "SELECT %(json)s AS \"%(name)s\" FROM %(table)s WHERE "\
-           "%(restrict_field)s=%(restrict_value)s "\
-           "AND %(exclude_deleted)s" % string_args
-
+def _get_field_value_counts(xform, fields):
+    """
+    Returns `{field: {value: count}}` from the field summaries of `xform`
+    for those of `fields` which have a summary to be used.
+    """
+    if not xform.has_field_summaries:
+        return {}
+    summary_fields = get_form_schema(xform).summary_fields
+    counts = dict((field, {}) for field in fields if field in summary_fields)
+
+    unusable = set()
+    for field, value, count in FieldValueCount.objects.filter(
+            xform=xform, field__in=list(counts)).values_list(
+            'field', 'value', 'count'):
+        if value is None:
+            unusable.add(field)
+        elif count:
+            counts[field][value] = count
+    for field in unusable:
+        del counts[field]
+    return counts
+
+
+def _grouped_rows(value_counts, name):
+    # rows keyed by the column name Postgres gives to the alias `name`
+    name = name[:POSTGRES_ALIAS_LENGTH].encode('utf-8')
+    return [{name: value, 'count': count}
+            for value, count in value_counts.items()]
+
+
+def _postgres_count_groups(xform, fields):
+    # one grouping set per field, `GROUPING()` telling which set a row is of
+    date_fields = set(get_date_fields(xform))
+    columns = []
+    params = []
+    for i, field in enumerate(fields):
+        json, json_params = get_json_expression(field)
+        if field in date_fields:
+            json = "to_char(to_date(%s, 'YYYY-MM-DD'), 'YYYY-MM-DD')" % json
+        columns.append("%s AS f%d" % (json, i))
+        params.extend(json_params)
+    names = ['f%d' % i for i in range(len(fields))]
+    query = "SELECT %s, %s, COUNT(*) FROM (SELECT %s FROM logger_instance "\
+            "WHERE xform_id = %%s AND deleted_at IS NULL) AS answers "\
+            "GROUP BY GROUPING SETS (%s)" % (
+                ', '.join('GROUPING(%s)' % name for name in names),
+                ', '.join(names), ', '.join(columns),
+                ', '.join('(%s)' % name for name in names))
 
-def _query_args(field, name, xform):
-    return {
-        'table': 'logger_instance',
-        'json': _json_query(field),
-        'name': name,
-        'restrict_field': 'xform_id',
-        'restrict_value': xform.pk,
-        'exclude_deleted': 'deleted_at IS NULL'}
-
-
-def _select_key(field, name, xform):
-    if using_postgres:
-        result = _postgres_select_key(field, name, xform)
-    else:
-        raise Exception("Unsupported Database")
-
-    return result
+    cursor = connection.cursor()
+    cursor.execute(query, params + [xform.pk])
+    grouped = dict((field, {}) for field in fields)
+    for row in cursor.fetchall():
+        i = row.index(0)
+        grouped[fields[i]][row[len(fields) + i]] = row[-1]
+    return grouped
+
+
+def _numeric_field_stats(value_counts):
+    # what the aggregates of `get_numeric_field_stats()` select
+    numbers = Counter()
+    for value, count in value_counts.items():
+        number = get_numeric_value(value)
+        if number is not None:
+            numbers[number] += count
+    count = sum(numbers.values())
+    stats = dict.fromkeys([name for name, aggregate in STATS_AGGREGATES])
+    stats['count'] = count
+    if not count:
+        return stats
+
+    values = sorted(numbers)
+    # `PERCENTILE_CONT(0.5)` interpolates between the values around the
+    # middle position
+    position = (count - 1) / 2.0
+    lower = int(position)
+    upper = lower + 1 if position > lower else lower
+    below = None
+    seen = 0
+    for value in values:
+        seen += numbers[value]
+        if below is None and seen > lower:
+            below = value
+        if seen > upper:
+            above = value
+            break
+    fraction = position - lower
+    stats.update({
+        'min': values[0],
+        'max': values[-1],
+        'mean': sum(value * numbers[value] for value in values) / count,
+        'median': below + (above - below) * fraction,
+        # the smallest of the most frequent values, as `MODE()` picks
+        'mode': max(values, key=lambda value: (numbers[value], -value)),
+    })
+    return stats
 
 
 def flatten(l):
@@ -97,9 +155,56 @@ def get_date_fields(xform):
 
 
 def get_field_records(field, xform):
-    result = _execute_query(_select_key(field, field, xform),
-                            to_dict=False)
-    return [float(i[0]) for i in result if i[0] is not None]
+    json, params = get_json_expression(field)
+    cursor = connection.cursor()
+    cursor.execute("SELECT %s FROM logger_instance WHERE xform_id = %%s "
+                   "AND deleted_at IS NULL" % json, params + [xform.pk])
+    return [float(i[0]) for i in cursor.fetchall() if i[0] is not None]
+
+
+def get_numeric_field_stats(xform, fields):
+    """
+    Returns `{field: {'count', 'min', 'max', 'mean', 'median', 'mode'}}`
+    for `fields` of the submissions of `xform`, from its field summaries for
+    the fields which have one, computed in a single query for the others.
+    Answers which are not numbers are left out; a field without any number
+    has a `count` of 0 and `None` for the other stats.
+    """
+    if not fields:
+        return {}
+    counts = _get_field_value_counts(xform, fields)
+    stats = dict((field, _numeric_field_stats(value_counts))
+                 for field, value_counts in counts.items())
+    fields = [field for field in fields if field not in stats]
+    if not fields:
+        return stats
+    if not using_postgres:
+        raise Exception("Unsupported Database")
+
+    columns = []
+    aggregates = []
+    params = []
+    for i, field in enumerate(fields):
+        column = 'f%d' % i
+        json, json_params = get_json_expression(field, JSONFieldIndex.NUMERIC)
+        columns.append("%s AS %s" % (json, column))
+        params.extend(json_params)
+        aggregates.extend(aggregate % column
+                          for name, aggregate in STATS_AGGREGATES)
+    params.append(xform.pk)
+    query = "SELECT %s FROM (SELECT %s FROM logger_instance WHERE "\
+            "xform_id = %%s AND deleted_at IS NULL) AS answers" % (
+                ', '.join(aggregates), ', '.join(columns))
+
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    row = cursor.fetchone()
+
+    names = [name for name, aggregate in STATS_AGGREGATES]
+    stats.update(
+        (field, dict(zip(names, row[i * len(names):(i + 1) * len(names)])))
+        for i, field in enumerate(fields))
+    return stats
 
 
 def get_form_submissions_grouped_by_field(xform, field, name=None):
@@ -107,9 +212,36 @@ def get_form_submissions_grouped_by_field(xform, field, name=None):
     if not name:
         name = field
 
-    result = _execute_query(_count_group(field, name, xform))
-
-    return result
+    return get_form_submissions_grouped_by_fields(xform, [(field, name)])[0]
+
+
+def get_form_submissions_grouped_by_fields(xform, fields):
+    """
+    Number of submissions grouped by each of `fields`, `(field, name)`s, as
+    `get_form_submissions_grouped_by_field()` returns them. The fields
+    without a field summary to be read are counted in a single query.
+    """
+    xpaths = list(set(field for field, name in fields))
+    counts = {}
+    if xform.has_daily_submission_counts:
+        # `_submission_time` is counted by day by the daily submission counts
+        days = dict((day.isoformat(), count)
+                    for day, count in get_daily_submission_counts(xform))
+        counts = _get_field_value_counts(xform, xpaths)
+        total = sum(days.values())
+        for value_counts in counts.values():
+            # submissions which did not answer are grouped under None
+            unanswered = total - sum(value_counts.values())
+            if unanswered:
+                value_counts[None] = unanswered
+        if SUBMISSION_TIME in xpaths:
+            counts[SUBMISSION_TIME] = days
+
+    queried = [field for field in xpaths if field not in counts]
+    if queried:
+        counts.update(_count_groups(xform, queried))
+
+    return [_grouped_rows(counts[field], name) for field, name in fields]
 
 
 def get_numeric_fields(xform):
@@ -6,7 +6,7 @@ from mock import patch
 from onadata.apps.logger.models.instance import Instance
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.libs.data.query import get_form_submissions_grouped_by_field,\
-    get_date_fields, get_field_records
+    get_date_fields, get_field_records, get_numeric_field_stats
 
 
 class TestTools(TestBase):
@@ -187,3 +187,41 @@ class TestTools(TestBase):
         field = 'age'
         records = get_field_records(field, self.xform)
         self.assertEqual(sorted(records), sorted([23, 23, 35]))
+
+    def test_get_numeric_field_stats_skips_non_numeric_answers(self):
+        path = os.path.join(
+            os.path.dirname(__file__), "fixtures", "tutorial", "tutorial.xls")
+        self._publish_xls_file_and_set_xform(path)
+
+        for i in ['1', '2', '3', 'no_age']:
+            self._make_submission(os.path.join(
+                'onadata', 'apps', 'api', 'tests', 'fixtures', 'forms',
+                'tutorial', 'instances', '{}.xml'.format(i)))
+
+        stats = get_numeric_field_stats(self.xform, ['age', 'name'])
+        self.assertEqual(stats['age'], {
+            'count': 3, 'min': 23, 'max': 35, 'mean': 27, 'median': 23,
+            'mode': 23})
+        self.assertEqual(stats['name'], {
+            'count': 0, 'min': None, 'max': None, 'mean': None,
+            'median': None, 'mode': None})
+
+    def test_get_numeric_field_stats_skips_out_of_range_answers(self):
+        path = os.path.join(
+            os.path.dirname(__file__), "fixtures", "tutorial", "tutorial.xls")
+        self._publish_xls_file_and_set_xform(path)
+
+        for i in ['1', '2', '3']:
+            self._make_submission(os.path.join(
+                'onadata', 'apps', 'api', 'tests', 'fixtures', 'forms',
+                'tutorial', 'instances', '{}.xml'.format(i)))
+        for instance, name in zip(self.xform.instances.order_by('pk'),
+                                  ['1e400', '-2e-400', '12.5']):
+            instance.json['name'] = name
+            Instance.objects.filter(pk=instance.pk).update(
+                json=instance.json)
+
+        stats = get_numeric_field_stats(self.xform, ['name'])
+        self.assertEqual(stats['name'], {
+            'count': 1, 'min': 12.5, 'max': 12.5, 'mean': 12.5,
+            'median': 12.5, 'mode': 12.5})
@@ -5,11 +5,29 @@ from django.utils import six
 from django.utils.six.moves import StringIO
 from django.utils.encoding import smart_text
 from rest_framework.renderers import BaseRenderer
+from rest_framework.renderers import JSONRenderer
 from rest_framework.renderers import TemplateHTMLRenderer
 from rest_framework.renderers import StaticHTMLRenderer
 from rest_framework_xml.renderers import XMLRenderer
 
 
+class NDJSONRenderer(JSONRenderer):
+    """
+    Newline delimited JSON: one record per line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+        if not isinstance(data, list):
+            data = [data]
+        return b''.join(
+            super(NDJSONRenderer, self).render(record) + b'\n'
+            for record in data)
+
+
 class XLSRenderer(BaseRenderer):
     media_type = 'application/vnd.openxmlformats'
     format = 'xls'
@@ -41,6 +59,12 @@ class SAVZIPRenderer(BaseRenderer):
     charset = None
 
 
+class ParquetZIPRenderer(BaseRenderer):
+    media_type = 'application/octet-stream'
+    format = 'parquetzip'
+    charset = None
+
+
 # TODO add KML, ZIP(attachments) support
 
 
@@ -2,7 +2,7 @@ from django.http import Http404
 from rest_framework import serializers
 
 from onadata.apps.logger.models.xform import XForm
-from onadata.libs.utils.chart_tools import build_chart_data_for_field
+from onadata.libs.utils.chart_tools import build_chart_data_for_fields
 from onadata.libs.utils.common_tags import INSTANCE_ID
 
 
@@ -42,10 +42,9 @@ class FieldsChartSerializer(serializers.ModelSerializer):
                         raise Http404(
                             "Field %s does not not exist on the form" % fields)
 
-            for field in fields:
-                if field.name == INSTANCE_ID:
-                    continue
-                field_data = build_chart_data_for_field(obj, field)
+            fields = [field for field in fields if field.name != INSTANCE_ID]
+            for field, field_data in zip(
+                    fields, build_chart_data_for_fields(obj, fields)):
                 data[field.name] = field_data
 
         return data
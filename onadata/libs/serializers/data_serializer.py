@@ -1,4 +1,5 @@
 import json
+from functools import partial
 
 from django.utils.translation import ugettext as _
 from rest_framework import serializers
@@ -7,6 +8,8 @@ from rest_framework.exceptions import ParseError
 from onadata.apps.logger.models.xform import XForm
 from onadata.apps.viewer.models.parsed_instance import ParsedInstance
 from onadata.apps.api.mongo_helper import MongoHelper
+from onadata.libs.utils.decorators import DecodedCursor
+from onadata.libs.utils.form_schema_cache import get_form_schema
 
 
 class DataSerializer(serializers.HyperlinkedModelSerializer):
@@ -33,6 +36,7 @@ class DataListSerializer(serializers.Serializer):
         }
         limit = query_params.get('limit', False)
         start = query_params.get('start', False)
+        after = query_params.get('after', None)
         count = query_params.get('count', False)
 
         try:
@@ -58,13 +62,22 @@ class DataListSerializer(serializers.Serializer):
             if start:
                 query_kwargs['start'] = int(start)
 
-        cursor = ParsedInstance.query_mongo_minimal(**query_kwargs)
+        if after is not None:
+            query_kwargs['after'] = after
+
+        try:
+            cursor = ParsedInstance.query_mongo_minimal(**query_kwargs)
+        except ValueError as e:
+            raise ParseError(e.__str__())
 
         # if we want the count, we only need the first index of the list.
         if count:
             return cursor[0]
         else:
-            return [MongoHelper.to_readable_dict(record) for record in cursor]
+            # records are read from Mongo as they are rendered
+            readable_keys = get_form_schema(obj).mongo_readable_keys
+            return DecodedCursor(cursor, partial(
+                MongoHelper.to_readable_dict, readable_keys=readable_keys))
 
 
 class DataInstanceSerializer(serializers.Serializer):
@@ -88,7 +101,9 @@ class DataInstanceSerializer(serializers.Serializer):
         records = list(record for record in cursor)
 
         returned_dict = (len(records) and records[0]) or records
-        return MongoHelper.to_readable_dict(returned_dict)
+        return MongoHelper.to_readable_dict(
+            returned_dict,
+            readable_keys=get_form_schema(obj.xform).mongo_readable_keys)
 
 
 class SubmissionSerializer(serializers.Serializer):
@@ -48,9 +48,15 @@ def create_zip_backup(zip_output_file, user, xform=None):
         qs = qs.filter(xform=xform)
 
     num_instances = qs.count()
-    done = 0
     sys.stdout.write("Creating XML Instances\n")
-    for instance in queryset_iterator(qs, 100):
+
+    def progress(done):
+        sys.stdout.write("\r%.2f %% done" % (
+            float(done)/float(num_instances) * 100))
+        sys.stdout.flush()
+
+    for instance in queryset_iterator(qs, 100, only=('xml', 'date_created'),
+                                      progress=progress):
         # get submission time
         date_time_str = instance.date_created.strftime(DATE_FORMAT)
         date_parts = date_time_str.split("-")
@@ -74,10 +80,6 @@ def create_zip_backup(zip_output_file, user, xform=None):
         # create the instance xml
         with codecs.open(full_xml_path, "wb", "utf-8") as f:
             f.write(instance.xml)
-        done += 1
-        sys.stdout.write("\r%.2f %% done" % (
-            float(done)/float(num_instances) * 100))
-        sys.stdout.flush()
         sleep(0)
 
     # write zip file
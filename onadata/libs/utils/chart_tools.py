@@ -1,6 +1,11 @@
 import re
+from hashlib import md5
 
-from onadata.libs.data.query import get_form_submissions_grouped_by_field
+from django.conf import settings
+from django.core.cache import cache
+
+from onadata.libs.data.query import POSTGRES_ALIAS_LENGTH,\
+    get_form_submissions_grouped_by_fields
 from onadata.libs.utils import common_tags
 
 
@@ -20,7 +25,9 @@ DATA_TYPE_MAP = {
 
 CHARTS_PER_PAGE = 20
 
-POSTGRES_ALIAS_LENGTH = 63
+# the cached chart data of a field only goes stale when submissions are
+# edited, which does not change its cache key
+DEFAULT_CHART_CACHE_TIMEOUT = 300
 
 
 timezone_re = re.compile(r'(.+)\+(\d+)')
@@ -51,45 +58,57 @@ def utc_time_string_for_javascript(date_string):
     return "{}+{}".format(date_time, tz)
 
 
-def get_choice_label(choices, string):
-    labels = []
+def get_choice_labels(choices):
+    """Map the name of each of `choices` to its label."""
+    labels = {}
+    for choice in choices:
+        # the first of several choices with the same name wins
+        labels.setdefault(choice['name'], choice['label'])
+    return labels
 
-    if string:
-        for name in string.split(' '):
-            for choice in choices:
-                if choice['name'] == name:
-                    labels.append(choice['label'])
-                    break
 
-    return labels
+def get_choice_label(labels, string):
+    """
+    The labels of the space separated choice names of `string`, `labels`
+    being what `get_choice_labels()` returns.
+    """
+    if not string:
+        return []
 
+    return [labels[name] for name in string.split(' ') if name in labels]
 
-def build_chart_data_for_field(xform, field, language_index=0):
+
+def _get_chart_field(field, language_index):
     # check if its the special _submission_time META
     if isinstance(field, basestring) and field == common_tags.SUBMISSION_TIME:
-        field_label = 'Submission Time'
-        field_xpath = '_submission_time'
-        field_type = 'datetime'
+        return 'Submission Time', '_submission_time', field, 'datetime'
+
+    # TODO: merge choices with results and set 0's on any missing fields,
+    # i.e. they didn't have responses
+
+    # check if label is dict i.e. multilang
+    if isinstance(field.label, dict) and len(field.label.keys()) > 0:
+        languages = field.label.keys()
+        language_index = min(language_index, len(languages) - 1)
+        field_label = field.label[languages[language_index]]
     else:
-        # TODO: merge choices with results and set 0's on any missing fields,
-        # i.e. they didn't have responses
+        field_label = field.label or field.name
 
-        # check if label is dict i.e. multilang
-        if isinstance(field.label, dict) and len(field.label.keys()) > 0:
-            languages = field.label.keys()
-            language_index = min(language_index, len(languages) - 1)
-            field_label = field.label[languages[language_index]]
-        else:
-            field_label = field.label or field.name
+    return field_label, field.get_abbreviated_xpath(), field.name, field.type
 
-        field_xpath = field.get_abbreviated_xpath()
-        field_type = field.type
 
-    data_type = DATA_TYPE_MAP.get(field_type, 'categorized')
-    field_name = field.name if not isinstance(field, basestring) else field
+def _get_chart_cache_key(xform, field_xpath, field_name, language_index):
+    # the form may be replaced with other labels and choices for the same
+    # xpaths, which saves it again
+    key = repr((xform.pk, xform.date_modified, xform.num_of_submissions,
+                xform.last_submission_time, language_index, field_xpath,
+                field_name))
+    return 'chart-%s' % md5(key).hexdigest()
 
-    result = get_form_submissions_grouped_by_field(
-        xform, field_xpath, field_name)
+
+def _build_chart(field, chart_field, result):
+    field_label, field_xpath, field_name, field_type = chart_field
+    data_type = DATA_TYPE_MAP.get(field_type, 'categorized')
 
     # truncate field name to 63 characters to fix #354
     truncated_name = field_name[0:POSTGRES_ALIAS_LENGTH]
@@ -97,9 +116,10 @@ def build_chart_data_for_field(xform, field, language_index=0):
 
     if data_type == 'categorized':
         if result:
+            labels = get_choice_labels(field.children)
             for item in result:
                 item[truncated_name] = get_choice_label(
-                    field.children, item[truncated_name])
+                    labels, item[truncated_name])
 
     # replace truncated field names in the result set with the field name key
     field_name = field_name.encode('utf-8')
@@ -132,6 +152,41 @@ def build_chart_data_for_field(xform, field, language_index=0):
     }
 
 
+def build_chart_data_for_fields(xform, fields, language_index=0):
+    """
+    Returns the chart data of each of `fields`, from the cache for the
+    fields charted since the last submission, the others being counted in
+    a single query.
+    """
+    chart_fields = [_get_chart_field(field, language_index)
+                    for field in fields]
+    keys = [_get_chart_cache_key(xform, field_xpath, field_name,
+                                 language_index)
+            for field_label, field_xpath, field_name, field_type
+            in chart_fields]
+    charts = cache.get_many(keys)
+
+    missing = [(field, chart_field, key)
+               for field, chart_field, key in zip(fields, chart_fields, keys)
+               if key not in charts]
+    if missing:
+        # `(field_xpath, field_name)`s
+        results = get_form_submissions_grouped_by_fields(
+            xform, [chart_field[1:3] for field, chart_field, key in missing])
+        built = dict(
+            (key, _build_chart(field, chart_field, result))
+            for (field, chart_field, key), result in zip(missing, results))
+        cache.set_many(built, getattr(settings, 'CHART_CACHE_TIMEOUT',
+                                      DEFAULT_CHART_CACHE_TIMEOUT))
+        charts.update(built)
+
+    return [charts[key] for key in keys]
+
+
+def build_chart_data_for_field(xform, field, language_index=0):
+    return build_chart_data_for_fields(xform, [field], language_index)[0]
+
+
 def calculate_ranges(page, items_per_page, total_items):
     """Return the offset and end indices for a slice."""
     # offset  cannot be more than total_items
@@ -156,5 +211,4 @@ def build_chart_data(xform, language_index=0, page=0):
     start, end = calculate_ranges(page, CHARTS_PER_PAGE, len(fields))
     fields = fields[start:end]
 
-    return [build_chart_data_for_field(xform, field, language_index)
-            for field in fields]
+    return build_chart_data_for_fields(xform, fields, language_index)
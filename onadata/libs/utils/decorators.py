@@ -1,4 +1,4 @@
-from functools import wraps
+from functools import partial, wraps
 import urlparse
 
 from django.contrib.auth import REDIRECT_FIELD_NAME
@@ -8,6 +8,7 @@ from django.http import HttpResponseRedirect
 from pymongo.cursor import Cursor
 
 from onadata.apps.logger.models import XForm
+from onadata.libs.utils.form_schema_cache import get_form_schema
 
 
 def check_obj(f):
@@ -43,34 +44,56 @@ def is_owner(view_func):
     return _wrapped_view
 
 
+def _get_decoded_record(record, field_names):
+    if isinstance(record, dict):
+        for field in record:
+            if isinstance(record[field], list):
+                record[field] = [_get_decoded_record(item, field_names)
+                                 for item in record[field]]
+            if field not in field_names.values() and \
+                    field in field_names.keys():
+                record[field_names[field]] = record.pop(field)
+    return record
+
+
+class DecodedCursor(object):
+    """
+    Wraps a Mongo cursor and applies `decode` to each record as it is read,
+    so that results are never held in memory all at once.
+
+    Supports `len()` and indexing for callers which treated the results as a
+    list; both send a new query rather than consuming the cursor.
+    """
+
+    def __init__(self, cursor, decode):
+        self.cursor = cursor
+        self.decode = decode
+
+    def __iter__(self):
+        for record in self.cursor:
+            yield self.decode(record)
+
+    def __len__(self):
+        return self.cursor.count(with_limit_and_skip=True)
+
+    def __getitem__(self, index):
+        return self.decode(self.cursor.clone()[index])
+
+
 def apply_form_field_names(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
-        def _get_decoded_record(record):
-            if isinstance(record, dict):
-                for field in record:
-                    if isinstance(record[field], list):
-                        tmp_items = []
-                        items = record[field]
-                        for item in items:
-                            tmp_items.append(_get_decoded_record(item))
-                        record[field] = tmp_items
-                    if field not in field_names.values() and \
-                            field in field_names.keys():
-                        record[field_names[field]] = record.pop(field)
-            return record
-
+        # callers which already have the form can pass it to save a query
+        xform = kwargs.pop('xform', None)
         cursor = func(*args, **kwargs)
         if isinstance(cursor, Cursor) and 'id_string' in kwargs and\
                 'username' in kwargs:
-            username = kwargs.get('username')
-            id_string = kwargs.get('id_string')
-            dd = XForm.objects.get(
-                id_string=id_string, user__username=username)
-            records = []
-            field_names = dd.data_dictionary().get_mongo_field_names_dict()
-            for record in cursor:
-                records.append(_get_decoded_record(record))
-            return records
+            if xform is None:
+                xform = XForm.objects.only('pk', 'date_modified').get(
+                    id_string=kwargs.get('id_string'),
+                    user__username=kwargs.get('username'))
+            field_names = get_form_schema(xform).mongo_field_names
+            return DecodedCursor(
+                cursor, partial(_get_decoded_record, field_names=field_names))
         return cursor
     return wrapper
@@ -1,10 +1,15 @@
 import csv
-from datetime import datetime, date
+from collections import OrderedDict
+from cStringIO import StringIO
+from datetime import datetime, date, timedelta
+import hashlib
 import json
 import os
 import re
+import shutil
 import six
 import tempfile
+from tempfile import SpooledTemporaryFile
 from urlparse import urlparse
 from zipfile import ZipFile
 
@@ -14,7 +19,11 @@ from django.core.files.base import File, ContentFile
 from django.core.files.temp import NamedTemporaryFile
 from django.core.files.storage import get_storage_class
 from django.contrib.auth.models import User
-from django.shortcuts import render_to_response
+from django.contrib.gis.geos import Polygon
+from django.db import connection
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.html import escape
 from django.utils.text import slugify
 from openpyxl.date_time import SharedDate
 from openpyxl.workbook import Workbook
@@ -27,6 +36,9 @@ from onadata.apps.logger.models import Attachment, Instance, XForm
 from onadata.apps.main.models.meta_data import MetaData
 from onadata.apps.viewer.models.export import Export
 from onadata.apps.api.mongo_helper import MongoHelper
+from onadata.libs.utils.model_tools import queryset_iterator
+from onadata.libs.utils.streaming import DEFAULT_STREAMING_CHUNK_SIZE,\
+    ZipStream, chunked, iter_json_array
 from onadata.libs.utils.viewer_tools import create_attachments_zipfile
 from onadata.libs.utils.common_tags import (
     ID, XFORM_ID_STRING, STATUS, ATTACHMENTS, GEOLOCATION, BAMBOO_DATASET_ID,
@@ -45,11 +57,35 @@ QUESTION_TYPES_TO_EXCLUDE = [
 # the bind type of select multiples that we use to compare
 MULTIPLE_SELECT_BIND_TYPE = u"select"
 GEOPOINT_BIND_TYPE = u"geopoint"
+# exports which are built by appending the new submissions to the previous
+# export when possible
+INCREMENTAL_EXPORT_TYPES = [Export.CSV_EXPORT, Export.CSV_ZIP_EXPORT]
+# exports which `generate_streaming_export()` can build
+STREAMING_EXPORT_TYPES = [Export.CSV_EXPORT, Export.CSV_ZIP_EXPORT]
+# bytes of the CSV of a repeat kept in memory while a zipped CSV export is
+# streamed, beyond which it is written to disk
+DEFAULT_EXPORT_SPOOL_MAX_SIZE = 10 * 1024 * 1024
+# exports which `generate_export()` builds, whose results are shared by
+# identical requests, see `get_export_key()`
+CACHED_EXPORT_TYPES = [Export.XLS_EXPORT, Export.GDOC_EXPORT,
+                       Export.CSV_EXPORT, Export.CSV_ZIP_EXPORT,
+                       Export.SAV_ZIP_EXPORT, Export.PARQUET_ZIP_EXPORT,
+                       Export.ANALYSER_EXPORT]
+# seconds after which a pending export is no longer waited for
+DEFAULT_EXPORT_PENDING_TIMEOUT = 60 * 60
+# instances read from the database at a time by the KML and GeoJSON exports
+DEFAULT_GEO_EXPORT_CHUNK_SIZE = 1000
+# rows of a section written to its Parquet file at a time
+DEFAULT_PARQUET_ROW_GROUP_SIZE = 10000
+# UTC offset ending an xsd:dateTime, e.g. `+03`, `-05:30` or `Z`
+UTC_OFFSET_REGEX = re.compile(r'^(?:\.\d+)?(?:(Z)|([+-])(\d\d):?(\d\d)?)?$')
 
 
 def encode_if_str(row, key, encode_dates=False):
-    val = row.get(key)
+    return encode_value(row.get(key), encode_dates)
 
+
+def encode_value(val, encode_dates=False):
     if isinstance(val, six.string_types):
         return val.encode('utf-8')
 
@@ -62,6 +98,58 @@ def encode_if_str(row, key, encode_dates=False):
     return val
 
 
+def _parquet_int(value):
+    if isinstance(value, (int, long)) and not isinstance(value, bool):
+        return value
+
+
+def _parquet_float(value):
+    if isinstance(value, (int, long, float)) and not isinstance(value, bool):
+        return float(value)
+
+
+def _parquet_bool(value):
+    if isinstance(value, bool):
+        return value
+
+
+def _parquet_date(value):
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    # dates Excel cannot store are left as strings by `convert_type()`
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _parquet_datetime(value):
+    """
+    Returns the UTC time of an xsd:dateTime, e.g. `2013-07-03T15:24:00.000+03`.
+    A time without an offset is taken to be UTC, as `_submission_time` is.
+    """
+    try:
+        timestamp = datetime.strptime(value[:19], '%Y-%m-%dT%H:%M:%S')
+    except (TypeError, ValueError):
+        return None
+    match = UTC_OFFSET_REGEX.match(value[19:])
+    if match is None:
+        return None
+    utc, sign, hours, minutes = match.groups()
+    if sign:
+        offset = timedelta(hours=int(hours), minutes=int(minutes or 0))
+        timestamp = timestamp - offset if sign == '+' else timestamp + offset
+    return timestamp
+
+
+def _parquet_string(value):
+    if value is None or isinstance(value, unicode):
+        return value
+    if isinstance(value, str):
+        return value.decode('utf-8')
+    return unicode(value)
+
+
 def question_types_to_exclude(_type):
     return _type in QUESTION_TYPES_TO_EXCLUDE
 
@@ -169,6 +257,78 @@ def dict_to_joined_export(data, index, indices, name):
     return output
 
 
+class SectionRowPlan(object):
+    """
+    How to read each column of an export section from a row of
+    `dict_to_joined_export()`, worked out once per section so that a row is
+    turned into the tuple of its column values, in `fields` order, without
+    looking at the survey again.
+    """
+
+    def __init__(self, fields, encoded_fields, select_multiples, gps_fields,
+                 converters, binary_select_multiples):
+        self.fields = tuple(fields)
+        positions = {}
+        for i, field in enumerate(self.fields):
+            positions.setdefault(field, i)
+        # the key each column is read from first: Mongo encoded names for
+        # the fields which have one
+        self.keys = tuple(encoded_fields.get(field, field)
+                          for field in self.fields)
+        self.encoded_columns = tuple(
+            (positions[xpath], xpath) for xpath in encoded_fields
+            if xpath in positions)
+        # (column of the question, ((column, choice name), ...))
+        self.select_multiples = tuple(
+            (positions[xpath], tuple(
+                (positions[choice], choice[len(xpath) + 1:])
+                for choice in choices if choice in positions))
+            for xpath, choices in select_multiples.iteritems()
+            if xpath in positions)
+        # (column of the question, (column of each component, ...))
+        self.gps_fields = tuple(
+            (positions[xpath], tuple(positions[component]
+                                     for component in components))
+            for xpath, components in gps_fields.iteritems()
+            if xpath in positions)
+        self.converters = tuple(
+            (positions[xpath], func) for xpath, func in converters)
+        self.binary_select_multiples = binary_select_multiples
+
+    def get_values(self, row):
+        values = map(row.get, self.keys)
+
+        for i, xpath in self.encoded_columns:
+            if not values[i]:
+                values[i] = row.get(xpath)
+
+        for i, choices in self.select_multiples:
+            data = values[i]
+            selections = frozenset(data.split()) if data else None
+            if self.binary_select_multiples:
+                for j, name in choices:
+                    values[j] = 1 if selections and name in selections else 0
+            else:
+                for j, name in choices:
+                    values[j] = name in selections if selections else None
+
+        for i, columns in self.gps_fields:
+            data = values[i]
+            if data:
+                for j, part in zip(columns, data.split()):
+                    values[j] = part
+
+        for i, func in self.converters:
+            value = values[i]
+            if value is not None and value != '':
+                try:
+                    values[i] = func(value)
+                except ValueError:
+                    pass
+
+        return tuple(values)
+
+
 class ExportBuilder(object):
     IGNORED_COLUMNS = [XFORM_ID_STRING, STATUS, ATTACHMENTS, GEOLOCATION,
                        BAMBOO_DATASET_ID, DELETEDAT]
@@ -193,9 +353,37 @@ class ExportBuilder(object):
 
     XLS_SHEET_NAME_MAX_CHARS = 31
 
+    # Parquet column type, given the `pyarrow` module, and conversion of the
+    # values of each question type, of `EXTRA_FIELDS` and of the columns of
+    # select multiple choices, strings otherwise, see `get_parquet_columns()`
+    PARQUET_TYPES = {
+        'int': (lambda pyarrow: pyarrow.int64(), _parquet_int),
+        'decimal': (lambda pyarrow: pyarrow.float64(), _parquet_float),
+        'date': (lambda pyarrow: pyarrow.date32(), _parquet_date),
+        'dateTime': (lambda pyarrow: pyarrow.timestamp('ms', tz='UTC'),
+                     _parquet_datetime),
+    }
+    PARQUET_EXTRA_FIELD_TYPES = {
+        ID: 'int',
+        INDEX: 'int',
+        PARENT_INDEX: 'int',
+        SUBMISSION_TIME: 'dateTime',
+    }
+    PARQUET_CHOICE_TYPE = (lambda pyarrow: pyarrow.bool_(), _parquet_bool)
+    PARQUET_BINARY_CHOICE_TYPE = (lambda pyarrow: pyarrow.int8(),
+                                  _parquet_int)
+    PARQUET_STRING_TYPE = (lambda pyarrow: pyarrow.string(), _parquet_string)
+
     @classmethod
     def string_to_date_with_xls_validation(cls, date_str):
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
+        if len(date_str) == 10 and date_str[4] == date_str[7] == '-' and\
+                date_str[:4].isdigit() and date_str[5:7].isdigit() and\
+                date_str[8:].isdigit():
+            # the usual YYYY-MM-DD, without the cost of `strptime()`
+            date_obj = date(int(date_str[:4]), int(date_str[5:7]),
+                            int(date_str[8:]))
+        else:
+            date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
         try:
             SharedDate().datetime_to_julian(date_obj)
         except ValueError:
@@ -312,6 +500,27 @@ class ExportBuilder(object):
             main_section, self.survey, self.sections,
             self.select_multiples, self.gps_fields, self.encoded_fields,
             self.GROUP_DELIMITER)
+        self.row_plans = dict(
+            (section['name'], self.get_row_plan(section))
+            for section in self.sections)
+
+    def get_row_plan(self, section):
+        section_name = section['name']
+        converters = []
+        converted = set()
+        for element in section['elements']:
+            if element['type'] in ExportBuilder.TYPES_TO_CONVERT and\
+                    element['xpath'] not in converted:
+                converted.add(element['xpath'])
+                converters.append((element['xpath'], ExportBuilder.
+                                   CONVERT_FUNCS[element['type']]))
+        select_multiples = self.select_multiples.get(section_name, {})\
+            if self.SPLIT_SELECT_MULTIPLES else {}
+        return SectionRowPlan(
+            self.get_fields(section),
+            self.encoded_fields.get(section_name, {}), select_multiples,
+            self.gps_fields.get(section_name, {}), converters,
+            self.BINARY_SELECT_MULTIPLES)
 
     def section_by_name(self, name):
         matches = filter(lambda s: s['name'] == name, self.sections)
@@ -382,56 +591,28 @@ class ExportBuilder(object):
         """
         Split select multiples, gps and decode . and $
         """
-        section_name = section['name']
-
-        # first decode fields so that subsequent lookups
-        # have decoded field names
-        if section_name in self.encoded_fields:
-            row = ExportBuilder.decode_mongo_encoded_fields(
-                row, self.encoded_fields[section_name])
-
-        if self.SPLIT_SELECT_MULTIPLES and\
-                section_name in self.select_multiples:
-            row = ExportBuilder.split_select_multiples(
-                row, self.select_multiples[section_name])
-
-        if section_name in self.gps_fields:
-            row = ExportBuilder.split_gps_components(
-                row, self.gps_fields[section_name])
-
-        # convert to native types
-        for elm in section['elements']:
-            # only convert if its in our list and its not empty, just to
-            # optimize
-            value = row.get(elm['xpath'])
-            if elm['type'] in ExportBuilder.TYPES_TO_CONVERT\
-                    and value is not None and value != '':
-                row[elm['xpath']] = ExportBuilder.convert_type(
-                    value, elm['type'])
-
+        plan = self.row_plans[section['name']]
+        row.update(zip(plan.fields, plan.get_values(row)))
         return row
 
-    def to_zipped_csv(self, path, data, *args):
-        def write_row(row, csv_writer, fields):
-            csv_writer.writerow(
-                [encode_if_str(row, field) for field in fields])
-
-        csv_defs = {}
-        for section in self.sections:
-            csv_file = NamedTemporaryFile(suffix=".csv")
-            csv_writer = csv.writer(csv_file)
-            csv_defs[section['name']] = {
-                'csv_file': csv_file, 'csv_writer': csv_writer}
+    def get_row_values(self, row, section):
+        """
+        Returns the values of the columns of `section`, see `get_fields()`,
+        for `row`, with select multiples and gps split, . and $ decoded and
+        types converted.
+        """
+        return self.row_plans[section['name']].get_values(row)
 
-        # write headers
-        for section in self.sections:
-            fields = [element['title'] for element in section['elements']]\
-                + self.EXTRA_FIELDS
-            csv_defs[section['name']]['csv_writer'].writerow(
-                [f.encode('utf-8') for f in fields])
+    def iter_section_rows(self, data, index=1, indices=None):
+        """
+        Yields `(section, values)` for each row of each section of the
+        records of `data`, in order, ready to be written: `values` are those
+        of the columns of the section, see `get_row_values()`.
 
-        index = 1
-        indices = {}
+        :param index: `_index` of the first record
+        :param indices: `_index` of the last row of each repeat, by Mongo key
+        """
+        indices = {} if indices is None else indices
         survey_name = self.survey.name
         for d in data:
             # decode mongo section names
@@ -446,27 +627,51 @@ class ExportBuilder(object):
             output[survey_name][INDEX] = index
             output[survey_name][PARENT_INDEX] = -1
             for section in self.sections:
-                # get data for this section and write to csv
-                section_name = section['name']
-                csv_def = csv_defs[section_name]
-                fields = [
-                    element['xpath'] for element in
-                    section['elements']] + self.EXTRA_FIELDS
-                csv_writer = csv_def['csv_writer']
                 # section name might not exist within the output, e.g. data was
                 # not provided for said repeat - write test to check this
-                row = output.get(section_name, None)
+                row = output.get(section['name'], None)
                 if type(row) == dict:
-                    write_row(
-                        self.pre_process_row(row, section),
-                        csv_writer, fields)
+                    yield section, self.get_row_values(row, section)
                 elif type(row) == list:
                     for child_row in row:
-                        write_row(
-                            self.pre_process_row(child_row, section),
-                            csv_writer, fields)
+                        yield section, self.get_row_values(child_row, section)
             index += 1
 
+    def get_fields(self, section):
+        return [element['xpath'] for element in section['elements']] + \
+            self.EXTRA_FIELDS
+
+    def get_headers(self, section):
+        return [element['title'] for element in section['elements']] + \
+            self.EXTRA_FIELDS
+
+    def to_zipped_csv(self, path, data, *args):
+        self.write_zipped_csv(path, self.iter_section_rows(data))
+
+    def write_zipped_csv(self, path, section_rows):
+        """
+        Writes the `(section, values)`s of `section_rows`, see
+        `iter_section_rows()`, to a ZIP of one CSV per section at `path`.
+        """
+        def write_row(values, csv_writer):
+            csv_writer.writerow([encode_value(value) for value in values])
+
+        csv_defs = {}
+        for section in self.sections:
+            csv_file = NamedTemporaryFile(suffix=".csv")
+            csv_writer = csv.writer(csv_file)
+            csv_defs[section['name']] = {
+                'csv_file': csv_file, 'csv_writer': csv_writer}
+
+        # write headers
+        for section in self.sections:
+            csv_defs[section['name']]['csv_writer'].writerow(
+                [f.encode('utf-8') for f in self.get_headers(section)])
+
+        for section, row in section_rows:
+            csv_def = csv_defs[section['name']]
+            write_row(row, csv_def['csv_writer'])
+
         # write zipfile
         with ZipFile(path, 'w') as zip_file:
             for section_name, csv_def in csv_defs.iteritems():
@@ -479,6 +684,109 @@ class ExportBuilder(object):
         for section_name, csv_def in csv_defs.iteritems():
             csv_def['csv_file'].close()
 
+    def append_zipped_csv(self, path, data, previous_path):
+        """
+        Writes the archive `to_zipped_csv()` would write with the records of
+        the archive at `previous_path` followed by those of `data`: the rows
+        already in the former are copied rather than built again, and the
+        `_index` numbering of each section carries on from them.
+        """
+        def write_row(values, csv_writer):
+            csv_writer.writerow([encode_value(value) for value in values])
+
+        main_section_name = self.sections[0]['name']
+        index = 1
+        indices = {}
+        csv_defs = {}
+        with ZipFile(previous_path) as previous_zip:
+            previous_names = previous_zip.namelist()
+            for section in self.sections:
+                section_name = section['name']
+                csv_file = NamedTemporaryFile(suffix=".csv")
+                name = "_".join(section_name.split("/")) + ".csv"
+                row_count = 0
+                if name in previous_names:
+                    with previous_zip.open(name) as previous_file:
+                        shutil.copyfileobj(previous_file, csv_file)
+                    csv_file.seek(0)
+                    # rows may span several lines, count them as CSV
+                    row_count = sum(1 for row in csv.reader(csv_file)) - 1
+                    csv_file.seek(0, os.SEEK_END)
+                    csv_writer = csv.writer(csv_file)
+                else:
+                    csv_writer = csv.writer(csv_file)
+                    csv_writer.writerow(
+                        [f.encode('utf-8') for f in self.get_headers(section)])
+                if section_name == main_section_name:
+                    index = row_count + 1
+                else:
+                    indices[MongoHelper.encode(section_name)] = row_count
+                csv_defs[section_name] = {
+                    'csv_file': csv_file, 'csv_writer': csv_writer}
+
+        for section, row in self.iter_section_rows(data, index, indices):
+            csv_def = csv_defs[section['name']]
+            write_row(row, csv_def['csv_writer'])
+
+        with ZipFile(path, 'w') as zip_file:
+            for section_name, csv_def in csv_defs.iteritems():
+                csv_file = csv_def['csv_file']
+                csv_file.flush()
+                zip_file.write(
+                    csv_file.name, "_".join(section_name.split("/")) + ".csv")
+                csv_file.close()
+
+    def iter_zipped_csv(self, data):
+        """
+        Yields the archive `to_zipped_csv()` writes, as it is built from
+        `data`: the CSV of the main section is sent while the records are
+        read and those of the repeats, spooled meanwhile, follow it.
+        """
+        chunk_size = getattr(settings, 'STREAMING_CHUNK_SIZE',
+                             DEFAULT_STREAMING_CHUNK_SIZE)
+        spool_size = getattr(settings, 'EXPORT_SPOOL_MAX_SIZE',
+                             DEFAULT_EXPORT_SPOOL_MAX_SIZE)
+        main_section_name = self.sections[0]['name']
+        csv_defs = OrderedDict()
+        for section in self.sections:
+            if section['name'] == main_section_name:
+                csv_file = StringIO()
+            else:
+                csv_file = SpooledTemporaryFile(max_size=spool_size)
+            csv_writer = csv.writer(csv_file)
+            csv_writer.writerow(
+                [f.encode('utf-8') for f in self.get_headers(section)])
+            csv_defs[section['name']] = {
+                'csv_file': csv_file, 'csv_writer': csv_writer}
+        main_file = csv_defs[main_section_name]['csv_file']
+
+        def iter_main_section():
+            for section, row in self.iter_section_rows(data):
+                csv_def = csv_defs[section['name']]
+                csv_def['csv_writer'].writerow(
+                    [encode_value(value) for value in row])
+                if main_file.tell() >= chunk_size:
+                    yield main_file.getvalue()
+                    main_file.seek(0)
+                    main_file.truncate()
+            yield main_file.getvalue()
+
+        def iter_file(csv_file):
+            csv_file.seek(0)
+            for chunk in iter(lambda: csv_file.read(chunk_size), ''):
+                yield chunk
+            csv_file.close()
+
+        zip_stream = ZipStream()
+        for section_name, csv_def in csv_defs.iteritems():
+            chunks = iter_main_section() if section_name == main_section_name\
+                else iter_file(csv_def['csv_file'])
+            for zip_data in zip_stream.add(
+                    "_".join(section_name.split("/")) + ".csv", chunks):
+                yield zip_data
+        for zip_data in zip_stream.close():
+            yield zip_data
+
     @classmethod
     def get_valid_sheet_name(cls, desired_name, existing_names):
         # a sheet name has to be <= 31 characters and not a duplicate of an
@@ -502,11 +810,21 @@ class ExportBuilder(object):
         return generated_name
 
     def to_xls_export(self, path, data, *args):
-        def write_row(data, work_sheet, fields, work_sheet_titles):
+        self.write_xls_export(path, self.iter_section_rows(data))
+
+    def write_xls_export(self, path, section_rows):
+        """
+        Writes the `(section, values)`s of `section_rows`, see
+        `iter_section_rows()`, to a workbook of one sheet per section at
+        `path`.
+        """
+        def write_row(values, work_sheet, parent_table_column,
+                      work_sheet_titles):
             # update parent_table with the generated sheet's title
-            data[PARENT_TABLE_NAME] = work_sheet_titles.get(
-                data.get(PARENT_TABLE_NAME))
-            work_sheet.append([data.get(f) for f in fields])
+            values = list(values)
+            values[parent_table_column] = work_sheet_titles.get(
+                values[parent_table_column])
+            work_sheet.append(values)
 
         wb = Workbook(optimized_write=True)
         work_sheets = {}
@@ -521,50 +839,19 @@ class ExportBuilder(object):
                 title=work_sheet_title)
 
         # write the headers
+        parent_table_columns = {}
         for section in self.sections:
             section_name = section['name']
-            headers = [
-                element['title'] for element in
-                section['elements']] + self.EXTRA_FIELDS
+            parent_table_columns[section_name] = self.get_fields(
+                section).index(PARENT_TABLE_NAME)
             # get the worksheet
             ws = work_sheets[section_name]
-            ws.append(headers)
-
-        index = 1
-        indices = {}
-        survey_name = self.survey.name
-        for d in data:
-            joined_export = dict_to_joined_export(d, index, indices,
-                                                  survey_name)
-            output = ExportBuilder.decode_mongo_encoded_section_names(
-                joined_export)
-            # attach meta fields (index, parent_index, parent_table)
-            # output has keys for every section
-            if survey_name not in output:
-                output[survey_name] = {}
-            output[survey_name][INDEX] = index
-            output[survey_name][PARENT_INDEX] = -1
-            for section in self.sections:
-                # get data for this section and write to xls
-                section_name = section['name']
-                fields = [
-                    element['xpath'] for element in
-                    section['elements']] + self.EXTRA_FIELDS
+            ws.append(self.get_headers(section))
 
-                ws = work_sheets[section_name]
-                # section might not exist within the output, e.g. data was
-                # not provided for said repeat - write test to check this
-                row = output.get(section_name, None)
-                if type(row) == dict:
-                    write_row(
-                        self.pre_process_row(row, section),
-                        ws, fields, work_sheet_titles)
-                elif type(row) == list:
-                    for child_row in row:
-                        write_row(
-                            self.pre_process_row(child_row, section),
-                            ws, fields, work_sheet_titles)
-            index += 1
+        for section, row in section_rows:
+            section_name = section['name']
+            write_row(row, work_sheets[section_name],
+                      parent_table_columns[section_name], work_sheet_titles)
 
         wb.save(filename=path)
 
@@ -603,9 +890,17 @@ class ExportBuilder(object):
         csv_builder.export_to(path)
 
     def to_zipped_sav(self, path, data, *args):
-        def write_row(row, csv_writer, fields):
+        self.write_zipped_sav(path, self.iter_section_rows(data))
+
+    def write_zipped_sav(self, path, section_rows):
+        """
+        Writes the `(section, values)`s of `section_rows`, see
+        `iter_section_rows()`, to a ZIP of one SAV file per section at
+        `path`.
+        """
+        def write_row(values, sav_writer):
             sav_writer.writerow(
-                [encode_if_str(row, field, True) for field in fields])
+                [encode_value(value, True) for value in values])
 
         sav_defs = {}
 
@@ -639,40 +934,9 @@ class ExportBuilder(object):
             sav_defs[section['name']] = {
                 'sav_file': sav_file, 'sav_writer': sav_writer}
 
-        index = 1
-        indices = {}
-        survey_name = self.survey.name
-        for d in data:
-            # decode mongo section names
-            joined_export = dict_to_joined_export(d, index, indices,
-                                                  survey_name)
-            output = ExportBuilder.decode_mongo_encoded_section_names(
-                joined_export)
-            # attach meta fields (index, parent_index, parent_table)
-            # output has keys for every section
-            if survey_name not in output:
-                output[survey_name] = {}
-            output[survey_name][INDEX] = index
-            output[survey_name][PARENT_INDEX] = -1
-            for section in self.sections:
-                # get data for this section and write to csv
-                section_name = section['name']
-                sav_def = sav_defs[section_name]
-                fields = [
-                    element['xpath'] for element in
-                    section['elements']] + self.EXTRA_FIELDS
-                sav_writer = sav_def['sav_writer']
-                row = output.get(section_name, None)
-                if type(row) == dict:
-                    write_row(
-                        self.pre_process_row(row, section),
-                        sav_writer, fields)
-                elif type(row) == list:
-                    for child_row in row:
-                        write_row(
-                            self.pre_process_row(child_row, section),
-                            sav_writer, fields)
-            index += 1
+        for section, row in section_rows:
+            sav_def = sav_defs[section['name']]
+            write_row(row, sav_def['sav_writer'])
 
         for section_name, sav_def in sav_defs.iteritems():
             sav_def['sav_writer'].closeSavFile(
@@ -690,11 +954,121 @@ class ExportBuilder(object):
         for section_name, sav_def in sav_defs.iteritems():
             sav_def['sav_file'].close()
 
+    def get_parquet_columns(self, section):
+        """
+        Returns the Parquet schema of the file of `section` and the function
+        converting the values of each of its columns. Values which do not
+        fit the type of their column, e.g. an integer answer which is not a
+        number, are written as nulls.
+        """
+        # only loaded by the processes which make Parquet exports
+        import pyarrow
+
+        choices = set()
+        if self.SPLIT_SELECT_MULTIPLES:
+            for xpaths in self.select_multiples.get(
+                    section['name'], {}).values():
+                choices.update(xpaths)
+        choice_type = self.PARQUET_BINARY_CHOICE_TYPE\
+            if self.BINARY_SELECT_MULTIPLES else self.PARQUET_CHOICE_TYPE
+
+        column_types = []
+        for element in section['elements']:
+            if element['xpath'] in choices:
+                column_types.append(choice_type)
+            else:
+                column_types.append(self.PARQUET_TYPES.get(
+                    element['type'], self.PARQUET_STRING_TYPE))
+        for field in self.EXTRA_FIELDS:
+            column_types.append(self.PARQUET_TYPES.get(
+                self.PARQUET_EXTRA_FIELD_TYPES.get(field),
+                self.PARQUET_STRING_TYPE))
+
+        schema = pyarrow.schema([
+            pyarrow.field(header, column_type(pyarrow))
+            for header, (column_type, convert) in zip(
+                self.get_headers(section), column_types)])
+        return schema, [convert for column_type, convert in column_types]
+
+    def to_zipped_parquet(self, path, data, *args):
+        self.write_zipped_parquet(path, self.iter_section_rows(data))
+
+    def write_zipped_parquet(self, path, section_rows):
+        """
+        Writes the `(section, values)`s of `section_rows`, see
+        `iter_section_rows()`, to a ZIP of one Parquet file per section at
+        `path`, with typed columns, see `get_parquet_columns()`. The rows
+        of each section are written by row groups of
+        `PARQUET_ROW_GROUP_SIZE`, so that only one group per section is in
+        memory.
+        """
+        # only loaded by the processes which make Parquet exports
+        import pyarrow
+        import pyarrow.parquet
+
+        row_group_size = getattr(settings, 'PARQUET_ROW_GROUP_SIZE',
+                                 DEFAULT_PARQUET_ROW_GROUP_SIZE)
+
+        def write_row_group(parquet_def):
+            rows = parquet_def['rows']
+            if not rows:
+                return
+            arrays = [
+                pyarrow.array([convert(value) for value in column],
+                              type=field.type)
+                for column, convert, field in zip(
+                    zip(*rows), parquet_def['converters'],
+                    parquet_def['schema'])]
+            parquet_def['writer'].write_table(pyarrow.Table.from_arrays(
+                arrays, names=parquet_def['schema'].names))
+            del rows[:]
+
+        parquet_defs = {}
+        for section in self.sections:
+            parquet_file = NamedTemporaryFile(suffix=".parquet")
+            schema, converters = self.get_parquet_columns(section)
+            parquet_defs[section['name']] = {
+                'parquet_file': parquet_file, 'schema': schema,
+                'converters': converters, 'rows': [],
+                'writer': pyarrow.parquet.ParquetWriter(
+                    parquet_file.name, schema)}
+
+        for section, row in section_rows:
+            parquet_def = parquet_defs[section['name']]
+            parquet_def['rows'].append(row)
+            if len(parquet_def['rows']) >= row_group_size:
+                write_row_group(parquet_def)
+
+        for parquet_def in parquet_defs.values():
+            write_row_group(parquet_def)
+            parquet_def['writer'].close()
+
+        # write zipfile
+        with ZipFile(path, 'w') as zip_file:
+            for section_name, parquet_def in parquet_defs.iteritems():
+                zip_file.write(
+                    parquet_def['parquet_file'].name,
+                    "_".join(section_name.split("/")) + ".parquet")
+
+        # close files when we are done
+        for parquet_def in parquet_defs.values():
+            parquet_def['parquet_file'].close()
+
 
 def dict_to_flat_export(d, parent_index=0):
     pass
 
 
+def get_export_builder(xform, group_delimiter='/', split_select_multiples=True,
+                       binary_select_multiples=False):
+    export_builder = ExportBuilder()
+    export_builder.GROUP_DELIMITER = group_delimiter
+    export_builder.SPLIT_SELECT_MULTIPLES = split_select_multiples
+    export_builder.BINARY_SELECT_MULTIPLES = binary_select_multiples
+    export_builder.set_survey(xform.data_dictionary().survey)
+    return export_builder
+
+
 def generate_export(export_type, extension, username, id_string,
                     export_id=None, filter_query=None, group_delimiter='/',
                     split_select_multiples=True,
@@ -708,29 +1082,42 @@ def generate_export(export_type, extension, username, id_string,
         Export.CSV_EXPORT: 'to_flat_csv_export',
         Export.CSV_ZIP_EXPORT: 'to_zipped_csv',
         Export.SAV_ZIP_EXPORT: 'to_zipped_sav',
+        Export.PARQUET_ZIP_EXPORT: 'to_zipped_parquet',
         Export.ANALYSER_EXPORT: 'to_analyser_export'
     }
 
     xform = XForm.objects.get(
         user__username__iexact=username, id_string__exact=id_string)
+    # read first: whatever is modified afterwards is newer than the export
+    export_key = get_export_key(
+        xform, export_type, filter_query, group_delimiter,
+        split_select_multiples, binary_select_multiples, extension)
 
-    # query mongo for the cursor
-    records = query_mongo(username, id_string, filter_query)
-
-    export_builder = ExportBuilder()
-    export_builder.GROUP_DELIMITER = group_delimiter
-    export_builder.SPLIT_SELECT_MULTIPLES = split_select_multiples
-    export_builder.BINARY_SELECT_MULTIPLES = binary_select_multiples
-    export_builder.set_survey(xform.data_dictionary().survey)
+    export_builder = get_export_builder(
+        xform, group_delimiter, split_select_multiples,
+        binary_select_multiples)
 
     prefix = slugify('{}_export__{}__{}'.format(export_type, username, id_string))
     temp_file = NamedTemporaryFile(prefix=prefix, suffix=("." + extension))
 
-    # get the export function by export type
-    func = getattr(export_builder, export_type_func_map[export_type])
+    high_water_mark = None
+    if filter_query is None and export_type in INCREMENTAL_EXPORT_TYPES:
+        options_key = get_export_options_key(
+            group_delimiter, split_select_multiples, binary_select_multiples)
+        high_water_mark = _generate_incremental_export(
+            export_builder, export_type, xform, temp_file, options_key)
 
-    func.__call__(
-        temp_file.name, records, username, id_string, filter_query)
+    if high_water_mark is None and not _generate_parallel_export(
+            export_builder, export_type, temp_file.name, xform,
+            filter_query):
+        # query mongo for the cursor
+        records = query_mongo(username, id_string, filter_query)
+
+        # get the export function by export type
+        func = getattr(export_builder, export_type_func_map[export_type])
+
+        func.__call__(
+            temp_file.name, records, username, id_string, filter_query)
 
     # generate filename
     basename = "%s_%s" % (
@@ -770,13 +1157,289 @@ def generate_export(export_type, extension, username, id_string,
     export.filedir = dir_name
     export.filename = basename
     export.internal_status = Export.SUCCESSFUL
-    # dont persist exports that have a filter
-    if filter_query is None:
-        export.save()
+    export.export_key = export_key
+    # filtered exports are kept for identical requests, see
+    # `get_cached_export()`, but never taken for the latest export
+    export.filtered = filter_query is not None
+    if high_water_mark is not None:
+        (export.time_of_last_submission, export.last_instance_id,
+         export.instance_count, export.options_key) = high_water_mark
+    export.save()
     return export
 
 
-def query_mongo(username, id_string, query=None, hide_deleted=True):
+def get_export_key(xform, export_type, query=None, group_delimiter='/',
+                   split_select_multiples=True,
+                   binary_select_multiples=False, extension=None):
+    """
+    Returns a hash of the parameters of an export of `xform` and of the
+    state of its submissions: identical requests get the same key until a
+    submission is added, edited or deleted, or the form is replaced.
+
+    `extension` tells apart the exports of the same type built as different
+    files, e.g. `xls` and `xlsx`.
+    """
+    if query:
+        try:
+            query = json.dumps(json.loads(query), sort_keys=True)
+        except ValueError:
+            pass
+    key = [export_type, extension or None, query or None,
+           get_export_options_key(group_delimiter, split_select_multiples,
+                                  binary_select_multiples),
+           xform.num_of_submissions, xform.date_modified,
+           # deleting a submission also updates its date_modified
+           xform.time_of_last_submission_update()]
+    return hashlib.sha1(json.dumps(key, default=unicode)).hexdigest()
+
+
+def get_export_extension(export_type, force_xlsx=True):
+    """The extension of the file of an export of `export_type`."""
+    if export_type in [Export.XLS_EXPORT, Export.GDOC_EXPORT]:
+        return 'xlsx' if force_xlsx else 'xls'
+    if export_type == Export.ANALYSER_EXPORT:
+        return 'xlsx'
+    if export_type in [Export.CSV_ZIP_EXPORT, Export.SAV_ZIP_EXPORT,
+                       Export.PARQUET_ZIP_EXPORT, Export.ZIP_EXPORT]:
+        return 'zip'
+    return export_type
+
+
+def lock_export_key(export_key):
+    """
+    Waits for, and holds until the end of the current transaction, a lock on
+    `export_key`, so that only one of the identical requests made at once
+    starts the export.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_xact_lock(%s)',
+                       [int(export_key[:15], 16)])
+
+
+def get_cached_export(xform, export_type, export_key, extension=None,
+                      pending=False):
+    """
+    Returns the latest successful export of `xform` built with `export_key`
+    and, if given, `extension`, as long as its file exists, or None.
+
+    With `pending`, an export which is still being built is returned too,
+    unless it was started more than `EXPORT_PENDING_TIMEOUT` seconds ago.
+    """
+    exports = Export.objects.filter(
+        xform=xform, export_type=export_type, export_key=export_key)
+    if pending:
+        timeout = getattr(settings, 'EXPORT_PENDING_TIMEOUT',
+                          DEFAULT_EXPORT_PENDING_TIMEOUT)
+        exports = exports.exclude(internal_status=Export.FAILED).exclude(
+            filename=None,
+            created_on__lt=timezone.now() - timedelta(seconds=timeout))
+    else:
+        exports = exports.exclude(filename=None)
+    try:
+        export = exports.latest('created_on')
+    except Export.DoesNotExist:
+        return None
+
+    if export.filename is None:
+        return export
+    if extension and not export.filename.endswith('.' + extension):
+        return None
+    storage = get_storage_class()()
+    if not storage.exists(export.filepath):
+        return None
+    return export
+
+
+def get_export_options_key(group_delimiter, split_select_multiples,
+                           binary_select_multiples):
+    return u'%s|%d|%d' % (group_delimiter, split_select_multiples,
+                          binary_select_multiples)
+
+
+def get_incremental_base(xform, export_type, options_key):
+    """
+    Returns the latest export of `xform` which a new one can be built upon
+    by appending the submissions received since, or None when it has to be
+    rebuilt: the exported submissions were edited or deleted meanwhile, or
+    it was built with other options.
+    """
+    if not getattr(settings, 'INCREMENTAL_EXPORTS_ENABLED', True):
+        return None
+    try:
+        previous = Export.objects.filter(
+            xform=xform, export_type=export_type,
+            internal_status=Export.SUCCESSFUL, options_key=options_key,
+            last_instance_id__isnull=False).exclude(
+            filename=None).latest('created_on')
+    except Export.DoesNotExist:
+        return None
+
+    exported = xform.instances.filter(pk__lte=previous.last_instance_id)
+    # deleting a submission also updates its date_modified
+    if exported.filter(
+            date_modified__gt=previous.time_of_last_submission).exists():
+        return None
+    # hard deletions, and submissions which reached Mongo late
+    if exported.filter(deleted_at__isnull=True).count() != \
+            previous.instance_count:
+        return None
+
+    storage = get_storage_class()()
+    if not storage.exists(previous.filepath):
+        return None
+    return previous
+
+
+def _generate_incremental_export(export_builder, export_type, xform,
+                                 temp_file, options_key):
+    """
+    Writes an export of all the submissions of `xform` to `temp_file`, only
+    appending those received since the latest export when it can, and
+    returns its high-water mark: `(time_of_last_submission,
+    last_instance_id, instance_count, options_key)`.
+
+    The submissions received while it runs are left to the next export, so
+    that none is exported twice. Returns None when there is nothing to
+    export, to let the full export report it.
+    """
+    username = xform.user.username
+    id_string = xform.id_string
+    # read first: whatever is modified afterwards is newer than the export
+    time_of_last_submission = xform.time_of_last_submission_update()
+    last_instance_id = xform.instances.aggregate(
+        last_instance_id=Max('pk'))['last_instance_id']
+    if last_instance_id is None:
+        return None
+
+    previous = get_incremental_base(xform, export_type, options_key)
+    bounds = {'$lte': last_instance_id}
+    if previous is not None:
+        bounds['$gt'] = previous.last_instance_id
+    query = json.dumps({ID: bounds})
+    count = query_mongo(username, id_string, query).count()
+
+    appended = False
+    if previous is not None:
+        previous_path = previous.full_filepath
+        try:
+            if count == 0:
+                shutil.copyfile(previous_path, temp_file.name)
+                appended = True
+            elif export_type == Export.CSV_ZIP_EXPORT:
+                export_builder.append_zipped_csv(
+                    temp_file.name, query_mongo(username, id_string, query),
+                    previous_path)
+                appended = True
+            else:
+                appended = _append_to_flat_csv(
+                    export_builder, username, id_string, query,
+                    previous_path, temp_file.name)
+        finally:
+            # a copy downloaded from a storage without local paths, e.g. S3
+            if not previous.is_stored_locally:
+                os.unlink(previous_path)
+
+    if appended:
+        count += previous.instance_count
+    else:
+        query = json.dumps({ID: {'$lte': last_instance_id}})
+        count = query_mongo(username, id_string, query).count()
+        if export_type == Export.CSV_ZIP_EXPORT:
+            if not _generate_parallel_export(export_builder, export_type,
+                                             temp_file.name, xform, query):
+                export_builder.to_zipped_csv(
+                    temp_file.name, query_mongo(username, id_string, query))
+        else:
+            export_builder.to_flat_csv_export(
+                temp_file.name, None, username, id_string, query)
+
+    return time_of_last_submission, last_instance_id, count, options_key
+
+
+def _generate_parallel_export(export_builder, export_type, path, xform,
+                              query):
+    """
+    Writes the export with `parallel_export` when it supports the export
+    type and the submissions are numerous enough to be worth it. Returns
+    whether it did.
+    """
+    # TODO resolve circular import
+    from onadata.libs.utils.parallel_export import DEFAULT_EXPORT_WORKERS,\
+        PARALLEL_EXPORT_TYPES, get_export_workers, write_parallel_export
+
+    # the pool closes the database connections before forking, which would
+    # break the transaction of a request: only exports made by Celery tasks,
+    # outside of one, are written in parallel
+    if export_type not in PARALLEL_EXPORT_TYPES or getattr(
+            settings, 'EXPORT_WORKERS', DEFAULT_EXPORT_WORKERS) < 2 or\
+            connection.in_atomic_block:
+        return False
+    workers = get_export_workers(
+        query_mongo(xform.user.username, xform.id_string, query).count())
+    if workers < 2:
+        return False
+    write_parallel_export(export_builder, export_type, path, xform, query,
+                          workers)
+    return True
+
+
+def _append_to_flat_csv(export_builder, username, id_string, query,
+                        previous_path, path):
+    # TODO resolve circular import
+    from onadata.apps.viewer.pandas_mongo_bridge import\
+        CSVDataFrameBuilder
+
+    csv_builder = CSVDataFrameBuilder(
+        username, id_string, query, export_builder.GROUP_DELIMITER,
+        export_builder.SPLIT_SELECT_MULTIPLES,
+        export_builder.BINARY_SELECT_MULTIPLES)
+    with open(previous_path, 'rb') as previous_file:
+        header = next(csv.reader(previous_file))
+    shutil.copyfile(previous_path, path)
+    with open(path, 'ab') as csv_file:
+        return csv_builder.append_to(csv_file, header)
+
+
+def generate_streaming_export(export_type, username, id_string,
+                              filter_query=None, group_delimiter='/',
+                              split_select_multiples=True,
+                              binary_select_multiples=False):
+    """
+    Returns the chunks of an export of the records matching `filter_query`,
+    built while they are read rather than written to a file and saved to
+    storage first, for exports which are not kept. Only the
+    `STREAMING_EXPORT_TYPES` can be streamed.
+    """
+    if export_type == Export.CSV_EXPORT:
+        # TODO resolve circular import
+        from onadata.apps.viewer.pandas_mongo_bridge import\
+            CSVDataFrameBuilder
+
+        csv_builder = CSVDataFrameBuilder(
+            username, id_string, filter_query, group_delimiter,
+            split_select_multiples, binary_select_multiples)
+        return csv_builder.iter_csv()
+
+    if export_type != Export.CSV_ZIP_EXPORT:
+        raise ValueError(u"%s exports cannot be streamed" % export_type)
+
+    xform = XForm.objects.get(
+        user__username__iexact=username, id_string__exact=id_string)
+    export_builder = get_export_builder(
+        xform, group_delimiter, split_select_multiples,
+        binary_select_multiples)
+    return export_builder.iter_zipped_csv(
+        query_mongo(username, id_string, filter_query))
+
+
+def get_mongo_query(username, id_string, query=None, hide_deleted=True,
+                    id_bounds=None):
+    """
+    Returns the Mongo query of the records of a form matching `query`, a
+    JSON string.
+
+    :param id_bounds: condition on `_id`, e.g. `{'$gt': 10, '$lte': 20}`
+    """
     query = json.loads(query, object_hook=json_util.object_hook)\
         if query else {}
     query = MongoHelper.to_safe_dict(query)
@@ -785,12 +1448,21 @@ def query_mongo(username, id_string, query=None, hide_deleted=True):
         # display only active elements
         # join existing query with deleted_at_query on an $and
         query = {"$and": [query, {"_deleted_at": None}]}
-    return xform_instances.find(query)
+    if id_bounds:
+        query = {"$and": [query, {ID: id_bounds}]}
+    return query
+
+
+def query_mongo(username, id_string, query=None, hide_deleted=True,
+                fields=None):
+    return xform_instances.find(
+        get_mongo_query(username, id_string, query, hide_deleted), fields)
 
 
 def should_create_new_export(xform, export_type):
     if Export.objects.filter(
-            xform=xform, export_type=export_type).count() == 0\
+            xform=xform, export_type=export_type,
+            filtered=False).count() == 0\
             or Export.exports_outdated(xform, export_type=export_type):
         return True
     return False
@@ -801,8 +1473,8 @@ def newset_export_for(xform, export_type):
     Make sure you check that an export exists before calling this,
     it will a DoesNotExist exception otherwise
     """
-    return Export.objects.filter(xform=xform, export_type=export_type)\
-        .latest('created_on')
+    return Export.objects.filter(xform=xform, export_type=export_type,
+                                 filtered=False).latest('created_on')
 
 
 def increment_index_in_filename(filename):
@@ -866,10 +1538,7 @@ def generate_attachments_zip_export(
 def generate_kml_export(
         export_type, extension, username, id_string, export_id=None,
         filter_query=None):
-    user = User.objects.get(username=username)
     xform = XForm.objects.get(user__username=username, id_string=id_string)
-    response = render_to_response(
-        'survey.kml', {'data': kml_export_data(id_string, user)})
 
     basename = "%s_%s" % (id_string,
                           datetime.now().strftime("%Y_%m_%d_%H_%M_%S"))
@@ -883,7 +1552,8 @@ def generate_kml_export(
 
     storage = get_storage_class()()
     temp_file = NamedTemporaryFile(suffix=extension)
-    temp_file.write(response.content)
+    for chunk in chunked(iter_kml(xform)):
+        temp_file.write(chunk.encode('utf-8'))
     temp_file.seek(0)
     export_filename = storage.save(
         file_path,
@@ -906,30 +1576,124 @@ def generate_kml_export(
     return export
 
 
-def kml_export_data(id_string, user):
-    # TODO resolve circular import
-    from onadata.apps.viewer.models.data_dictionary import DataDictionary
-    dd = DataDictionary.objects.get(id_string=id_string, user=user)
-    instances = Instance.objects.filter(
-        xform__user=user,
-        xform__id_string=id_string,
-        deleted_at=None,
-        geom__isnull=False
-    ).order_by('id')
-    data_for_template = []
+KML_HEADER = u"""<?xml version="1.0" encoding="utf-8"?>
+<kml xmlns="http://earth.google.com/kml/2.2">
+  <Document>
+    <name>%s</name>
+    <Style id="sh_red-circle">
+      <IconStyle>
+        <scale>1.3</scale>
+        <Icon>
+          <href>http://maps.google.com/mapfiles/kml/paddle/red-circle.png</href>
+        </Icon>
+        <hotSpot x="32" y="1" xunits="pixels" yunits="pixels"/>
+      </IconStyle>
+      <ListStyle>
+        <ItemIcon>
+          <href>http://maps.google.com/mapfiles/kml/paddle/red-circle-lv.png</href>
+        </ItemIcon>
+      </ListStyle>
+    </Style>
+    <StyleMap id="msn_red-circle">
+      <Pair>
+        <key>normal</key>
+        <styleUrl>#sn_red-circle</styleUrl>
+      </Pair>
+      <Pair>
+        <key>highlight</key>
+        <styleUrl>#sh_red-circle</styleUrl>
+      </Pair>
+    </StyleMap>
+"""
+KML_PLACEMARK = u"""    <Placemark>
+      <description>
+        Survey Instance: %s
+      </description>
+      <styleUrl>#sh_red-circle</styleUrl>
+      <Point>
+        <coordinates>%r,%r</coordinates>
+      </Point>
+    </Placemark>
+"""
+KML_FOOTER = u"""  </Document>
+</kml>
+"""
+
+
+def parse_bbox(bbox):
+    """
+    Returns the `(xmin, ymin, xmax, ymax)` of a `xmin,ymin,xmax,ymax`
+    string, in degrees. Raises ValueError if it is not one.
+    """
+    bbox = tuple(float(value) for value in bbox.split(','))
+    if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+        raise ValueError(u"Invalid bounding box")
+    return bbox
 
-    for instance in instances:
-        point = instance.point
-        if point:
-            data_for_template.append({
-                'name': id_string,
-                'id': instance.uuid,
-                'lat': point.y,
-                'lng': point.x,
-                })
+
+def get_geo_instances(xform, bbox=None, start=None, end=None):
+    """
+    Returns the instances of `xform` which have geopoints, filtered by the
+    database: those with a point within `bbox`, `(xmin, ymin, xmax, ymax)`,
+    and submitted between `start` and `end`, when given.
+    """
+    instances = Instance.objects.filter(
+        xform=xform, deleted_at=None, geom__isnull=False)
+    if bbox:
+        instances = instances.filter(
+            geom__intersects=Polygon.from_bbox(bbox))
+    if start:
+        instances = instances.filter(date_created__gte=start)
+    if end:
+        instances = instances.filter(date_created__lte=end)
+    return instances
+
+
+def iter_geo_points(xform, bbox=None, start=None, end=None):
+    """
+    Yields `(id, uuid, longitude, latitude)` for the instances of
+    `get_geo_instances()` in id order, reading only these columns,
+    `GEO_EXPORT_CHUNK_SIZE` instances at a time. The point of an instance is
+    its first one, or its first one within `bbox`.
+    """
+    chunk_size = getattr(settings, 'GEO_EXPORT_CHUNK_SIZE',
+                         DEFAULT_GEO_EXPORT_CHUNK_SIZE)
+    instances = get_geo_instances(xform, bbox, start, end)
+    for pk, uuid, geom in queryset_iterator(
+            instances, chunk_size, values_list=('id', 'uuid', 'geom')):
+        for point in geom:
+            if not bbox or (bbox[0] <= point.x <= bbox[2] and
+                            bbox[1] <= point.y <= bbox[3]):
+                yield pk, uuid, point.x, point.y
+                break
+
+
+def iter_kml(xform, bbox=None, start=None, end=None):
+    """
+    Yields the KML document of the points of `iter_geo_points()`, one
+    placemark at a time.
+    """
+    yield KML_HEADER % escape(xform.id_string)
+    for pk, uuid, lng, lat in iter_geo_points(xform, bbox, start, end):
+        yield KML_PLACEMARK % (escape(uuid), lng, lat)
+    yield KML_FOOTER
 
 
-    return data_for_template
+def iter_geojson(xform, bbox=None, start=None, end=None):
+    """
+    Yields the GeoJSON feature collection of the points of
+    `iter_geo_points()`, one feature at a time.
+    """
+    features = ({
+        'type': 'Feature',
+        'id': pk,
+        'geometry': {'type': 'Point', 'coordinates': [lng, lat]},
+        'properties': {ID: pk, UUID: uuid},
+    } for pk, uuid, lng, lat in iter_geo_points(xform, bbox, start, end))
+    yield u'{"type": "FeatureCollection", "features": '
+    for string in iter_json_array(features):
+        yield string
+    yield u'}'
 
 
 def _get_records(instances):
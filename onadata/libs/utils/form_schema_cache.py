@@ -0,0 +1,221 @@
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.fields.files import FieldFile
+from django.utils.functional import cached_property
+
+from onadata.apps.api.mongo_helper import MongoHelper
+
+
+DEFAULT_FORM_SCHEMA_CACHE_SIZE = 100
+# types of the questions whose answers are counted by value in the field
+# summaries of a form, see `onadata.apps.logger.models.field_value_count`
+SUMMARY_FIELD_TYPES = ['select one', 'integer', 'decimal', 'date',
+                       'datetime', 'start', 'end', 'today']
+# ... of which those counted by day
+SUMMARY_DATE_TYPES = ['date', 'datetime', 'start', 'end', 'today']
+# the attributes of a `DataDictionary` which only depend on its schema,
+# shared by all the `DataDictionary`s of a version of a form
+SHARED_DATA_DICTIONARY_ATTRIBUTES = ['_survey', '_survey_elements']
+
+
+def _new_data_dictionary(xform):
+    """
+    Return a new `DataDictionary` with the field values of `xform`, read
+    again from the database if some of them are deferred.
+    """
+    # TODO: fix hack to get around a circular import
+    from onadata.apps.viewer.models.data_dictionary import\
+        DataDictionary
+    fields = xform._meta.concrete_fields
+    if any(f.attname not in xform.__dict__ for f in fields):
+        return DataDictionary.objects.get(pk=xform.pk)
+    values = {}
+    for f in fields:
+        value = xform.__dict__[f.attname]
+        if isinstance(value, FieldFile) and value._committed:
+            # a `FieldFile` is bound to the instance it was read from
+            value = value.name
+        values[f.attname] = value
+    data_dictionary = DataDictionary(**values)
+    data_dictionary._state.adding = xform._state.adding
+    data_dictionary._state.db = xform._state.db
+    return data_dictionary
+
+
+class FormSchema(object):
+    """
+    The parts of a form's schema that are needed for every submission,
+    export, chart or SMS of that form, computed once per version of the form.
+
+    Everything here must be treated as read-only since it is shared by all
+    the users of the cache; `data_dictionary` is the schema's own copy, which
+    is never handed out (see `get_data_dictionary()`).
+    """
+
+    def __init__(self, data_dictionary):
+        self.data_dictionary = data_dictionary
+
+    def get_data_dictionary(self, xform):
+        """
+        Return a `DataDictionary` of `xform`, `xform` itself if it is one,
+        holding the current field values of `xform` but sharing the survey
+        parsed once for this version of the form.
+        """
+        # TODO: fix hack to get around a circular import
+        from onadata.apps.viewer.models.data_dictionary import\
+            DataDictionary
+        if isinstance(xform, DataDictionary):
+            data_dictionary = xform
+        else:
+            data_dictionary = _new_data_dictionary(xform)
+        # parse the survey, if it was not yet, before sharing it
+        self.survey
+        for name in SHARED_DATA_DICTIONARY_ATTRIBUTES:
+            if name in self.data_dictionary.__dict__ and \
+                    name not in data_dictionary.__dict__:
+                setattr(data_dictionary, name,
+                        self.data_dictionary.__dict__[name])
+        return data_dictionary
+
+    @property
+    def survey(self):
+        return self.data_dictionary.survey
+
+    @cached_property
+    def json_survey(self):
+        return json.loads(self.data_dictionary.json)
+
+    @cached_property
+    def repeat_xpaths(self):
+        return [e.get_abbreviated_xpath() for e in
+                self.data_dictionary.get_survey_elements_of_type(u"repeat")]
+
+    @cached_property
+    def geopoint_xpaths(self):
+        return self.data_dictionary.geopoint_xpaths()
+
+    @cached_property
+    def select_multiples(self):
+        """
+        Map the xpath of every select multiple question to the xpaths of its
+        choices.
+        """
+        return OrderedDict(
+            (e.get_abbreviated_xpath(),
+             [c.get_abbreviated_xpath() for c in e.children])
+            for e in self.data_dictionary.get_survey_elements()
+            if e.bind.get(u"type") == u"select")
+
+    @cached_property
+    def summary_fields(self):
+        """
+        Map the xpath of every field counted in the field summaries of the
+        form to whether it is counted by day. `_submission_time` is counted
+        by the daily submission counts instead.
+        """
+        fields = OrderedDict()
+        for e in self.data_dictionary.get_survey_elements():
+            if e.type in SUMMARY_FIELD_TYPES:
+                fields[e.get_abbreviated_xpath()] = \
+                    e.type in SUMMARY_DATE_TYPES
+        return fields
+
+    @cached_property
+    def mongo_field_names(self):
+        return self.data_dictionary.get_mongo_field_names_dict()
+
+    @cached_property
+    def _mongo_key_translations(self):
+        return MongoHelper.get_key_translations(
+            e.get_abbreviated_xpath()
+            for e in self.data_dictionary.get_survey_elements())
+
+    @property
+    def mongo_safe_keys(self):
+        """
+        The keys under which the xpaths of the form are saved in Mongo, for
+        `MongoHelper.to_safe_dict()`.
+        """
+        return self._mongo_key_translations[0]
+
+    @property
+    def mongo_readable_keys(self):
+        """
+        The xpaths of the form by the keys they are saved under in Mongo, for
+        `MongoHelper.to_readable_dict()`.
+        """
+        return self._mongo_key_translations[1]
+
+
+def _cache_key(xform):
+    version = xform.date_modified or xform.hash
+    return xform.pk, version
+
+
+class FormSchemaCache(object):
+    """
+    A per-process LRU cache of `FormSchema`s keyed by form and version, so
+    that a replaced form is never served from a stale entry even by
+    processes which did not see it being saved.
+    """
+
+    def __init__(self, max_size=DEFAULT_FORM_SCHEMA_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, xform):
+        key = _cache_key(xform)
+        with self._lock:
+            schema = self._entries.pop(key, None)
+            if schema is not None:
+                # move it to the most recently used end
+                self._entries[key] = schema
+                self.hits += 1
+                return schema
+            self.misses += 1
+
+        schema = FormSchema(_new_data_dictionary(xform))
+        with self._lock:
+            self._entries[key] = schema
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return schema
+
+    def invalidate(self, xform_pk):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == xform_pk]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+        }
+
+
+form_schema_cache = FormSchemaCache(
+    getattr(settings, 'FORM_SCHEMA_CACHE_SIZE',
+            DEFAULT_FORM_SCHEMA_CACHE_SIZE))
+
+
+def get_form_schema(xform):
+    return form_schema_cache.get(xform)
+
+
+def invalidate_form_schema(sender, instance=None, **kwargs):
+    if instance is not None and instance.pk is not None:
+        form_schema_cache.invalidate(instance.pk)
@@ -16,7 +16,7 @@ from django.core.mail import mail_admins
 from django.core.servers.basehttp import FileWrapper
 from django.contrib.auth.models import User
 from django.db import IntegrityError, transaction
-from django.db.models import Q
+from django.db.models import Count, Q
 from django.db.models.signals import pre_delete
 from django.http import HttpResponse, HttpResponseNotFound, \
     StreamingHttpResponse, Http404
@@ -49,10 +49,9 @@ from onadata.apps.logger.xform_instance_parser import (
     InstanceInvalidUserError,
     InstanceMultipleNodeError,
     DuplicateInstance,
+    ParsedSubmission,
     clean_and_parse_xml,
-    get_uuid_from_xml,
-    get_deprecated_uuid_from_xml,
-    get_submission_date_from_xml)
+    get_uuid_from_xml)
 from onadata.apps.viewer.models.data_dictionary import DataDictionary
 from onadata.apps.viewer.models.parsed_instance import _remove_from_mongo,\
     xform_instances, ParsedInstance
@@ -73,15 +72,21 @@ mongo_instances = settings.MONGO_DB.instances
 
 
 def _get_instance(xml, new_uuid, submitted_by, status, xform,
-                  defer_counting=False):
+                  defer_counting=False, submission=None):
     '''
     `defer_counting=False` will set a Python-only attribute of the same name on
     the *new* `Instance` if one is created. This will prevent
     `update_xform_submission_count()` from doing anything, which avoids locking
     any rows in `logger_xform` or `main_userprofile`.
+
+    `submission` is the `ParsedSubmission` of `xml`; one is created if it is
+    not provided.
     '''
+    if submission is None:
+        submission = ParsedSubmission(xml)
+
     # check if its an edit submission
-    old_uuid = get_deprecated_uuid_from_xml(xml)
+    old_uuid = submission.deprecated_uuid
     instances = Instance.objects.filter(uuid=old_uuid)
 
     if instances:
@@ -93,7 +98,7 @@ def _get_instance(xml, new_uuid, submitted_by, status, xform,
         instance.xml = xml
         instance._populate_xml_hash()
         instance.uuid = new_uuid
-        instance.save()
+        instance.save(submission=submission)
     else:
         # new submission
 
@@ -108,7 +113,7 @@ def _get_instance(xml, new_uuid, submitted_by, status, xform,
             # Only set the attribute if requested, i.e. don't bother ever
             # setting it to `False`
             instance.defer_counting = True
-        instance.save()
+        instance.save(submission=submission)
 
     return instance
 
@@ -129,7 +134,7 @@ def get_uuid_from_submission(xml):
     return len(split_xml) > 1 and split_xml[1] or None
 
 
-def get_xform_from_submission(xml, username, uuid=None):
+def get_xform_from_submission(xml, username, uuid=None, submission=None):
         # check alternative form submission ids
         uuid = uuid or get_uuid_from_submission(xml)
 
@@ -145,7 +150,10 @@ def get_xform_from_submission(xml, username, uuid=None):
             else:
                 return xform
 
-        id_string = get_id_string_from_xml_str(xml)
+        if submission is not None:
+            id_string = submission.id_string
+        else:
+            id_string = get_id_string_from_xml_str(xml)
 
         return get_object_or_404(XForm, id_string__exact=id_string,
                                  user__username=username)
@@ -227,9 +235,12 @@ def save_attachments(instance, media_files):
 
 
 def save_submission(xform, xml, media_files, new_uuid, submitted_by, status,
-                    date_created_override):
+                    date_created_override, submission=None):
+    if submission is None:
+        submission = ParsedSubmission(xml)
+
     if not date_created_override:
-        date_created_override = get_submission_date_from_xml(xml)
+        date_created_override = submission.submission_date
 
     # We have to save the `Instance` to the database before we can associate
     # any `Attachment`s with it, but we are inside a transaction and saving
@@ -246,7 +257,7 @@ def save_submission(xform, xml, media_files, new_uuid, submitted_by, status,
     # responsible for calling `update_xform_submission_count()` if the returned
     # `Instance` has `defer_counting = True`.
     instance = _get_instance(xml, new_uuid, submitted_by, status, xform,
-                             defer_counting=True)
+                             defer_counting=True, submission=submission)
 
     save_attachments(instance, media_files)
 
@@ -264,7 +275,7 @@ def save_submission(xform, xml, media_files, new_uuid, submitted_by, status,
             instance=instance)
 
     if not created:
-        pi.save(async=False)
+        pi.save(async=False, submission=submission)
 
     # Now that the slow tasks are complete and we are (hopefully!) close to the
     # end of the transaction, update the submission count if the `Instance` was
@@ -296,7 +307,11 @@ def create_instance(username, xml_file, media_files,
 
     xml = xml_file.read()
     xml_hash = Instance.get_hash(xml)
-    xform = get_xform_from_submission(xml, username, uuid)
+    # Parse the XML only once for all the steps below. Parsing is lazy, so
+    # malformed XML still fails at the first step which needs the document
+    submission = ParsedSubmission(xml)
+    xform = get_xform_from_submission(xml, username, uuid,
+                                      submission=submission)
     check_submission_permissions(request, xform)
 
     # Dorey's rule from 2012 (commit 890a67aa):
@@ -317,7 +332,7 @@ def create_instance(username, xml_file, media_files,
         existing_instance = None
 
     # get new and deprecated uuid's
-    new_uuid = get_uuid_from_xml(xml)
+    new_uuid = submission.uuid
 
     if existing_instance:
         # ensure we have saved the extra attachments
@@ -326,12 +341,14 @@ def create_instance(username, xml_file, media_files,
             raise DuplicateInstance()
         else:
             # Update Mongo via the related ParsedInstance
-            existing_instance.parsed_instance.save(async=False)
+            existing_instance.parsed_instance.save(async=False,
+                                                   submission=submission)
             return existing_instance
     else:
         instance = save_submission(xform, xml, media_files, new_uuid,
                                    submitted_by, status,
-                                   date_created_override)
+                                   date_created_override,
+                                   submission=submission)
         return instance
 
 
@@ -612,8 +629,8 @@ def inject_instanceid(xml_str, uuid):
 
 def update_mongo_for_xform(xform, only_update_missing=True):
 
-    instance_ids = set(
-        [i.id for i in Instance.objects.only('id').filter(xform=xform)])
+    instance_ids = set(Instance.objects.filter(xform=xform).values_list(
+        'id', flat=True))
     sys.stdout.write("Total no of instances: %d\n" % len(instance_ids))
     mongo_ids = set()
     user = xform.user
@@ -631,36 +648,40 @@ def update_mongo_for_xform(xform, only_update_missing=True):
         # clear mongo records
         mongo_instances.remove({common_tags.USERFORM_ID: userform_id})
     # get instances
-    sys.stdout.write(
-        "Total no of instances to update: %d\n" % len(instance_ids))
-    instances = Instance.objects.only('id').in_bulk(
-        [id for id in instance_ids])
-    total = len(instances)
-    done = 0
-    for id, instance in instances.items():
-        (pi, created) = ParsedInstance.objects.get_or_create(instance=instance)
-        if not pi.save(async=False):
-            print("\033[91m[ERROR] - Instance #{}/uuid:{} - Could not save the parsed instance\033[0m".format(
-                id, instance.uuid))
-        else:
-            done += 1
+    total = len(instance_ids)
+    sys.stdout.write("Total no of instances to update: %d\n" % total)
 
-        # if 1000 records are done, flush mongo
-        if (done > 0 and done % 1000) == 0:
-            sys.stdout.write(
-                'Updated %d records, flushing MongoDB...\n' % done)
-            settings.MONGO_CONNECTION.admin.command({'fsync': 1})
-
-        progress = "\r%.2f %% done..." % ((float(done) / float(total)) * 100)
-        sys.stdout.write(progress)
+    def progress(synced, failed_ids, last_id):
+        done = synced + len(failed_ids)
+        sys.stdout.write(
+            "\r%.2f %% done..." % ((float(done) / float(total)) * 100))
         sys.stdout.flush()
-    # flush mongo again when done
-    settings.MONGO_CONNECTION.admin.command({'fsync': 1})
+
+    # TODO: fix hack to get around a circular import
+    from onadata.apps.viewer.mongo_rebuild import rebuild_instances
+    synced, failed_ids = rebuild_instances(instance_ids, progress=progress)
+    for id in failed_ids:
+        print("\033[91m[ERROR] - Instance #{} - Could not save the parsed "
+              "instance\033[0m".format(id))
     sys.stdout.write(
         "\nUpdated %s\n------------------------------------------\n"
         % xform.id_string)
 
 
+def _get_mongo_counts(userform_ids=None):
+    """
+    Returns the number of Mongo records of each form, by userform id, with a
+    single aggregation.
+    """
+    pipeline = [{"$group": {"_id": "$%s" % common_tags.USERFORM_ID,
+                            "count": {"$sum": 1}}}]
+    if userform_ids is not None:
+        pipeline.insert(0, {"$match": {
+            common_tags.USERFORM_ID: {"$in": list(userform_ids)}}})
+    return dict((group['_id'], group['count'])
+                for group in mongo_instances.aggregate(pipeline))
+
+
 def mongo_sync_status(remongo=False, update_all=False, user=None, xform=None):
     """Check the status of records in the mysql db versus mongodb. At a
     minimum, return a report (string) of the results.
@@ -685,6 +706,19 @@ def mongo_sync_status(remongo=False, update_all=False, user=None, xform=None):
     else:
         qs = qs.all()
 
+    # count the records of all the forms at once on both sides rather than
+    # with two queries per form
+    instances = Instance.objects.all()
+    userform_ids = None
+    if user:
+        instances = instances.filter(xform__in=qs)
+        userform_ids = ["%s_%s" % (user.username, id_string)
+                        for id_string in qs.values_list('id_string',
+                                                        flat=True)]
+    instance_counts = dict(instances.order_by().values_list(
+        'xform_id').annotate(count=Count('pk')))
+    mongo_counts = _get_mongo_counts(userform_ids)
+
     total = qs.count()
     found = 0
     done = 0
@@ -693,10 +727,9 @@ def mongo_sync_status(remongo=False, update_all=False, user=None, xform=None):
     for xform in queryset_iterator(qs, 100):
         # get the count
         user = xform.user
-        instance_count = Instance.objects.filter(xform=xform).count()
+        instance_count = instance_counts.get(xform.pk, 0)
         userform_id = "%s_%s" % (user.username, xform.id_string)
-        mongo_count = mongo_instances.find(
-            {common_tags.USERFORM_ID: userform_id}).count()
+        mongo_count = mongo_counts.get(userform_id, 0)
 
         if instance_count != mongo_count or update_all:
             line = "user: %s, id_string: %s\nInstance count: %d\t"\
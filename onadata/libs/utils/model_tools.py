@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-import gc
 import uuid
 
 from onadata.apps.logger.models.xform import XForm
@@ -18,23 +17,48 @@ def set_uuid(obj):
         obj.uuid = generate_uuid_for_form()
 
 
-def queryset_iterator(queryset, chunksize=100):
-    '''''
-    Iterate over a Django Queryset.
+def queryset_iterator(queryset, chunksize=100, only=None, values_list=None,
+                      prefetch_related=None, progress=None):
+    '''
+    Iterate over a Django Queryset, in primary key order.
 
     This method loads a maximum of chunksize (default: 100) rows in
     its memory at the same time while django normally would load all
-    rows in its memory. Using the iterator() method only causes it to
-    not preload all the classes.
+    rows in its memory. Each chunk is read with a keyset query (primary key
+    greater than the last one read) rather than an OFFSET, so that the
+    whole queryset is read in O(n) and rows added to or removed from it
+    meanwhile do not shift the following chunks.
+
+    :param only: fields to load, as with `QuerySet.only()`
+    :param values_list: fields to yield as tuples instead of model
+        instances, as with `QuerySet.values_list()`
+    :param prefetch_related: lookups prefetched for each chunk
+    :param progress: called with the number of rows read so far after each
+        chunk
     '''
-    start = 0
-    end = chunksize
-    while start < queryset.count():
-        for row in queryset[start:end]:
-            yield row
-        start += chunksize
-        end += chunksize
-        gc.collect()
+    queryset = queryset.order_by('pk')
+    if only:
+        queryset = queryset.only(*only)
+    if values_list:
+        queryset = queryset.values_list('pk', *values_list)
+    elif prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+
+    done = 0
+    chunk = queryset[:chunksize]
+    while True:
+        rows = list(chunk)
+        if not rows:
+            return
+        for row in rows:
+            yield row[1:] if values_list else row
+        done += len(rows)
+        if progress:
+            progress(done)
+        if len(rows) < chunksize:
+            return
+        last_pk = rows[-1][0] if values_list else rows[-1].pk
+        chunk = queryset.filter(pk__gt=last_pk)[:chunksize]
 
 
 def update_xform_uuid(username, id_string, new_uuid):
@@ -0,0 +1,184 @@
+import cPickle as pickle
+import os
+import tempfile
+from collections import defaultdict
+
+from django.conf import settings
+from pymongo import ASCENDING
+
+from onadata.apps.api.mongo_helper import MongoHelper
+from onadata.apps.viewer.models.export import Export
+from onadata.libs.utils.common_tags import ID, INDEX, PARENT_INDEX,\
+    PARENT_TABLE_NAME
+from onadata.libs.utils.export_tools import get_mongo_query, xform_instances
+from onadata.libs.utils.worker_pool import get_worker_instances_collection,\
+    imap_bounded, start_pool
+
+
+DEFAULT_EXPORT_WORKERS = 1
+DEFAULT_EXPORT_PARALLEL_MIN_RECORDS = 10000
+DEFAULT_EXPORT_SHARD_SIZE = 5000
+# `ExportBuilder` method writing each export type from `(section, values)`s
+PARALLEL_EXPORT_TYPES = {
+    Export.CSV_ZIP_EXPORT: 'write_zipped_csv',
+    Export.XLS_EXPORT: 'write_xls_export',
+    Export.SAV_ZIP_EXPORT: 'write_zipped_sav',
+    Export.PARQUET_ZIP_EXPORT: 'write_zipped_parquet',
+}
+# state of the processes of the pool, see `_init_worker()`
+_worker_state = {}
+
+
+def get_export_workers(count):
+    """
+    Returns the number of processes to export `count` records with: 1 below
+    the `EXPORT_PARALLEL_MIN_RECORDS` setting, the `EXPORT_WORKERS` setting
+    otherwise.
+    """
+    min_records = getattr(settings, 'EXPORT_PARALLEL_MIN_RECORDS',
+                          DEFAULT_EXPORT_PARALLEL_MIN_RECORDS)
+    if not count or count < min_records:
+        return 1
+    return getattr(settings, 'EXPORT_WORKERS', DEFAULT_EXPORT_WORKERS)
+
+
+def get_shards(username, id_string, query=None, shard_size=None):
+    """
+    Splits the records of a form matching `query` into consecutive ranges
+    of at most `shard_size` `_id`s. Returns the range bounds, to be used as
+    the `id_bounds` of `get_mongo_query()`, in `_id` order.
+    """
+    shard_size = shard_size or getattr(settings, 'EXPORT_SHARD_SIZE',
+                                       DEFAULT_EXPORT_SHARD_SIZE)
+    cursor = xform_instances.find(
+        get_mongo_query(username, id_string, query), {ID: 1}).sort(
+        ID, ASCENDING)
+    shards = []
+    lower = None
+    count = 0
+    for record in cursor:
+        count += 1
+        if count == shard_size:
+            shards.append(_get_id_bounds(lower, record[ID]))
+            lower = record[ID]
+            count = 0
+    if count:
+        shards.append(_get_id_bounds(lower, record[ID]))
+    return shards
+
+
+def _get_id_bounds(lower, upper):
+    bounds = {'$lte': upper}
+    if lower is not None:
+        bounds['$gt'] = lower
+    return bounds
+
+
+def _init_worker(export_builder, username, id_string, query):
+    _worker_state.update({
+        'collection': get_worker_instances_collection(),
+        'export_builder': export_builder,
+        'username': username,
+        'id_string': id_string,
+        'query': query,
+    })
+
+
+def write_shard_parts(export_builder, records):
+    """
+    Processes `records` and pickles their rows, with `_index`es starting
+    from 1 in each section, to one temporary file per section. Returns
+    `{section name: (path, number of rows)}`.
+    """
+    part_files = {}
+    counts = defaultdict(int)
+    try:
+        for section, row in export_builder.iter_section_rows(records):
+            name = section['name']
+            if name not in part_files:
+                part_files[name] = tempfile.NamedTemporaryFile(
+                    suffix='.part', delete=False)
+            pickle.dump(row, part_files[name], pickle.HIGHEST_PROTOCOL)
+            counts[name] += 1
+    finally:
+        for part_file in part_files.values():
+            part_file.close()
+
+    return dict((name, (part_file.name, counts[name]))
+                for name, part_file in part_files.items())
+
+
+def _export_shard(id_bounds):
+    query = get_mongo_query(
+        _worker_state['username'], _worker_state['id_string'],
+        _worker_state['query'], id_bounds=id_bounds)
+    records = _worker_state['collection'].find(query).sort(ID, ASCENDING)
+    return write_shard_parts(_worker_state['export_builder'], records)
+
+
+def iter_shard_rows(export_builder, shard_parts):
+    """
+    Yields the `(section, values)`s of the parts of each shard, in shard
+    order, shifting the `_index` and `_parent_index` of each row by the
+    number of rows of its section, and of its parent section, in the
+    previous shards. The part files are removed once read.
+    """
+    columns = {}
+    for section in export_builder.sections:
+        fields = export_builder.get_fields(section)
+        columns[section['name']] = (fields.index(INDEX),
+                                    fields.index(PARENT_INDEX),
+                                    fields.index(PARENT_TABLE_NAME))
+    offsets = defaultdict(int)
+    for parts in shard_parts:
+        try:
+            for section in export_builder.sections:
+                name = section['name']
+                if name not in parts:
+                    continue
+                index, parent_index, parent_table = columns[name]
+                path, count = parts[name]
+                with open(path, 'rb') as f:
+                    for _ in xrange(count):
+                        values = list(pickle.load(f))
+                        values[index] += offsets[name]
+                        if values[parent_index] not in (None, -1):
+                            values[parent_index] += offsets[
+                                MongoHelper.decode(values[parent_table])]
+                        yield section, tuple(values)
+        finally:
+            for path, count in parts.values():
+                if os.path.exists(path):
+                    os.remove(path)
+        for name, (path, count) in parts.items():
+            offsets[name] += count
+
+
+def write_parallel_export(export_builder, export_type, path, xform,
+                          query=None, workers=None):
+    """
+    Writes the export of `export_type` of the records of `xform` matching
+    `query` to `path`, the records being split into `_id` ranges which a
+    pool of `workers` processes turn into rows while the parent process
+    writes the rows of the ranges already done.
+
+    The result is that of the serial export of the records in `_id` order.
+    Must not be called inside a transaction, see `start_pool()`.
+    """
+    workers = workers or getattr(settings, 'EXPORT_WORKERS',
+                                 DEFAULT_EXPORT_WORKERS)
+    username = xform.user.username
+    shards = get_shards(username, xform.id_string, query)
+
+    pool = start_pool(
+        workers, _init_worker,
+        (export_builder, username, xform.id_string, query))
+    try:
+        # the shards are returned in order, so rows are numbered as in a
+        # serial export
+        shard_parts = imap_bounded(pool, _export_shard, shards, workers * 2)
+        write = getattr(export_builder, PARALLEL_EXPORT_TYPES[export_type])
+        write(path, iter_shard_rows(export_builder, shard_parts))
+    finally:
+        pool.terminate()
+        pool.join()
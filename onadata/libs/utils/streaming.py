@@ -0,0 +1,202 @@
+import json
+import struct
+import time
+import zlib
+from zipfile import LargeZipFile
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+
+JSON = 'json'
+JSONP = 'jsonp'
+NDJSON = 'ndjson'
+CONTENT_TYPES = {
+    JSON: 'application/json',
+    JSONP: 'application/javascript',
+    NDJSON: 'application/x-ndjson',
+}
+STREAMING_FORMATS = CONTENT_TYPES.keys()
+# bytes
+DEFAULT_STREAMING_CHUNK_SIZE = 64 * 1024
+
+ZIP_VERSION = 20
+ZIP64_VERSION = 45
+# sizes and CRC follow the data, names are UTF-8
+ZIP_FLAGS = 0x08 | 0x800
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+# greatest size or offset the ZIP headers hold, beyond which ZIP64 records
+# are needed
+ZIP64_LIMIT = 0xffffffff
+
+
+def chunked(strings, chunk_size=None):
+    """
+    Join `strings` into chunks of about `chunk_size` characters so that the
+    response is not written to the socket one record at a time.
+    """
+    chunk_size = chunk_size or getattr(
+        settings, 'STREAMING_CHUNK_SIZE', DEFAULT_STREAMING_CHUNK_SIZE)
+    chunk = []
+    size = 0
+    for string in strings:
+        chunk.append(string)
+        size += len(string)
+        if size >= chunk_size:
+            yield u''.join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield u''.join(chunk)
+
+
+def iter_json_array(records, dumps=json.dumps):
+    yield u'['
+    separator = u''
+    for record in records:
+        yield separator
+        yield dumps(record)
+        separator = u','
+    yield u']'
+
+
+def iter_ndjson(records, dumps=json.dumps):
+    for record in records:
+        yield dumps(record)
+        yield u'\n'
+
+
+def iter_jsonp(records, callback, dumps=json.dumps):
+    yield u'%s(' % callback
+    for string in iter_json_array(records, dumps):
+        yield string
+    yield u')'
+
+
+def stream_records(records, format=JSON, callback=None, dumps=json.dumps):
+    """
+    Returns a `StreamingHttpResponse` which serializes `records`, any
+    iterable of dicts, one at a time as they are read, so that memory use
+    does not grow with the number of records.
+
+    :param format: one of `STREAMING_FORMATS`
+    :param callback: name of the JSONP callback
+    :param dumps: serializes a single record
+    """
+    if format == NDJSON:
+        strings = iter_ndjson(records, dumps)
+    elif format == JSONP:
+        strings = iter_jsonp(records, callback, dumps)
+    else:
+        strings = iter_json_array(records, dumps)
+
+    return StreamingHttpResponse(chunked(strings),
+                                 content_type=CONTENT_TYPES[format])
+
+
+def _dos_date_time(date_time):
+    year, month, day, hour, minute, second = date_time[:6]
+    return ((hour << 11) | (minute << 5) | (second // 2),
+            ((year - 1980) << 9) | (month << 5) | day)
+
+
+class ZipStream(object):
+    """
+    Builds a ZIP archive as a sequence of byte strings, one member after
+    the other, without seeking back into what was already sent: the size
+    and CRC of each member follow its data, in a data descriptor, instead
+    of preceding it. The archive may be larger than 4GB, with ZIP64 records
+    in its central directory, but not its members.
+
+        zip_stream = ZipStream()
+        for name, chunks in members:
+            for data in zip_stream.add(name, chunks):
+                yield data
+        for data in zip_stream.close():
+            yield data
+    """
+
+    def __init__(self, date_time=None):
+        self._time, self._date = _dos_date_time(
+            date_time or time.localtime())
+        self._members = []
+        self._offset = 0
+
+    def _write(self, data):
+        self._offset += len(data)
+        return data
+
+    def add(self, name, chunks, compress=True):
+        """
+        Yields the member `name` whose content is the byte strings (or
+        unicode strings, encoded as UTF-8) of `chunks`, deflated unless
+        `compress` is False, e.g. for files which already are compressed.
+        """
+        if isinstance(name, unicode):
+            name = name.encode('utf-8')
+        method = ZIP_DEFLATED if compress else ZIP_STORED
+        offset = self._offset
+        yield self._write(struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, ZIP_VERSION, ZIP_FLAGS, method,
+            self._time, self._date, 0, 0, 0, len(name), 0) + name)
+
+        crc = 0
+        size = 0
+        compressed_size = 0
+        compressor = zlib.compressobj(
+            zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -zlib.MAX_WBITS)
+        for chunk in chunks:
+            if isinstance(chunk, unicode):
+                chunk = chunk.encode('utf-8')
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            data = compressor.compress(chunk) if compress else chunk
+            if data:
+                compressed_size += len(data)
+                yield self._write(data)
+        data = compressor.flush() if compress else ''
+        compressed_size += len(data)
+        if max(size, compressed_size) > ZIP64_LIMIT:
+            raise LargeZipFile(u"%s is larger than 4GB" % name)
+        crc &= 0xffffffff
+        yield self._write(data + struct.pack(
+            '<IIII', 0x08074b50, crc, compressed_size, size))
+
+        self._members.append(
+            (name, method, crc, compressed_size, size, offset))
+
+    def close(self):
+        """
+        Yields the central directory, which ends the archive.
+        """
+        start = self._offset
+        for name, method, crc, compressed_size, size, offset in \
+                self._members:
+            version = ZIP_VERSION
+            extra = ''
+            if offset > ZIP64_LIMIT:
+                # ZIP64 extended information holding the offset
+                version = ZIP64_VERSION
+                extra = struct.pack('<HHQ', 0x0001, 8, offset)
+                offset = 0xffffffff
+            yield self._write(struct.pack(
+                '<IHHHHHHIIIHHHHHII', 0x02014b50, version, version,
+                ZIP_FLAGS, method, self._time, self._date, crc,
+                compressed_size, size, len(name), len(extra), 0, 0, 0,
+                0o600 << 16, offset) + name + extra)
+
+        count = len(self._members)
+        size = self._offset - start
+        if count > 0xffff or max(size, start) > ZIP64_LIMIT:
+            # ZIP64 end of central directory record, and its locator
+            end = self._offset
+            yield self._write(struct.pack(
+                '<IQHHIIQQQQ', 0x06064b50, 44, ZIP64_VERSION, ZIP64_VERSION,
+                0, 0, count, count, size, start))
+            yield self._write(struct.pack('<IIQI', 0x07064b50, 0, end, 1))
+            count = min(count, 0xffff)
+            size = min(size, 0xffffffff)
+            start = min(start, 0xffffffff)
+        yield self._write(struct.pack(
+            '<IHHHHIIH', 0x06054b50, 0, 0, count, count, size, start, 0))
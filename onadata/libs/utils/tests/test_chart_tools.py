@@ -2,6 +2,11 @@
 # -*- coding: utf-8 -*-
 import os
 import unittest
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from onadata.apps.main.tests.test_base import TestBase
 from onadata.libs.utils.chart_tools import build_chart_data_for_field,\
@@ -94,6 +99,36 @@ class TestChartTools(TestBase):
         data_field_names = sorted([f['field_name'] for f in data])
         self.assertEqual(expected_fields, data_field_names)
 
+    def test_build_chart_data_is_counted_once_and_cached(self):
+        cache.clear()
+        charts = build_chart_data(self.xform)
+        XForm.objects.filter(pk=self.xform.pk).update(
+            has_field_summaries=False)
+        xform = XForm.objects.get(pk=self.xform.pk)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            queried_charts = build_chart_data(xform)
+        # all the fields are grouped by the same query
+        self.assertEqual(len(queries), 1)
+        for chart, queried_chart in zip(charts, queried_charts):
+            self.assertEqual(sorted(chart.pop('data')),
+                             sorted(queried_chart.pop('data')))
+            self.assertEqual(chart, queried_chart)
+
+        with CaptureQueriesContext(connection) as queries:
+            build_chart_data(xform)
+        self.assertEqual(len(queries), 0)
+
+    def test_build_chart_data_is_built_again_for_a_replaced_form(self):
+        cache.clear()
+        build_chart_data(self.xform)
+        XForm.objects.filter(pk=self.xform.pk).update(
+            date_modified=self.xform.date_modified + timedelta(seconds=1))
+        xform = XForm.objects.get(pk=self.xform.pk)
+        with CaptureQueriesContext(connection) as queries:
+            build_chart_data(xform)
+        self.assertNotEqual(len(queries), 0)
+
     def test_build_chart_data_strips_none_from_dates(self):
         # make the 3rd submission that doesnt have a date
         path = os.path.join(os.path.dirname(__file__), "..", "..", "..",
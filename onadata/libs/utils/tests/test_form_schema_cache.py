@@ -0,0 +1,57 @@
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.apps.logger.models import XForm
+from onadata.libs.utils.form_schema_cache import FormSchemaCache,\
+    form_schema_cache, get_form_schema
+
+
+class TestFormSchemaCache(TestBase):
+
+    def setUp(self):
+        super(TestFormSchemaCache, self).setUp()
+        self._publish_transportation_form()
+        form_schema_cache.clear()
+
+    def test_schema_is_cached_per_form_version(self):
+        schema = get_form_schema(self.xform)
+        self.assertEqual(form_schema_cache.stats()['misses'], 1)
+        self.assertIs(get_form_schema(XForm.objects.get(pk=self.xform.pk)),
+                      schema)
+        self.assertEqual(form_schema_cache.stats()['hits'], 1)
+        data_dictionary = self.xform.data_dictionary()
+        self.assertIsNot(data_dictionary, schema.data_dictionary)
+        self.assertIsNot(data_dictionary, self.xform.data_dictionary())
+        self.assertIs(data_dictionary.survey, schema.survey)
+
+    def test_data_dictionary_has_current_field_values(self):
+        get_form_schema(self.xform)
+        XForm.objects.filter(pk=self.xform.pk).update(num_of_submissions=5)
+        xform = XForm.objects.get(pk=self.xform.pk)
+        self.assertEqual(xform.data_dictionary().num_of_submissions, 5)
+
+    def test_schema_contents(self):
+        schema = get_form_schema(self.xform)
+        data_dictionary = self.xform.data_dictionary()
+        self.assertEqual(schema.geopoint_xpaths,
+                         data_dictionary.geopoint_xpaths())
+        self.assertEqual(schema.mongo_field_names,
+                         data_dictionary.get_mongo_field_names_dict())
+        self.assertEqual(schema.repeat_xpaths, [
+            e.get_abbreviated_xpath() for e in
+            data_dictionary.get_survey_elements_of_type(u'repeat')])
+        self.assertEqual(schema.json_survey[u'id_string'],
+                         self.xform.id_string)
+
+    def test_saving_form_invalidates_schema(self):
+        schema = get_form_schema(self.xform)
+        self.xform.save()
+        self.assertEqual(form_schema_cache.stats()['size'], 0)
+        self.assertIsNot(get_form_schema(self.xform), schema)
+
+    def test_cache_is_bounded(self):
+        cache = FormSchemaCache(max_size=1)
+        cache.get(self.xform)
+        self._publish_xls_file_and_set_xform(
+            self._fixture_path("gps", "gps.xls"))
+        cache.get(self.xform)
+        self.assertEqual(cache.stats()['size'], 1)
+        self.assertEqual(cache.stats()['misses'], 2)
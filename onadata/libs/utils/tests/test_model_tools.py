@@ -0,0 +1,44 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from onadata.apps.logger.models import Instance
+from onadata.apps.main.tests.test_base import TestBase
+from onadata.libs.utils.model_tools import queryset_iterator
+
+
+class TestQuerysetIterator(TestBase):
+
+    def setUp(self):
+        super(TestQuerysetIterator, self).setUp()
+        self._publish_transportation_form()
+        self._make_submissions()
+        self.instance_ids = sorted(
+            Instance.objects.values_list('pk', flat=True))
+
+    def test_iterates_in_pk_order(self):
+        progress = []
+        instances = list(queryset_iterator(
+            Instance.objects.order_by('-pk'), 3, progress=progress.append))
+        self.assertEqual([i.pk for i in instances], self.instance_ids)
+        self.assertEqual(progress, [3, 4])
+
+    def test_one_query_per_chunk(self):
+        with CaptureQueriesContext(connection) as queries:
+            list(queryset_iterator(Instance.objects.all(), 2))
+        # the last chunk is full, so one more query finds no rows
+        self.assertEqual(len(queries), 3)
+
+    def test_values_list(self):
+        rows = list(queryset_iterator(Instance.objects.all(), 3,
+                                      values_list=('uuid',)))
+        self.assertEqual(
+            rows, list(Instance.objects.order_by('pk').values_list('uuid')))
+
+    def test_rows_removed_while_iterating_are_not_skipped(self):
+        seen = []
+        for instance in queryset_iterator(
+                Instance.objects.filter(is_synced_with_mongo=True), 2):
+            seen.append(instance.pk)
+            Instance.objects.filter(pk=instance.pk).update(
+                is_synced_with_mongo=False)
+        self.assertEqual(seen, self.instance_ids)
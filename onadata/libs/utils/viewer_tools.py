@@ -1,8 +1,10 @@
 import os
 import traceback
 import requests
-import zipfile
 
+from collections import deque
+from itertools import islice
+from multiprocessing.pool import ThreadPool
 from tempfile import NamedTemporaryFile
 from xml.dom import minidom
 
@@ -13,9 +15,15 @@ from django.core.mail import mail_admins
 from django.utils.translation import ugettext as _
 
 from onadata.libs.utils import common_tags
+from onadata.libs.utils.streaming import ZipStream
 
 
 SLASH = u"/"
+# attachments read from storage while the one before them is written to a
+# ZIP archive
+DEFAULT_ATTACHMENT_ZIP_PREFETCH = 4
+# bytes
+DEFAULT_ATTACHMENT_ZIP_CHUNK_SIZE = 1024 * 1024
 
 
 class MyError(Exception):
@@ -220,19 +228,93 @@ def enketo_url(form_url, id_string, instance_xml=None,
     return False
 
 
+def _fetch_attachment(name):
+    """
+    Returns `(name, path, temp_file)`, `path` being that of the storage file
+    `name` if the storage has local paths, or else of `temp_file`, to which
+    it is copied in chunks. Returns None if the file cannot be read.
+    """
+    storage = get_storage_class()()
+    chunk_size = getattr(settings, 'ATTACHMENT_ZIP_CHUNK_SIZE',
+                         DEFAULT_ATTACHMENT_ZIP_CHUNK_SIZE)
+    temp_file = None
+    try:
+        if not storage.exists(name):
+            return None
+        try:
+            return name, storage.path(name), None
+        except NotImplementedError:
+            pass
+        temp_file = NamedTemporaryFile(suffix=os.path.splitext(name)[1])
+        with storage.open(name, 'rb') as source_file:
+            for chunk in iter(lambda: source_file.read(chunk_size), ''):
+                temp_file.write(chunk)
+        temp_file.flush()
+        return name, temp_file.name, temp_file
+    except Exception, e:
+        if temp_file is not None:
+            temp_file.close()
+        report_exception(
+            "Error adding file \"{}\" to archive.".format(name), e)
+        return None
+
+
+def iter_attachment_files(attachments, prefetch=None):
+    """
+    Yields `(name, path)` for each file of `attachments` which can be read
+    from storage, in order, while a pool of `prefetch` threads fetches the
+    next ones. The local copy of a file is removed once the next one is
+    asked for.
+    """
+    prefetch = prefetch or getattr(settings, 'ATTACHMENT_ZIP_PREFETCH',
+                                   DEFAULT_ATTACHMENT_ZIP_PREFETCH)
+    # read here: the threads of the pool never touch the database
+    names = iter([attachment.media_file.name for attachment in attachments])
+    pool = ThreadPool(prefetch)
+    try:
+        fetching = deque(pool.apply_async(_fetch_attachment, (name,))
+                         for name in islice(names, prefetch))
+        while fetching:
+            fetched = fetching.popleft().get()
+            for name in islice(names, 1):
+                fetching.append(pool.apply_async(_fetch_attachment, (name,)))
+            if fetched is None:
+                continue
+            name, path, temp_file = fetched
+            try:
+                yield name, path
+            finally:
+                if temp_file is not None:
+                    temp_file.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def iter_attachments_zip(attachments):
+    """
+    Yields the chunks of a ZIP archive of the files of `attachments`, stored
+    as they are since most of them are compressed already, copying each
+    file in chunks rather than reading it whole.
+    """
+    chunk_size = getattr(settings, 'ATTACHMENT_ZIP_CHUNK_SIZE',
+                         DEFAULT_ATTACHMENT_ZIP_CHUNK_SIZE)
+    zip_stream = ZipStream()
+    for name, path in iter_attachment_files(attachments):
+        with open(path, 'rb') as f:
+            chunks = iter(lambda: f.read(chunk_size), '')
+            for data in zip_stream.add(name, chunks, compress=False):
+                yield data
+    for data in zip_stream.close():
+        yield data
+
+
 def create_attachments_zipfile(attachments, output_file=None):
     if not output_file:
         output_file = NamedTemporaryFile()
 
-    storage = get_storage_class()()
-    with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_STORED, allowZip64=True) as zip_file:
-        for attachment in attachments:
-            if storage.exists(attachment.media_file.name):
-                try:
-                    with storage.open(attachment.media_file.name, 'rb') as source_file:
-                        zip_file.writestr(attachment.media_file.name, source_file.read())
-                except Exception, e:
-                    report_exception("Error adding file \"{}\" to archive.".format(attachment.media_file.name), e)
+    for data in iter_attachments_zip(attachments):
+        output_file.write(data)
 
     return output_file
 
@@ -266,3 +348,20 @@ def get_enketo_edit_url(request, instance, return_url):
         instance_id=instance.uuid, return_url=return_url,
         instance_attachments=instance_attachments)
     return url
+
+
+def add_next_cursor_link(request, response, next_cursor):
+    """
+    Points clients of keyset paginated data to the next page through a
+    `Link: <url>; rel="next"` header. Nothing is added after the last page.
+    """
+    if next_cursor is None:
+        return response
+    params = request.GET.copy()
+    params['after'] = next_cursor
+    params.pop('start', None)
+    url = u'%s?%s' % (request.build_absolute_uri(request.path),
+                      params.urlencode())
+    response['Link'] = u'<%s>; rel="next"' % url
+    response['Access-Control-Expose-Headers'] = 'Link'
+    return response
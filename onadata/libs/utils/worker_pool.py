@@ -0,0 +1,55 @@
+import threading
+
+# unlike `multiprocessing`, billiard lets the daemonic processes of the
+# Celery prefork pool start a pool of their own
+from billiard import Pool
+from django.conf import settings
+from django.db import connections
+from pymongo import MongoClient
+
+
+def close_connections():
+    for connection in connections.all():
+        connection.close()
+
+
+def start_pool(workers, initializer=None, initargs=()):
+    """
+    Starts a pool of `workers` processes, closing the database connections
+    first: the forked processes must not inherit open connections.
+
+    Must not be called inside a transaction, which closing its connection
+    would break.
+    """
+    close_connections()
+    return Pool(workers, initializer=initializer, initargs=initargs)
+
+
+def get_worker_instances_collection():
+    """
+    To be called by the initializer of the processes of a pool: closes the
+    database connections, which may not be shared with the parent process,
+    and returns the Mongo `instances` collection through a new client.
+    """
+    close_connections()
+    client = MongoClient(settings.MONGO_CONNECTION_URL, j=True,
+                         tz_aware=True)
+    return client[settings.MONGO_DATABASE['NAME']].instances
+
+
+def imap_bounded(pool, func, iterable, max_pending):
+    """
+    Yields `func(item)` for each item of `iterable`, in order, computed by
+    `pool`. `Pool.imap()` reads its whole input ahead; at most `max_pending`
+    items are read before their result is yielded.
+    """
+    semaphore = threading.BoundedSemaphore(max_pending)
+
+    def bounded():
+        for item in iterable:
+            semaphore.acquire()
+            yield item
+
+    for result in pool.imap(func, bounded()):
+        semaphore.release()
+        yield result
@@ -461,6 +461,10 @@ ZIP_EXPORT_COUNTDOWN = 24 * 60 * 60
 # default content length for submission requests
 DEFAULT_CONTENT_LENGTH = 10000000
 
+# engine used by `XFormInstanceParser`, either 'lxml' or 'minidom'. Documents
+# the lxml engine cannot reproduce exactly are always parsed with minidom
+XFORM_INSTANCE_PARSER_ENGINE = 'lxml'
+
 TEST_RUNNER = 'django_nose.NoseTestSuiteRunner'
 NOSE_ARGS = ['--with-fixture-bundling']
 
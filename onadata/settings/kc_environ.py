@@ -276,6 +276,23 @@ CELERY_BEAT_SCHEDULE = {
     },
 }
 
+# Save submissions to Mongo and call their REST services outside of the
+# submission request, see `onadata.apps.viewer.models.outbox.OutboxEntry`
+SUBMISSION_OUTBOX_ENABLED = os.environ.get(
+    'SUBMISSION_OUTBOX_ENABLED', 'False') == 'True'
+if SUBMISSION_OUTBOX_ENABLED:
+    CELERY_BEAT_SCHEDULE['drain-submission-outbox'] = {
+        'task': 'onadata.apps.viewer.tasks.drain_submission_outbox',
+        'schedule': timedelta(seconds=5),
+        'options': {'queue': 'kobocat_queue'}
+    }
+
+# Create the missing Mongo indexes, in the background, when a process starts.
+# See `onadata.apps.viewer.mongo_indexes` and the `ensure_mongo_indexes`
+# management command
+MONGO_ENSURE_INDEXES_ON_STARTUP = not TESTING_MODE and os.environ.get(
+    'MONGO_ENSURE_INDEXES_ON_STARTUP', 'True') == 'True'
+
 # ## ISSUE 242 TEMPORARY FIX ###
 # See https://github.com/kobotoolbox/kobocat/issues/242
 ISSUE_242_MINIMUM_INSTANCE_ID = os.environ.get(